@@ -1,9 +1,11 @@
-import sqlite3
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import anthropic
-import streamlit as st
+import database_pool
+import schema_migrations
+from anthropic_client import get_client
+from llm_telemetry import llm_feature
+from structured_milestones import MilestoneParseError, generate_milestones, log_generation
 
 
 class AIStudyMilestoneGenerator:
@@ -11,62 +13,9 @@ class AIStudyMilestoneGenerator:
 
     def __init__(self, db_path="community_career_explorer.db"):
         self.db_path = db_path
-        self.init_milestone_tables()
+        schema_migrations.ensure_schema(self.db_path)
 
-        # Initialize AI client
-        try:
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-        except:
-            try:
-                import os
-                from dotenv import load_dotenv
-                load_dotenv()
-                api_key = os.getenv("ANTHROPIC_API_KEY")
-            except:
-                api_key = None
-
-        self.ai_client = anthropic.Anthropic(api_key=api_key) if api_key else None
-
-    def init_milestone_tables(self):
-        """Initialize milestone tracking tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Study milestones table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS study_milestones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                assignment_name TEXT,
-                course_name TEXT,
-                milestone_title TEXT,
-                milestone_description TEXT,
-                milestone_type TEXT,
-                target_date DATETIME,
-                completed BOOLEAN DEFAULT FALSE,
-                completed_date DATETIME,
-                ai_generated BOOLEAN DEFAULT TRUE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-
-        # Milestone generation log
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS milestone_generation_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                generation_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                success BOOLEAN,
-                error_message TEXT,
-                milestones_generated INTEGER DEFAULT 0
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        self.ai_client = get_client()
 
     def generate_milestones_for_assignment(self, student_id: str, assignment: Dict, student_profile: Dict = None) -> \
     List[Dict]:
@@ -85,21 +34,13 @@ class AIStudyMilestoneGenerator:
         prompt = self._create_milestone_prompt(assignment, student_context, other_assignments)
 
         try:
-            response = self.ai_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            milestones = self._parse_ai_response(response.content[0].text, assignment)
-
-            # Save milestones to database
-            self._save_milestones(student_id, assignment, milestones)
+            with llm_feature('assignment_milestones'):
+                specs = generate_milestones(self.ai_client, prompt, "claude-3-5-sonnet-20241022", 1500)
 
-            # Log successful generation
-            self._log_generation(student_id, assignment['assignment_id'], True, len(milestones))
-
-            return milestones
+        except MilestoneParseError as e:
+            print(f"AI milestone response unusable: {e}")
+            self._log_generation(student_id, assignment['assignment_id'], False, 0, str(e), parse_failed=True)
+            return self._generate_fallback_milestones(assignment)
 
         except Exception as e:
             print(f"AI milestone generation failed: {e}")
@@ -110,6 +51,18 @@ class AIStudyMilestoneGenerator:
             # Fallback to rule-based milestones
             return self._generate_fallback_milestones(assignment)
 
+        due_date = datetime.fromisoformat(assignment['due_date']) if assignment[
+            'due_date'] else datetime.now() + timedelta(days=14)
+        milestones = [spec.to_milestone(due_date) for spec in specs]
+
+        # Save milestones to database
+        self._save_milestones(student_id, assignment, milestones)
+
+        # Log successful generation
+        self._log_generation(student_id, assignment['assignment_id'], True, len(milestones))
+
+        return milestones
+
     def _get_student_context(self, student_id: str, student_profile: Dict = None) -> Dict:
         """Get student context for AI prompt"""
 
@@ -133,7 +86,7 @@ class AIStudyMilestoneGenerator:
 
         # Get from database
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -159,7 +112,7 @@ class AIStudyMilestoneGenerator:
         """Get other assignments due around the same time for workload context"""
 
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             # Get assignments due within 2 weeks of current assignment
@@ -173,6 +126,7 @@ class AIStudyMilestoneGenerator:
                 FROM canvas_assignments
                 WHERE student_id = ? 
                 AND assignment_id != ?
+                AND deleted_at IS NULL
                 AND due_date >= ? 
                 AND due_date <= ?
                 ORDER BY due_date
@@ -241,106 +195,13 @@ Create 4-6 specific, actionable study milestones that break this assignment into
 - Be realistic about what can be achieved each day
 - Include submission preparation
 
-**FORMAT YOUR RESPONSE AS JSON:**
-```json
-[
-  {{
-    "title": "Research & Source Gathering",
-    "description": "Find 5-7 reliable sources on [specific topic]. Create bibliography and take initial notes on key themes.",
-    "type": "research", 
-    "days_before_due": 12,
-    "estimated_hours": 3
-  }},
-  {{
-    "title": "Create Assignment Outline",
-    "description": "Develop detailed outline with main arguments, structure essay/report sections, plan evidence integration.",
-    "type": "planning",
-    "days_before_due": 10,
-    "estimated_hours": 2
-  }}
-]
-```
+Record the milestones with the record_study_plan tool, earliest first, giving each one's
+days_before_due and estimated_hours.
 
 Make the milestones specific to this {assignment['course_name']} assignment and helpful for a Year {student_context.get('year_level', 11)} student."""
 
         return prompt
 
-    def _parse_ai_response(self, ai_response: str, assignment: Dict) -> List[Dict]:
-        """Parse AI response into milestone objects"""
-
-        try:
-            # Extract JSON from AI response
-            start_idx = ai_response.find('[')
-            end_idx = ai_response.rfind(']') + 1
-
-            if start_idx != -1 and end_idx != -1:
-                json_str = ai_response[start_idx:end_idx]
-                milestones_data = json.loads(json_str)
-
-                # Convert to milestone objects with actual dates
-                milestones = []
-                due_date = datetime.fromisoformat(assignment['due_date']) if assignment[
-                    'due_date'] else datetime.now() + timedelta(days=14)
-
-                for milestone_data in milestones_data:
-                    target_date = due_date - timedelta(days=milestone_data.get('days_before_due', 1))
-
-                    # Don't schedule milestones in the past
-                    if target_date <= datetime.now():
-                        target_date = datetime.now() + timedelta(days=1)
-
-                    milestone = {
-                        'title': milestone_data.get('title', 'Study Milestone'),
-                        'description': milestone_data.get('description', 'Work on assignment'),
-                        'type': milestone_data.get('type', 'general'),
-                        'target_date': target_date,
-                        'estimated_hours': milestone_data.get('estimated_hours', 2)
-                    }
-                    milestones.append(milestone)
-
-                return milestones
-
-            else:
-                # Fallback parsing if JSON extraction fails
-                return self._extract_milestones_from_text(ai_response, assignment)
-
-        except json.JSONDecodeError:
-            return self._extract_milestones_from_text(ai_response, assignment)
-
-    def _extract_milestones_from_text(self, text: str, assignment: Dict) -> List[Dict]:
-        """Fallback method to extract milestones from plain text"""
-
-        milestones = []
-        lines = text.split('\n')
-        current_milestone = {}
-
-        due_date = datetime.fromisoformat(assignment['due_date']) if assignment[
-            'due_date'] else datetime.now() + timedelta(days=14)
-
-        # Simple pattern matching for milestone extraction
-        for line in lines:
-            line = line.strip()
-
-            if any(word in line.lower() for word in ['phase', 'step', 'milestone', 'stage']):
-                if current_milestone:
-                    milestones.append(current_milestone)
-
-                current_milestone = {
-                    'title': line.replace('-', '').replace('*', '').strip(),
-                    'description': 'Work on this phase of the assignment',
-                    'type': 'general',
-                    'target_date': due_date - timedelta(days=len(milestones) * 2 + 2),
-                    'estimated_hours': 2
-                }
-
-            elif line and current_milestone and 'description' in current_milestone:
-                current_milestone['description'] = line[:200]
-
-        if current_milestone:
-            milestones.append(current_milestone)
-
-        return milestones if milestones else self._generate_fallback_milestones(assignment)
-
     def _generate_fallback_milestones(self, assignment: Dict) -> List[Dict]:
         """Generate basic rule-based milestones when AI fails"""
 
@@ -425,7 +286,7 @@ Make the milestones specific to this {assignment['course_name']} assignment and
         """Save generated milestones to database"""
 
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             # Clear existing milestones for this assignment
@@ -439,7 +300,7 @@ Make the milestones specific to this {assignment['course_name']} assignment and
                 cursor.execute('''
                     INSERT INTO study_milestones
                     (student_id, assignment_id, assignment_name, course_name,
-                     milestone_title, milestone_description, milestone_type, target_date)
+                     title, description, milestone_type, target_date)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     student_id,
@@ -459,37 +320,23 @@ Make the milestones specific to this {assignment['course_name']} assignment and
             print(f"Error saving milestones: {e}")
 
     def _log_generation(self, student_id: str, assignment_id: str, success: bool,
-                        milestones_generated: int, error_message: str = None):
+                        milestones_generated: int, error_message: str = None, parse_failed: bool = False):
         """Log milestone generation attempt"""
-
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                INSERT INTO milestone_generation_log
-                (student_id, assignment_id, success, milestones_generated, error_message)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (student_id, assignment_id, success, milestones_generated, error_message))
-
-            conn.commit()
-            conn.close()
-
-        except Exception as e:
-            print(f"Error logging milestone generation: {e}")
+        log_generation(self.db_path, 'assignment_generator', student_id, assignment_id, success,
+                       milestones_generated, parse_failed, error_message)
 
     def get_student_milestones(self, student_id: str, days_ahead: int = 14) -> List[Dict]:
         """Get upcoming milestones for a student"""
 
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             end_date = datetime.now() + timedelta(days=days_ahead)
 
             cursor.execute('''
-                SELECT id, assignment_name, course_name, milestone_title, 
-                       milestone_description, milestone_type, target_date, completed
+                SELECT id, assignment_name, course_name, title, 
+                       description, milestone_type, target_date, completed
                 FROM study_milestones
                 WHERE student_id = ? 
                 AND target_date >= ?
@@ -521,7 +368,7 @@ Make the milestones specific to this {assignment['course_name']} assignment and
         """Mark a milestone as completed"""
 
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -542,11 +389,11 @@ Make the milestones specific to this {assignment['course_name']} assignment and
         """Get all milestones for a specific assignment"""
 
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
-                SELECT id, milestone_title, milestone_description, milestone_type, 
+                SELECT id, title, description, milestone_type, 
                        target_date, completed, completed_date
                 FROM study_milestones
                 WHERE student_id = ? AND assignment_id = ?
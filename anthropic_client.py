@@ -0,0 +1,54 @@
+# anthropic_client.py - One Anthropic client (and HTTP connection pool) shared by the whole process
+import os
+from typing import Optional
+
+import anthropic
+import streamlit as st
+from dotenv import load_dotenv
+
+from llm_telemetry import InstrumentedAnthropic
+
+# The SDK re-exports httpx's Timeout but not Limits; take the class from its defaults
+Limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+# Long enough that idle TLS connections survive between a user's reruns
+KEEPALIVE_EXPIRY_SECONDS = 120.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+REQUEST_TIMEOUT_SECONDS = 60.0
+# Retries back off exponentially and honour retry-after on 429/5xx
+MAX_RETRIES = 3
+
+
+def get_api_key() -> Optional[str]:
+    """Anthropic API key from Streamlit secrets, falling back to .env"""
+    try:
+        return st.secrets["ANTHROPIC_API_KEY"]
+    except Exception:
+        load_dotenv()
+        return os.getenv("ANTHROPIC_API_KEY")
+
+
+@st.cache_resource(show_spinner=False)
+def _create_client(api_key: str) -> InstrumentedAnthropic:
+    http_client = anthropic.DefaultHttpxClient(
+        limits=Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        )
+    )
+    # Every messages call made through the shared client lands in llm_calls
+    return InstrumentedAnthropic(anthropic.Anthropic(
+        api_key=api_key,
+        http_client=http_client,
+        timeout=anthropic.Timeout(REQUEST_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+        max_retries=MAX_RETRIES
+    ))
+
+
+def get_client() -> Optional[InstrumentedAnthropic]:
+    """Shared client for every session and rerun, or None when no API key is configured"""
+    api_key = get_api_key()
+    return _create_client(api_key) if api_key else None
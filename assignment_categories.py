@@ -0,0 +1,87 @@
+# assignment_categories.py - Declarative assignment category rules compiled into one regex
+import re
+from typing import Dict, List, Optional, Tuple
+
+COURSE_MATERIALS = "Course Materials"
+QUIZZES_AND_TESTS = "Quizzes & Tests"
+ASSESSMENT_TASKS = "Assessment Tasks"
+
+# Earlier categories win when a name matches several
+CATEGORY_PRIORITY = [COURSE_MATERIALS, QUIZZES_AND_TESTS, ASSESSMENT_TASKS]
+DEFAULT_CATEGORY = COURSE_MATERIALS
+
+STAR = '⭐'
+
+# (category, keyword in the upper-cased name, marker the name must also contain)
+# Changing these needs a schema migration that re-runs the category backfill
+CATEGORY_RULES: List[Tuple[str, str, Optional[str]]] = [
+    (COURSE_MATERIALS, 'REGISTER OF RECEIPT', None),
+    (COURSE_MATERIALS, 'COURSE DOCUMENTS', None),
+    (COURSE_MATERIALS, 'SYLLABUS', None),
+    (COURSE_MATERIALS, 'SCOPE AND SEQUENCE', None),
+    (COURSE_MATERIALS, 'ASSESSMENT SCHEDULE', None),
+    (COURSE_MATERIALS, 'REFLECTION', None),
+    (COURSE_MATERIALS, 'DRAFT', None),
+    (COURSE_MATERIALS, 'SUBMISSION', None),
+    (COURSE_MATERIALS, 'INTERVIEW', None),
+    (COURSE_MATERIALS, 'PROGRESS', None),
+    (COURSE_MATERIALS, 'CHECK', None),
+    (COURSE_MATERIALS, 'SURVEY', None),
+    (COURSE_MATERIALS, 'CHECKPOINT', None),
+    (COURSE_MATERIALS, 'CHAPTER ANALYSIS', None),
+    (COURSE_MATERIALS, 'WRITING TASK', None),
+    (COURSE_MATERIALS, 'PRACTICE', None),
+    (COURSE_MATERIALS, 'TUTORIAL', None),
+
+    (QUIZZES_AND_TESTS, 'QUIZ', None),
+    (QUIZZES_AND_TESTS, 'TEST', None),
+    (QUIZZES_AND_TESTS, 'CQ', None),  # Check questions like "CQ2.1: Describe..."
+    (QUIZZES_AND_TESTS, 'CHECK IN', None),
+    (QUIZZES_AND_TESTS, 'DISCURSIVE', None),
+    (QUIZZES_AND_TESTS, 'PERSUASIVE', None),
+
+    # Only numbered assessment tasks and starred investigations/campaigns/projects
+    (ASSESSMENT_TASKS, 'ASSESSMENT TASK', '#'),
+    (ASSESSMENT_TASKS, 'INVESTIGATION', STAR),
+    (ASSESSMENT_TASKS, 'CAMPAIGN', STAR),
+    (ASSESSMENT_TASKS, 'PROJECT', STAR),
+]
+
+
+def _compile_rules():
+    keywords = sorted({keyword for _, keyword, _ in CATEGORY_RULES}, key=len, reverse=True)
+
+    # The lookahead reports a match at every position (so matches can overlap), and the
+    # longest keyword wins at each one. Any other keyword starting there is a prefix of it,
+    # so each keyword carries the rules of all its prefixes.
+    pattern = re.compile('(?=(' + '|'.join(re.escape(keyword) for keyword in keywords) + '))')
+    rules_by_keyword: Dict[str, List[Tuple[str, Optional[str]]]] = {
+        keyword: [(category, marker) for category, rule_keyword, marker in CATEGORY_RULES
+                  if keyword.startswith(rule_keyword)]
+        for keyword in keywords
+    }
+    return pattern, rules_by_keyword
+
+
+KEYWORD_PATTERN, RULES_BY_KEYWORD = _compile_rules()
+
+
+def categorize_assignment(name: str, assignment_type: str = '') -> str:
+    """Categorize an assignment by name (and Canvas type) in a single regex scan"""
+    name = (name or '').upper()
+
+    matched = set()
+    for keyword in KEYWORD_PATTERN.findall(name):
+        for category, marker in RULES_BY_KEYWORD[keyword]:
+            if marker is None or marker in name:
+                matched.add(category)
+
+    if (assignment_type or '').upper() == 'QUIZ':
+        matched.add(QUIZZES_AND_TESTS)
+    if name.startswith(STAR):
+        matched.add(ASSESSMENT_TASKS)  # Starred assignments are major assessments
+
+    for category in CATEGORY_PRIORITY:
+        if category in matched:
+            return category
+    return DEFAULT_CATEGORY
@@ -0,0 +1,113 @@
+# benchmark_live_data_parsing.py - Parse CPU per page, old extractors vs live_data_extraction
+# python benchmark_live_data_parsing.py [--iterations N]; runs against the saved pages in fixtures/live_data
+import argparse
+import glob
+import os
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+from live_data_extraction import extract_abs_metrics, extract_occupation_metrics
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'live_data')
+
+
+def _first_match(text: str, patterns: List[str], template: str, default: str) -> str:
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            return template.format(match.group(1))
+    return default
+
+
+def legacy_abs_metrics(content: bytes) -> Dict[str, str]:
+    """The extractors as they were: html.parser, one get_text() and uncompiled regexes per metric"""
+    soup = BeautifulSoup(content, 'html.parser')
+    return {
+        'unemployment_rate': _first_match(soup.get_text().lower(), [
+            r'unemployment rate.*?(\d+\.?\d*)%', r'(\d+\.?\d*)%.*?unemployment',
+            r'unemployment.*?(\d+\.?\d*) per cent'], '{}%', '3.8%'),
+        'participation_rate': _first_match(soup.get_text().lower(), [
+            r'participation rate.*?(\d+\.?\d*)%', r'(\d+\.?\d*)%.*?participation'], '{}%', '66.8%'),
+        'employment_growth': _first_match(soup.get_text().lower(), [
+            r'employment.*?grew.*?(\d+\.?\d*)%', r'(\d+\.?\d*)%.*?employment growth',
+            r'employment.*?increase.*?(\d+\.?\d*)%'], '+{}%', '+2.1%'),
+    }
+
+
+def legacy_occupation_metrics(content: bytes) -> Dict[str, str]:
+    soup = BeautifulSoup(content, 'html.parser')
+
+    outlook = None
+    for element in soup.find_all(['span', 'div', 'p'], class_=re.compile(r'outlook|growth|trend')):
+        text = element.get_text().strip().lower()
+        if any(word in text for word in ['strong', 'moderate', 'stable', 'decline']):
+            outlook = text.title()
+            break
+    if outlook is None:
+        text = soup.get_text().lower()
+        if 'strong growth' in text:
+            outlook = 'Strong Growth'
+        elif 'moderate growth' in text:
+            outlook = 'Moderate Growth'
+        elif 'stable' in text:
+            outlook = 'Stable'
+        else:
+            outlook = 'Moderate Growth'
+
+    return {
+        'employment_outlook': outlook,
+        'weekly_earnings': _first_match(soup.get_text(), [
+            r'\$(\d{1,3},?\d{3})\s*(?:per week|weekly)', r'weekly.*?\$(\d{1,3},?\d{3})',
+            r'\$(\d{1,3},?\d{3})\s*per week'], '${} per week', 'Data not available'),
+        'employment_size': _first_match(soup.get_text(), [
+            r'(\d{1,3},?\d{3})\s*people.*?employed', r'workforce.*?(\d{1,3},?\d{3})',
+            r'(\d{1,3},?\d{3})\s*workers'], '{} employed', 'Workforce data not available'),
+        'growth_forecast': _first_match(soup.get_text().lower(), [
+            r'grow.*?(\d+\.?\d*)%.*?(?:2024|2025|2026|2027|2028)',
+            r'(\d+\.?\d*)%.*?growth.*?(?:2024|2025|2026|2027|2028)',
+            r'forecast.*?(\d+\.?\d*)%'], '{}% growth forecast', 'Growth data not available'),
+    }
+
+
+def time_per_page(extract: Callable[[bytes], Dict], content: bytes, iterations: int) -> float:
+    """Median CPU milliseconds for one extraction"""
+    samples = []
+    for _ in range(iterations):
+        started = time.process_time()
+        extract(content)
+        samples.append((time.process_time() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run_benchmark(iterations: int = 20) -> bool:
+    pages = [('abs_labour_force.html', legacy_abs_metrics, extract_abs_metrics)]
+    pages += [(os.path.relpath(path, FIXTURE_DIR), legacy_occupation_metrics, extract_occupation_metrics)
+              for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'occupations', '*.html')))]
+
+    all_match = True
+    print(f"⏱️ {'page':<52} {'KB':>5} {'before ms':>10} {'after ms':>9} {'speed-up':>9}")
+    for name, legacy, current in pages:
+        with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+            content = f.read()
+
+        if legacy(content) != current(content):
+            all_match = False
+            print(f"❌ {name}: results differ\n   before: {legacy(content)}\n   after:  {current(content)}")
+
+        before = time_per_page(legacy, content, iterations)
+        after = time_per_page(current, content, iterations)
+        print(f"   {name:<52} {len(content) / 1024:>5.0f} {before:>10.1f} {after:>9.1f} {before / after:>8.1f}x")
+
+    print("✅ Same metrics before and after" if all_match else "❌ Extracted metrics changed")
+    return all_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark live data page parsing against saved fixture pages")
+    parser.add_argument("--iterations", type=int, default=20, help="Extractions per page and implementation")
+    args = parser.parse_args()
+    run_benchmark(args.iterations)
@@ -1,13 +1,19 @@
 import streamlit as st
-import sqlite3
 import requests
-import json
-import anthropic
 import pandas as pd
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import traceback
+import database_pool
+import schema_migrations
+from canvas_sync_module import CanvasSyncManager
+from anthropic_client import get_client
+from llm_resilience import resilient_call
+from structured_milestones import MilestoneParseError, generate_milestones, log_generation
+
+# The study plan screen waits on this call, so no retries - the deadline is the whole wait
+SIMPLE_MILESTONES_DEADLINE_SECONDS = 25
 
 
 class CanvasIntegrator:
@@ -15,67 +21,7 @@ class CanvasIntegrator:
 
     def __init__(self, db_path="community_career_explorer.db"):
         self.db_path = db_path
-        self.init_canvas_tables()
-
-    def init_canvas_tables(self):
-        """Initialize Canvas tables in existing database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Canvas credentials table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_credentials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                canvas_url TEXT,
-                access_token TEXT,
-                student_name TEXT,
-                canvas_user_id TEXT,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_sync DATETIME,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                UNIQUE(student_id)
-            )
-        ''')
-
-        # Canvas assignments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_assignments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                course_name TEXT,
-                assignment_name TEXT,
-                due_date DATETIME,
-                points_possible REAL,
-                description TEXT,
-                html_url TEXT,
-                is_quiz BOOLEAN DEFAULT FALSE,
-                last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                UNIQUE(student_id, assignment_id)
-            )
-        ''')
-
-        # Simple milestones table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS simple_milestones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                assignment_name TEXT,
-                title TEXT,
-                description TEXT,
-                target_date TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        schema_migrations.ensure_schema(self.db_path)
 
     def test_canvas_connection(self, canvas_url: str, access_token: str) -> Dict:
         """Test Canvas API connection"""
@@ -110,7 +56,7 @@ class CanvasIntegrator:
                                 access_token: str, user_name: str, canvas_user_id: str) -> bool:
         """Save Canvas credentials for a student"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -131,7 +77,7 @@ class CanvasIntegrator:
     def get_canvas_credentials(self, student_id: str) -> Optional[Dict]:
         """Get Canvas credentials for a student"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -158,195 +104,30 @@ class CanvasIntegrator:
             return None
 
     def sync_assignments(self, student_id: str) -> Dict:
-        """Sync assignments AND quizzes/exams from Canvas"""
+        """Sync assignments AND quizzes/exams from Canvas (delta sync via CanvasSyncManager)"""
         credentials = self.get_canvas_credentials(student_id)
         if not credentials:
             return {'status': 'error', 'message': 'No Canvas credentials found'}
 
         try:
-            canvas_url = credentials['canvas_url']
-            access_token = credentials['access_token']
-
-            # Get courses
-            courses_response = requests.get(
-                f"{canvas_url}/api/v1/courses",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"enrollment_state": "active", "per_page": 50},
-                timeout=15
+            result = CanvasSyncManager(self.db_path).sync_student(
+                student_id, credentials['canvas_url'], credentials['access_token']
             )
-
-            if courses_response.status_code != 200:
-                return {'status': 'error', 'message': 'Failed to fetch courses'}
-
-            courses = courses_response.json()
-            total_assignments = 0
-            total_exams = 0
-
-            # Get assignments and quizzes from each course
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Clear existing assignments for this student
-            cursor.execute('DELETE FROM canvas_assignments WHERE student_id = ?', (student_id,))
-
-            for course in courses:
-                course_id = course['id']
-                course_name = course.get('name', 'Unknown Course')
-
-                # Sync regular assignments
-                assignment_count = self._sync_course_assignments(
-                    cursor, student_id, course_id, course_name, canvas_url, access_token
-                )
-                total_assignments += assignment_count
-
-                # Sync quizzes/exams
-                quiz_count = self._sync_course_quizzes(
-                    cursor, student_id, course_id, course_name, canvas_url, access_token
-                )
-                total_exams += quiz_count
-
-            # Update last sync time
-            cursor.execute('''
-                UPDATE canvas_credentials 
-                SET last_sync = ? 
-                WHERE student_id = ?
-            ''', (datetime.now().isoformat(), student_id))
-
-            conn.commit()
-            conn.close()
-
-            total_items = total_assignments + total_exams
-
-            return {
-                'status': 'success',
-                'message': f'Synced {total_assignments} assignments and {total_exams} exams from {len(courses)} courses',
-                'assignments_count': total_assignments,
-                'exams_count': total_exams,
-                'total_count': total_items,
-                'courses_count': len(courses)
-            }
-
         except Exception as e:
             return {
                 'status': 'error',
                 'message': f'Sync failed: {str(e)}'
             }
 
-    def _sync_course_assignments(self, cursor, student_id: str, course_id: int,
-                                 course_name: str, canvas_url: str, access_token: str) -> int:
-        """Sync assignments for a specific course"""
-        try:
-            assignments_response = requests.get(
-                f"{canvas_url}/api/v1/courses/{course_id}/assignments",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"per_page": 50, "order_by": "due_at"},
-                timeout=15
-            )
-
-            if assignments_response.status_code != 200:
-                return 0
-
-            assignments = assignments_response.json()
-            count = 0
-
-            for assignment in assignments:
-                try:
-                    due_date = self._parse_due_date(assignment.get('due_at'))
-                    points_possible = self._safe_float(assignment.get('points_possible'), 0)
-
-                    assignment_name = assignment.get('name') or 'Unnamed Assignment'
-                    description = assignment.get('description') or ''
-                    html_url = assignment.get('html_url') or ''
-                    is_quiz_assignment = assignment.get('is_quiz_assignment', False)
-                    assignment_id = str(assignment.get('id', f'unknown_{count}'))
-
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO canvas_assignments
-                        (student_id, assignment_id, course_name, assignment_name, 
-                         due_date, points_possible, description, html_url, is_quiz)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        student_id, assignment_id, course_name, assignment_name,
-                        due_date.isoformat() if due_date else None,
-                        points_possible, description[:500], html_url, bool(is_quiz_assignment)
-                    ))
-
-                    count += 1
-
-                except Exception as e:
-                    print(f"Error processing assignment in {course_name}: {e}")
-                    continue
-
-            return count
-
-        except Exception as e:
-            print(f"Error syncing assignments for {course_name}: {e}")
-            return 0
-
-    def _sync_course_quizzes(self, cursor, student_id: str, course_id: int,
-                             course_name: str, canvas_url: str, access_token: str) -> int:
-        """Sync quizzes/exams for a specific course"""
-        try:
-            quizzes_response = requests.get(
-                f"{canvas_url}/api/v1/courses/{course_id}/quizzes",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"per_page": 50},
-                timeout=15
-            )
-
-            if quizzes_response.status_code != 200:
-                return 0
-
-            quizzes = quizzes_response.json()
-            count = 0
-
-            for quiz in quizzes:
-                try:
-                    if not quiz or not isinstance(quiz, dict):
-                        continue
-
-                    quiz_id = quiz.get('id')
-                    if not quiz_id:
-                        continue
+        if not result['success']:
+            return {'status': 'error', 'message': result['message']}
 
-                    # Check if already exists as assignment
-                    cursor.execute('''
-                        SELECT COUNT(*) FROM canvas_assignments 
-                        WHERE student_id = ? AND assignment_id = ?
-                    ''', (student_id, str(quiz_id)))
-
-                    if cursor.fetchone()[0] > 0:
-                        continue  # Already exists as assignment
-
-                    due_date = self._parse_due_date(quiz.get('due_at'))
-                    points_possible = self._safe_float(quiz.get('points_possible'), 0)
-
-                    quiz_title = quiz.get('title') or 'Unnamed Quiz/Exam'
-                    description = quiz.get('description') or ''
-                    html_url = quiz.get('html_url') or ''
-
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO canvas_assignments
-                        (student_id, assignment_id, course_name, assignment_name, 
-                         due_date, points_possible, description, html_url, is_quiz)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        student_id, f"quiz_{quiz_id}", course_name, quiz_title,
-                        due_date.isoformat() if due_date else None,
-                        points_possible, description[:500], html_url, True
-                    ))
-
-                    count += 1
-
-                except Exception as e:
-                    print(f"Error processing quiz in {course_name}: {e}")
-                    continue
-
-            return count
-
-        except Exception as e:
-            print(f"Error syncing quizzes for {course_name}: {e}")
-            return 0
+        return {
+            'status': 'success',
+            'message': result['message'],
+            'total_count': result['count'],
+            'removed_count': result['removed']
+        }
 
     def _parse_due_date(self, due_at_str: str) -> Optional[datetime]:
         """Safely parse due date string"""
@@ -362,19 +143,10 @@ class CanvasIntegrator:
         except:
             return None
 
-    def _safe_float(self, value, default=0.0) -> float:
-        """Safely convert value to float"""
-        if value is None:
-            return default
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return default
-
     def get_upcoming_assignments(self, student_id: str, days_ahead: int = 30) -> List[Dict]:
         """Get upcoming assignments for a student"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             today = datetime.now()
@@ -385,6 +157,7 @@ class CanvasIntegrator:
                        html_url, description, is_quiz, assignment_id
                 FROM canvas_assignments
                 WHERE student_id = ? 
+                AND deleted_at IS NULL
                 AND due_date IS NOT NULL
                 AND due_date >= ?
                 AND due_date <= ?
@@ -420,21 +193,7 @@ class SimpleMilestoneGenerator:
     def __init__(self, db_path="community_career_explorer.db"):
         self.db_path = db_path
 
-        # Try to initialize AI client
-        try:
-            api_key = st.secrets.get("ANTHROPIC_API_KEY")
-            if not api_key:
-                try:
-                    import os
-                    from dotenv import load_dotenv
-                    load_dotenv()
-                    api_key = os.getenv("ANTHROPIC_API_KEY")
-                except:
-                    pass
-
-            self.ai_client = anthropic.Anthropic(api_key=api_key) if api_key else None
-        except:
-            self.ai_client = None
+        self.ai_client = get_client()
 
     def create_milestones_for_assignment(self, student, assignment):
         """Create milestones using AI or fallback method"""
@@ -445,60 +204,50 @@ class SimpleMilestoneGenerator:
 
     def _create_ai_milestones(self, student, assignment):
         """Create milestones using AI"""
-        try:
-            due_date = assignment['due_date']
-            days_available = (due_date - datetime.now()).days if due_date else 14
+        milestones = self._generate_ai_milestones(student, assignment)
+        if milestones:
+            self._save_milestones(student, assignment, milestones)
+            return milestones
+
+        return self._create_fallback_milestones(assignment)
 
-            prompt = f"""Create a study plan for this Australian high school assignment:
+    def _generate_ai_milestones(self, student, assignment):
+        """One tool-forced AI call for the assignment's milestones; None if it failed"""
+        due_date = assignment['due_date'] or datetime.now() + timedelta(days=14)
+        days_available = (due_date - datetime.now()).days
+        student_id = student.get('id', 'student')
+        assignment_id = assignment.get('assignment_id')
+
+        prompt = f"""Create a study plan for this Australian high school assignment:
 
 Assignment: {assignment['assignment_name']}
 Course: {assignment['course_name']} 
-Due: {due_date.strftime('%d %B %Y') if due_date else 'Soon'}
+Due: {due_date.strftime('%d %B %Y')}
 Points: {assignment['points_possible']}
 Days available: {days_available}
 
-Create 4 specific study milestones as JSON:
-[
-  {{"title": "Research & Planning", "description": "Specific research tasks for this assignment", "days_before_due": 7}},
-  {{"title": "First Draft", "description": "Writing/creation tasks", "days_before_due": 4}},
-  {{"title": "Review & Edit", "description": "Improvement tasks", "days_before_due": 2}},
-  {{"title": "Final Polish", "description": "Final preparation", "days_before_due": 1}}
-]"""
-
-            response = self.ai_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            # Parse AI response
-            ai_text = response.content[0].text
-            start_idx = ai_text.find('[')
-            end_idx = ai_text.rfind(']') + 1
-
-            if start_idx != -1 and end_idx != -1:
-                milestones_data = json.loads(ai_text[start_idx:end_idx])
-
-                milestones = []
-                for milestone_data in milestones_data:
-                    target_date = due_date - timedelta(days=milestone_data.get('days_before_due', 1))
-
-                    if target_date <= datetime.now():
-                        target_date = datetime.now() + timedelta(days=1)
+Record 4 specific study milestones (research and planning, first draft, review and edit, final polish) using the record_study_plan tool."""
 
-                    milestones.append({
-                        'title': milestone_data.get('title', 'Study Task'),
-                        'description': milestone_data.get('description', 'Work on assignment'),
-                        'target_date': target_date
-                    })
+        try:
+            specs = resilient_call(
+                self.ai_client,
+                lambda client: generate_milestones(client, prompt, "claude-3-5-sonnet-20241022", 1000),
+                SIMPLE_MILESTONES_DEADLINE_SECONDS,
+                feature='simple_milestones'
+            )
 
-                self._save_milestones(student, assignment, milestones)
-                return milestones
+        except MilestoneParseError as e:
+            print(f"AI milestone response unusable: {e}")
+            log_generation(self.db_path, 'simple_generator', student_id, assignment_id, False, 0, True, str(e))
+            return None
 
         except Exception as e:
             print(f"AI milestone generation failed: {e}")
+            log_generation(self.db_path, 'simple_generator', student_id, assignment_id, False, 0, False, str(e))
+            return None
 
-        return self._create_fallback_milestones(assignment)
+        log_generation(self.db_path, 'simple_generator', student_id, assignment_id, True, len(specs))
+        return [spec.to_milestone(due_date) for spec in specs]
 
     def _create_fallback_milestones(self, assignment):
         """Create basic milestones without AI"""
@@ -541,58 +290,8 @@ Create 4 specific study milestones as JSON:
         if not self.ai_client:
             return self._create_fallback_milestones_without_saving(assignment)
 
-        try:
-            due_date = assignment['due_date']
-            days_available = (due_date - datetime.now()).days if due_date else 14
-
-            prompt = f"""Create a study plan for this Australian high school assignment:
-
-Assignment: {assignment['assignment_name']}
-Course: {assignment['course_name']} 
-Due: {due_date.strftime('%d %B %Y') if due_date else 'Soon'}
-Points: {assignment['points_possible']}
-Days available: {days_available}
-
-Create 4 specific study milestones as JSON:
-[
-  {{"title": "Research & Planning", "description": "Specific research tasks for this assignment", "days_before_due": 7}},
-  {{"title": "First Draft", "description": "Writing/creation tasks", "days_before_due": 4}},
-  {{"title": "Review & Edit", "description": "Improvement tasks", "days_before_due": 2}},
-  {{"title": "Final Polish", "description": "Final preparation", "days_before_due": 1}}
-]"""
-
-            response = self.ai_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            ai_text = response.content[0].text
-            start_idx = ai_text.find('[')
-            end_idx = ai_text.rfind(']') + 1
-
-            if start_idx != -1 and end_idx != -1:
-                milestones_data = json.loads(ai_text[start_idx:end_idx])
-
-                milestones = []
-                for milestone_data in milestones_data:
-                    target_date = due_date - timedelta(days=milestone_data.get('days_before_due', 1))
-
-                    if target_date <= datetime.now():
-                        target_date = datetime.now() + timedelta(days=1)
-
-                    milestones.append({
-                        'title': milestone_data.get('title', 'Study Task'),
-                        'description': milestone_data.get('description', 'Work on assignment'),
-                        'target_date': target_date
-                    })
-
-                return milestones
-
-        except Exception as e:
-            print(f"AI milestone generation failed: {e}")
-
-        return self._create_fallback_milestones_without_saving(assignment)
+        return (self._generate_ai_milestones(student, assignment)
+                or self._create_fallback_milestones_without_saving(assignment))
 
     def _create_fallback_milestones_without_saving(self, assignment):
         """Create fallback milestones without saving"""
@@ -701,7 +400,7 @@ Create 4 specific study milestones as JSON:
             assignment_id = assignment.get('assignment_id', str(hash(assignment['assignment_name'])))
             student_id = student.get('id', 'student')
 
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             try:
@@ -778,7 +477,7 @@ Create 4 specific study milestones as JSON:
             assignment_id = assignment.get('assignment_id', str(hash(assignment['assignment_name'])))
             student_id = student.get('id', 'student')
 
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             try:
@@ -819,7 +518,7 @@ Create 4 specific study milestones as JSON:
     def get_milestones_for_assignment(self, student_id, assignment_id):
         """Get milestones for an assignment with improved error handling"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -849,7 +548,7 @@ Create 4 specific study milestones as JSON:
     def mark_milestone_completed(self, milestone_id):
         """Mark milestone as completed with improved error handling"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('UPDATE simple_milestones SET completed = TRUE WHERE id = ?', (milestone_id,))
@@ -873,7 +572,7 @@ Create 4 specific study milestones as JSON:
     def clear_milestones_for_assignment(self, student_id, assignment_id):
         """Clear existing milestones for an assignment with improved error handling"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('DELETE FROM simple_milestones WHERE student_id = ? AND assignment_id = ?',
@@ -1061,11 +760,13 @@ def show_canvas_settings(student, canvas_integrator):
     with col2:
         if st.button("🗑️ Remove Canvas", use_container_width=True, type="secondary"):
             # Remove Canvas integration
-            conn = sqlite3.connect(canvas_integrator.db_path)
+            conn = database_pool.connect(canvas_integrator.db_path)
             cursor = conn.cursor()
 
             cursor.execute('UPDATE canvas_credentials SET is_active = FALSE WHERE student_id = ?', (student['id'],))
             cursor.execute('DELETE FROM canvas_assignments WHERE student_id = ?', (student['id'],))
+            # Forget the delta sync position too, so reconnecting starts with a full sync
+            cursor.execute('DELETE FROM canvas_sync_state WHERE student_id = ?', (student['id'],))
             cursor.execute('DELETE FROM simple_milestones WHERE student_id = ?', (student['id'],))
 
             conn.commit()
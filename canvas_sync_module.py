@@ -0,0 +1,449 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+from yarl import URL
+
+import database_pool
+from assignment_categories import categorize_assignment
+import schema_migrations
+from rate_limiter import TokenBucket
+
+# Canvas rate-limits per token/host, so keep a small bounded number of requests in flight
+MAX_REQUESTS_PER_HOST = 6
+REQUEST_TIMEOUT_SECONDS = 15
+# Canvas caps per_page at 100; larger pages mean fewer round-trips
+PAGE_SIZE = 100
+# Pages buffered between the fetchers and the SQLite writer
+WRITE_QUEUE_PAGES = 8
+
+
+class CanvasAPIError(Exception):
+    """Raised when a Canvas list endpoint returns a non-200 response"""
+
+
+class CanvasAPIClient:
+    """Async Canvas REST client with a bounded per-host concurrency limit"""
+
+    def __init__(self, canvas_url: str, access_token: str, max_requests_per_host: int = MAX_REQUESTS_PER_HOST,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.canvas_url = canvas_url.rstrip('/')
+        self.access_token = access_token
+        self.host = urlparse(self.canvas_url).netloc
+        self.max_requests_per_host = max_requests_per_host
+        self.rate_limiter = rate_limiter
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_requests_per_host)
+        self.session = aiohttp.ClientSession(
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+            connector=aiohttp.TCPConnector(limit_per_host=self.max_requests_per_host)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    async def paginate(self, path: str, params: Dict = None,
+                       known_pages: Dict = None) -> AsyncIterator[Tuple[str, Optional[List[Dict]], Optional[str], Optional[str]]]:
+        """Walk a Canvas list endpoint via Link: rel="next" headers.
+
+        Yields (page_url, items, etag, next_url). Pages we've seen before are requested
+        conditionally with If-None-Match; on 304 Not Modified items is None and the
+        stored next link is followed instead.
+        """
+        known_pages = known_pages or {}
+        url = URL(f"{self.canvas_url}/api/v1/{path}").update_query(dict(params or {}, per_page=PAGE_SIZE))
+
+        while url is not None:
+            page_url = str(url)
+            known = known_pages.get(page_url)
+            headers = {"If-None-Match": known['etag']} if known and known.get('etag') else None
+
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+
+            async with self._semaphore:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status == 304 and known:
+                        items, etag, next_url = None, known['etag'], known.get('next')
+                    elif response.status == 200:
+                        items = await response.json(content_type=None) or []
+                        etag = response.headers.get('ETag')
+                        next_link = response.links.get('next')
+                        next_url = str(next_link['url']) if next_link else None
+                    else:
+                        raise CanvasAPIError(f"HTTP {response.status} for {path}")
+
+            yield page_url, items, etag, next_url
+
+            # The next link already carries the full query string (including Canvas' page cursor)
+            url = URL(next_url, encoded=True) if next_url else None
+
+    async def iter_courses(self) -> AsyncIterator[List[Dict]]:
+        """Yield pages of the student's active courses"""
+        async for _, page, _, _ in self.paginate("courses", {"enrollment_state": "active"}):
+            yield page
+
+    async def stream_course_items(self, course: Dict, queue: asyncio.Queue, sync_state: Dict):
+        """Stream changed assignment and quiz rows for one course into the write queue"""
+        # Quizzes may be disabled for a course, so each resource fails independently
+        await asyncio.gather(
+            self._stream_resource(course, 'assignments', False, queue, sync_state),
+            self._stream_resource(course, 'quizzes', True, queue, sync_state),
+            return_exceptions=True
+        )
+
+    async def _stream_resource(self, course: Dict, resource: str, is_quiz: bool,
+                               queue: asyncio.Queue, sync_state: Dict):
+        course_id = str(course['id'])
+        course_name = course.get('name', 'Unknown Course')
+        previous = sync_state.get((course_id, resource), {'pages': {}, 'high_water_mark': None})
+        high_water_mark = previous['high_water_mark']
+        new_high_water_mark = high_water_mark
+        pages = {}
+
+        async for page_url, items, etag, next_url in self.paginate(
+                f"courses/{course_id}/{resource}", known_pages=previous['pages']):
+            if items is None:
+                # 304 - nothing on this page changed, but its items still count as present
+                rows = []
+                seen_ids = previous['pages'][page_url]['ids']
+            else:
+                rows = [row for row in (_build_row(course_id, course_name, item, is_quiz) for item in items) if row]
+                seen_ids = [row['assignment_id'] for row in rows]
+                for row in rows:
+                    updated_at = row['canvas_updated_at']
+                    if updated_at and (new_high_water_mark is None or updated_at > new_high_water_mark):
+                        new_high_water_mark = updated_at
+                # Only items edited since the last sync need writing
+                rows = [row for row in rows
+                        if not high_water_mark or not row['canvas_updated_at']
+                        or row['canvas_updated_at'] > high_water_mark]
+
+            pages[page_url] = {'etag': etag, 'next': next_url, 'ids': seen_ids}
+            await queue.put(('page', course_id, is_quiz, rows, seen_ids))
+
+        new_state = {'pages': pages, 'high_water_mark': new_high_water_mark}
+        await queue.put(('resource', course_id, resource, is_quiz, new_state, new_state != previous))
+
+
+def _build_row(course_id: str, course_name: str, item: Dict, is_quiz: bool) -> Optional[Dict]:
+    """Convert a Canvas assignment/quiz into a canvas_assignments row (dated items only)"""
+    due_date = parse_canvas_date(item.get('due_at'))
+    if not due_date:
+        return None
+
+    if is_quiz:
+        assignment_id, name = f"quiz_{item.get('id')}", item.get('title') or 'Untitled Quiz'
+    else:
+        assignment_id, name = str(item.get('id')), item.get('name') or 'Untitled Assignment'
+
+    return {
+        'assignment_id': assignment_id,
+        'course_id': course_id,
+        'course_name': course_name,
+        'assignment_name': name,
+        'due_date': due_date.isoformat(),
+        'points_possible': item.get('points_possible') or 0,
+        'description': (item.get('description') or '')[:500],
+        'html_url': item.get('html_url') or '',
+        'is_quiz': is_quiz,
+        'canvas_updated_at': item.get('updated_at'),
+        'category': categorize_assignment(name, 'QUIZ' if is_quiz else '')
+    }
+
+
+def parse_canvas_date(due_at: Optional[str]) -> Optional[datetime]:
+    """Parse a Canvas ISO timestamp into a timezone-naive datetime"""
+    if not due_at:
+        return None
+    try:
+        return datetime.fromisoformat(due_at.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class CanvasDataSync:
+    """Applies a delta sync: stages changed rows, then upserts and tombstones in one short write"""
+
+    def __init__(self, db_path="community_career_explorer.db"):
+        self.db_path = db_path
+        self.conn = None
+        self.completed_resources = []
+        self.active_course_ids = None
+        schema_migrations.ensure_schema(self.db_path)
+
+    def load_sync_state(self, student_id: str) -> Dict:
+        """Get the stored sync state keyed by (course_id, resource)"""
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT course_id, resource, page_state, high_water_mark
+            FROM canvas_sync_state
+            WHERE student_id = ?
+        ''', (student_id,))
+
+        state = {}
+        for course_id, resource, page_state, high_water_mark in cursor.fetchall():
+            state[(course_id, resource)] = {
+                'pages': json.loads(page_state) if page_state else {},
+                'high_water_mark': high_water_mark
+            }
+
+        conn.close()
+        return state
+
+    def begin(self):
+        """Open the sync connection with empty TEMP staging tables"""
+        self.conn = database_pool.connect(self.db_path)
+        self.conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS canvas_sync_staging (
+                assignment_id TEXT PRIMARY KEY,
+                course_id TEXT,
+                course_name TEXT,
+                assignment_name TEXT,
+                due_date DATETIME,
+                points_possible REAL,
+                description TEXT,
+                html_url TEXT,
+                is_quiz BOOLEAN,
+                canvas_updated_at TEXT,
+                category TEXT
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS canvas_sync_seen (
+                course_id TEXT,
+                is_quiz BOOLEAN,
+                assignment_id TEXT,
+                PRIMARY KEY (course_id, is_quiz, assignment_id)
+            )
+        ''')
+        self.conn.execute('DELETE FROM temp.canvas_sync_staging')
+        self.conn.execute('DELETE FROM temp.canvas_sync_seen')
+        self.conn.commit()
+
+    def stage_page(self, course_id: str, is_quiz: bool, rows: List[Dict], seen_ids: List[str]):
+        """Batch-insert one page of changed rows and the ids present on it - the temp schema never locks the main database"""
+        if rows:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO temp.canvas_sync_staging
+                (assignment_id, course_id, course_name, assignment_name, due_date,
+                 points_possible, description, html_url, is_quiz, canvas_updated_at, category)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (row['assignment_id'], row['course_id'], row['course_name'], row['assignment_name'],
+                 row['due_date'], row['points_possible'], row['description'], row['html_url'],
+                 row['is_quiz'], row['canvas_updated_at'], row['category'])
+                for row in rows
+            ])
+        if seen_ids:
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO temp.canvas_sync_seen (course_id, is_quiz, assignment_id)
+                VALUES (?, ?, ?)
+            ''', [(course_id, is_quiz, assignment_id) for assignment_id in seen_ids])
+        self.conn.commit()
+
+    def publish(self, student_id: str) -> Tuple[int, int]:
+        """Upsert changed rows and tombstone deleted ones; returns (updated, removed)"""
+        now = datetime.now().isoformat()
+        try:
+            cursor = self.conn.cursor()
+
+            # The WHERE guard makes unchanged rows a no-op instead of a rewrite
+            cursor.execute('''
+                INSERT INTO canvas_assignments
+                (student_id, assignment_id, course_id, course_name, assignment_name, due_date,
+                 points_possible, description, html_url, is_quiz, canvas_updated_at, category, deleted_at)
+                SELECT ?, assignment_id, course_id, course_name, assignment_name, due_date,
+                       points_possible, description, html_url, is_quiz, canvas_updated_at, category, NULL
+                FROM temp.canvas_sync_staging WHERE true
+                ON CONFLICT (student_id, assignment_id) DO UPDATE SET
+                    course_id = excluded.course_id,
+                    course_name = excluded.course_name,
+                    assignment_name = excluded.assignment_name,
+                    due_date = excluded.due_date,
+                    points_possible = excluded.points_possible,
+                    description = excluded.description,
+                    html_url = excluded.html_url,
+                    is_quiz = excluded.is_quiz,
+                    canvas_updated_at = excluded.canvas_updated_at,
+                    category = excluded.category,
+                    deleted_at = NULL
+                WHERE canvas_assignments.canvas_updated_at IS NOT excluded.canvas_updated_at
+                   OR canvas_assignments.course_id IS NOT excluded.course_id
+                   OR canvas_assignments.course_name IS NOT excluded.course_name
+                   OR canvas_assignments.category IS NOT excluded.category
+                   OR canvas_assignments.deleted_at IS NOT NULL
+            ''', (student_id,))
+            updated = cursor.rowcount
+            removed = 0
+
+            # Tombstone items that disappeared from a fully walked course resource
+            for course_id, resource, is_quiz, state, state_changed in self.completed_resources:
+                cursor.execute('''
+                    UPDATE canvas_assignments SET deleted_at = ?
+                    WHERE student_id = ? AND course_id = ? AND is_quiz = ? AND deleted_at IS NULL
+                    AND assignment_id NOT IN (
+                        SELECT assignment_id FROM temp.canvas_sync_seen
+                        WHERE course_id = ? AND is_quiz = ?
+                    )
+                ''', (now, student_id, course_id, is_quiz, course_id, is_quiz))
+                removed += cursor.rowcount
+
+                if state_changed:
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO canvas_sync_state
+                        (student_id, course_id, resource, page_state, high_water_mark, synced_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (student_id, course_id, resource, json.dumps(state['pages']),
+                          state['high_water_mark'], now))
+
+            # Tombstone everything from courses the student is no longer enrolled in
+            if self.active_course_ids is not None:
+                placeholders = ','.join('?' * len(self.active_course_ids))
+                cursor.execute(f'''
+                    UPDATE canvas_assignments SET deleted_at = ?
+                    WHERE student_id = ? AND deleted_at IS NULL
+                    AND (course_id IS NULL OR course_id NOT IN ({placeholders}))
+                ''', (now, student_id, *self.active_course_ids))
+                removed += cursor.rowcount
+                cursor.execute(f'''
+                    DELETE FROM canvas_sync_state
+                    WHERE student_id = ? AND course_id NOT IN ({placeholders})
+                ''', (student_id, *self.active_course_ids))
+
+            # last_sync marks the sync generation, so it only moves when data actually changed
+            if updated or removed:
+                cursor.execute('''
+                    UPDATE canvas_credentials
+                    SET last_sync = ?
+                    WHERE student_id = ?
+                ''', (now, student_id))
+
+            self.conn.commit()
+            return updated, removed
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class CanvasSyncManager:
+    """Delta-sync a student's courses concurrently, streaming pages into batched writes"""
+
+    def __init__(self, db_path="community_career_explorer.db", max_requests_per_host: int = MAX_REQUESTS_PER_HOST,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.db_path = db_path
+        self.max_requests_per_host = max_requests_per_host
+        # Optional budget shared across syncs (e.g. by the background scheduler)
+        self.rate_limiter = rate_limiter
+
+    def sync_student(self, student_id: str, canvas_url: str, access_token: str) -> Dict:
+        """Sync one student's Canvas assignments and quizzes"""
+        data_sync = CanvasDataSync(self.db_path)
+        sync_state = data_sync.load_sync_state(student_id)
+        data_sync.begin()
+        try:
+            try:
+                run_async(self._stream_all(canvas_url, access_token, data_sync, sync_state))
+            except CanvasAPIError:
+                return {'success': False, 'message': 'Failed to fetch courses'}
+
+            updated, removed = data_sync.publish(student_id)
+        finally:
+            data_sync.close()
+
+        if updated or removed:
+            message = f'Successfully synced {updated} new or updated and {removed} removed assignments and quizzes'
+        else:
+            message = 'Assignments are already up to date'
+
+        return {
+            'success': True,
+            'message': message,
+            'count': updated,
+            'removed': removed
+        }
+
+    async def _stream_all(self, canvas_url: str, access_token: str, data_sync: CanvasDataSync, sync_state: Dict):
+        # The bounded queue applies back-pressure: fetchers pause while the writer catches up,
+        # so memory stays flat however many pages a course has
+        queue = asyncio.Queue(maxsize=WRITE_QUEUE_PAGES)
+
+        write_errors = []
+
+        async def writer():
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                if write_errors:
+                    continue  # Keep draining so fetchers never block on a dead writer
+                try:
+                    if message[0] == 'page':
+                        data_sync.stage_page(*message[1:])
+                    else:
+                        data_sync.completed_resources.append(message[1:])
+                except sqlite3.Error as e:
+                    write_errors.append(e)
+
+        async with CanvasAPIClient(canvas_url, access_token, self.max_requests_per_host,
+                                   self.rate_limiter) as client:
+            writer_task = asyncio.create_task(writer())
+            course_tasks = []
+            course_ids = []
+            try:
+                async for page in client.iter_courses():
+                    for course in page:
+                        course_ids.append(str(course['id']))
+                        course_tasks.append(
+                            asyncio.create_task(client.stream_course_items(course, queue, sync_state))
+                        )
+                await asyncio.gather(*course_tasks)
+                data_sync.active_course_ids = course_ids
+            finally:
+                for task in course_tasks:
+                    task.cancel()
+                await queue.put(None)
+                await writer_task
+
+        if write_errors:
+            raise write_errors[0]
+
+
+def run_async(coro):
+    """Run a coroutine to completion from synchronous code (e.g. a Streamlit script thread)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # Already inside an event loop - run on a helper thread instead of nesting loops
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(coro)
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
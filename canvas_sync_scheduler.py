@@ -0,0 +1,142 @@
+# canvas_sync_scheduler.py - Background Canvas sync daemon: python canvas_sync_scheduler.py
+# Keeps every connected student's assignments warm so page loads only read local data
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import schedule
+
+import database_pool
+import schema_migrations
+from canvas_sync_module import CanvasSyncManager
+from rate_limiter import TokenBucket
+
+
+class CanvasSyncScheduler:
+    """Refreshes stale canvas_credentials rows through a worker pool with jitter and a global rate budget"""
+
+    def __init__(self, db_path="community_career_explorer.db", max_workers: int = 4,
+                 stale_after_minutes: int = 30, requests_per_second: float = 5.0,
+                 max_jitter_seconds: float = 20.0):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.stale_after = timedelta(minutes=stale_after_minutes)
+        self.max_jitter_seconds = max_jitter_seconds
+
+        # One request budget shared by every worker, across all Canvas hosts
+        self.rate_limiter = TokenBucket(rate=requests_per_second, capacity=requests_per_second * 2)
+        self.sync_manager = CanvasSyncManager(db_path, rate_limiter=self.rate_limiter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="canvas-sync")
+
+        # last_sync only moves when data changes, so remember when we last checked each student
+        self.last_checked: Dict[str, datetime] = {}
+        self.in_flight = set()
+        self.lock = threading.Lock()
+
+        schema_migrations.ensure_schema(db_path)
+
+    def get_stale_students(self) -> List[Dict]:
+        """Get active Canvas connections that haven't been checked recently, stalest first"""
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT student_id, canvas_url, access_token, last_sync
+            FROM canvas_credentials
+            WHERE is_active = TRUE
+            ORDER BY last_sync IS NOT NULL, last_sync ASC
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+
+        cutoff = datetime.now() - self.stale_after
+        stale = []
+        for student_id, canvas_url, access_token, last_sync in rows:
+            last_seen = self.last_checked.get(student_id)
+            if last_seen is None and last_sync:
+                try:
+                    last_seen = datetime.fromisoformat(last_sync)
+                except ValueError:
+                    last_seen = None
+
+            if last_seen is None or last_seen < cutoff:
+                stale.append({
+                    'student_id': student_id,
+                    'canvas_url': canvas_url,
+                    'access_token': access_token,
+                    'last_seen': last_seen or datetime.min
+                })
+
+        stale.sort(key=lambda student: student['last_seen'])
+        return stale
+
+    def run_cycle(self):
+        """Queue a refresh for every stale student not already being synced"""
+        queued = 0
+        for student in self.get_stale_students():
+            with self.lock:
+                if student['student_id'] in self.in_flight:
+                    continue
+                self.in_flight.add(student['student_id'])
+
+            self.executor.submit(self._sync_student, student)
+            queued += 1
+
+        if queued:
+            print(f"🔄 Queued {queued} Canvas syncs")
+        return queued
+
+    def _sync_student(self, student: Dict):
+        student_id = student['student_id']
+        try:
+            # Jitter spreads a burst of stale students so they don't all hit Canvas at once
+            time.sleep(random.uniform(0, self.max_jitter_seconds))
+
+            result = self.sync_manager.sync_student(student_id, student['canvas_url'], student['access_token'])
+            if result['success']:
+                print(f"✅ {student_id}: {result['message']}")
+            else:
+                print(f"⚠️ {student_id}: {result['message']}")
+        except Exception as e:
+            print(f"❌ Canvas sync failed for {student_id}: {e}")
+        finally:
+            with self.lock:
+                self.last_checked[student_id] = datetime.now()
+                self.in_flight.discard(student_id)
+
+    def run_forever(self, interval_minutes: int = 5):
+        """Check for stale students every interval until interrupted"""
+        print(f"⏰ Canvas sync scheduler started ({self.max_workers} workers, every {interval_minutes} min)")
+        self.run_cycle()
+        schedule.every(interval_minutes).minutes.do(self.run_cycle)
+
+        try:
+            while True:
+                schedule.run_pending()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("🛑 Stopping Canvas sync scheduler")
+        finally:
+            schedule.clear()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep Canvas assignments warm for all connected students")
+    parser.add_argument("--db", default="community_career_explorer.db")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--interval", type=int, default=5, help="Minutes between stale checks")
+    parser.add_argument("--stale-after", type=int, default=30, help="Minutes before a student is refreshed")
+    parser.add_argument("--rate", type=float, default=5.0, help="Global Canvas requests per second")
+    args = parser.parse_args()
+
+    CanvasSyncScheduler(
+        args.db,
+        max_workers=args.workers,
+        stale_after_minutes=args.stale_after,
+        requests_per_second=args.rate
+    ).run_forever(args.interval)
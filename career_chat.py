@@ -0,0 +1,138 @@
+# career_chat.py - Prompt layout for the AI career counsellor chat
+# The counsellor instructions never change, so they sit first in `system`, followed by the student
+# profile and running conversation summary; one prompt-cache breakpoint closes that stable prefix.
+# The replayed history and the per-turn hint come after it, so they never invalidate the cache
+from typing import Dict, List
+
+CAREER_CHAT_MODEL = "claude-3-5-sonnet-20241022"
+CAREER_CHAT_MAX_TOKENS = 1500
+# Most exchanges replayed to the model each turn (older ones live in the running summary)
+HISTORY_EXCHANGES = 5
+# Shortest prefix Sonnet will cache - it applies to everything up to the breakpoint, and a shorter
+# prefix is simply sent uncached
+MIN_CACHEABLE_PROMPT_TOKENS = 1024
+
+CAREER_COUNSELLOR_INSTRUCTIONS = """You are an experienced, warm, and insightful career counsellor specializing in Australian secondary school students. You're having an ongoing conversation with a student, building rapport and providing personalized career guidance. Their profile follows these instructions.
+
+CURRENT NSW/ACT CONTEXT (2025):
+- Newcastle, Macquarie, Sydney, UNSW, ANU are key universities
+- Strong job market in health, education, technology, trades
+- ATAR requirements vary: 70-99+ depending on course/uni
+- Army Reserves education benefits available
+- Graduate employment rate: ~89% overall
+
+YOUR CONVERSATION APPROACH:
+1. **Be conversational and warm** - like talking to a trusted mentor
+2. **Ask probing follow-up questions** - help them think deeper
+3. **Reference their specific interests/situation** - make it personal
+4. **Share specific, actionable insights** - real university names, ATAR ranges, course details
+5. **Balance optimism with realism** - honest about challenges and opportunities
+6. **Encourage reflection** - "What excites you most about that?" "How does that align with your values?"
+
+CONVERSATION TECHNIQUES:
+- Use their name naturally in conversation
+- Ask "What if..." and "How do you feel about..." questions
+- Share specific examples: "Students like you often thrive in..."
+- Reference NSW/ACT opportunities specifically
+- Connect their interests to real career paths and university courses
+- Acknowledge any concerns or emotions they express
+
+REMEMBER:
+- This is an ongoing conversation - reference what you've discussed before
+- Be encouraging but honest about effort required
+- Provide specific next steps they can take
+- Keep responses conversational (150-300 words), not essay-like
+- End with a thoughtful question to continue the dialogue
+
+Respond as their career counsellor, continuing this natural conversation."""
+
+
+def create_student_profile_block(student: Dict) -> str:
+    """Student profile - stable for a student, so it stays inside the cached prefix"""
+    return f"""STUDENT PROFILE - {student['name']}:
+- Age: {student.get('age', 'Not specified')}
+- Year Level: Year {student.get('year_level', 'Not specified')}
+- Interests: {', '.join(student.get('interests', [])) if student.get('interests') else 'Still exploring'}
+- University Timeline: {student.get('timeline', 'Not specified')}
+- Location Preference: {student.get('location_preference', 'Not specified')}
+- Goals: {', '.join(student.get('goals', [])) if student.get('goals') else 'Still developing'}"""
+
+
+def create_conversation_context(conversation_history: List[Dict]) -> str:
+    """Short hint about recent topics; changes turn to turn"""
+    recent_topics = []
+    for exchange in conversation_history[-3:]:
+        message = exchange['user_message'].lower()
+        if any(word in message for word in ['university', 'course', 'degree']):
+            recent_topics.append("university planning")
+        if any(word in message for word in ['career', 'job', 'work']):
+            recent_topics.append("career exploration")
+        if any(word in message for word in ['worried', 'stressed', 'overwhelmed']):
+            recent_topics.append("anxiety/concerns")
+
+    if recent_topics:
+        return f"CONVERSATION CONTEXT: We've been discussing {', '.join(sorted(set(recent_topics)))}. Build on this naturally."
+    return ""
+
+
+def create_conversation_summary_block(summary: str) -> str:
+    """Earlier exchanges, folded into a summary by conversation_memory - changes only on compaction"""
+    return f"""EARLIER IN YOUR CONVERSATIONS WITH THIS STUDENT (summary):
+{summary}"""
+
+
+def create_occupation_facts_block(occupations: List[Dict]) -> str:
+    """Job Outlook figures for occupations the student just mentioned, from the local occupations table"""
+    lines = [f"- {occupation['title']}: {occupation['employment_outlook']}; {occupation['weekly_earnings']}; "
+             f"{occupation['employment_size']}; {occupation['growth_forecast']}"
+             for occupation in occupations]
+    return "JOB OUTLOOK DATA (Australian Government) - use these figures if relevant:\n" + "\n".join(lines)
+
+
+def build_career_chat_request(student: Dict, conversation_history: List[Dict], user_input: str,
+                              summary: str = '', occupations: List[Dict] = None) -> Dict:
+    """Keyword arguments for messages.create/stream"""
+    system = [
+        {"type": "text", "text": CAREER_COUNSELLOR_INSTRUCTIONS},
+        {"type": "text", "text": create_student_profile_block(student)}
+    ]
+    if summary:
+        system.append({"type": "text", "text": create_conversation_summary_block(summary)})
+    # One breakpoint at the end of the stable prefix: it only changes when the profile is edited
+    # or a compaction rewrites the summary. The history slides every turn, so it stays uncached
+    system[-1]["cache_control"] = {"type": "ephemeral"}
+
+    messages = []
+    for exchange in conversation_history[-HISTORY_EXCHANGES:]:
+        messages.append({"role": "user", "content": exchange['user_message']})
+        messages.append({"role": "assistant", "content": exchange['ai_response']})
+
+    user_content = []
+    conversation_context = create_conversation_context(conversation_history)
+    if conversation_context:
+        user_content.append({"type": "text", "text": conversation_context})
+    if occupations:
+        user_content.append({"type": "text", "text": create_occupation_facts_block(occupations)})
+    user_content.append({"type": "text", "text": user_input})
+    messages.append({"role": "user", "content": user_content})
+
+    return {
+        "model": CAREER_CHAT_MODEL,
+        "max_tokens": CAREER_CHAT_MAX_TOKENS,
+        "system": system,
+        "messages": messages
+    }
+
+
+def summarise_usage(usage) -> Dict:
+    """Per-turn token counts from a Messages API usage object"""
+    cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+    cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+    input_tokens = getattr(usage, 'input_tokens', 0) or 0
+    return {
+        'input_tokens': input_tokens,
+        'cache_write_tokens': cache_write,
+        'cache_read_tokens': cache_read,
+        'prompt_tokens': input_tokens + cache_write + cache_read,
+        'output_tokens': getattr(usage, 'output_tokens', 0) or 0
+    }
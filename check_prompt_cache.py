@@ -0,0 +1,61 @@
+# check_prompt_cache.py - Confirm the career chat's system prefix is really read from the prompt cache
+# python check_prompt_cache.py: sends two short turns for the same student against the live API and
+# exits non-zero unless the second one reports cache_read_input_tokens for the whole stable prefix
+import sys
+
+import anthropic
+
+from anthropic_client import get_api_key
+from career_chat import MIN_CACHEABLE_PROMPT_TOKENS, build_career_chat_request, summarise_usage
+
+SAMPLE_STUDENT = {
+    'name': 'Sample Student',
+    'age': 16,
+    'year_level': 11,
+    'interests': ['Biology', 'Sport', 'Helping people'],
+    'timeline': 'After Year 12',
+    'location_preference': 'Newcastle or Sydney',
+    'goals': ['Work in health care']
+}
+SAMPLE_SUMMARY = ("The student is weighing physiotherapy against nursing and is worried about the ATAR "
+                  "needed for physiotherapy at Newcastle.")
+TURNS = [
+    "What subjects should I pick for physiotherapy?",
+    "Are there other ways into physio if I miss the ATAR?"
+]
+# Replies are thrown away, so keep them cheap
+CHECK_MAX_TOKENS = 64
+
+
+def check_prompt_cache(client) -> bool:
+    """Two turns with the same stable prefix; True if the second read it from the cache"""
+    usages = []
+    for user_input in TURNS:
+        chat_request = build_career_chat_request(SAMPLE_STUDENT, [], user_input, SAMPLE_SUMMARY)
+        chat_request['max_tokens'] = CHECK_MAX_TOKENS
+        usage = summarise_usage(client.messages.create(**chat_request).usage)
+        usages.append(usage)
+        print(f"   prompt {usage['prompt_tokens']} tokens: {usage['cache_read_tokens']} cached, "
+              f"{usage['cache_write_tokens']} written, {usage['input_tokens']} uncached")
+
+    first, second = usages
+    prefix_tokens = max(first['cache_write_tokens'], first['cache_read_tokens'])
+    if prefix_tokens < MIN_CACHEABLE_PROMPT_TOKENS:
+        print(f"❌ Nothing cached - the stable prefix is below the {MIN_CACHEABLE_PROMPT_TOKENS}-token minimum")
+        return False
+    if second['cache_read_tokens'] < prefix_tokens:
+        print(f"❌ Second turn read {second['cache_read_tokens']} of {prefix_tokens} prefix tokens from the cache")
+        return False
+
+    print(f"✅ Second turn read the {prefix_tokens}-token prefix from the cache")
+    return True
+
+
+if __name__ == "__main__":
+    api_key = get_api_key()
+    if not api_key:
+        print("❌ ANTHROPIC_API_KEY is not configured")
+        sys.exit(2)
+
+    print("🧪 Checking the career chat prompt cache...")
+    sys.exit(0 if check_prompt_cache(anthropic.Anthropic(api_key=api_key)) else 1)
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A fresh database file per test, so nothing touches community_career_explorer.db"""
+    return str(tmp_path / "test.db")
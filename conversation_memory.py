@@ -0,0 +1,185 @@
+# conversation_memory.py - Rolling per-student summary of older career chat exchanges
+# Each turn replays the running summary plus only the exchanges it doesn't cover yet; once those
+# pass a token budget or the replay window, the oldest are folded into the summary in the background
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import database_pool
+import schema_migrations
+from llm_resilience import resilient_call
+
+SUMMARY_MODEL = "claude-3-5-haiku-20241022"
+SUMMARY_MAX_TOKENS = 600
+SUMMARY_DEADLINE_SECONDS = 30
+# Unsummarised exchanges replayed each turn are compacted once they pass this many tokens
+HISTORY_TOKEN_BUDGET = 4000
+# Exchanges kept verbatim after a compaction
+RECENT_EXCHANGES = 2
+# Hard cap on replayed exchanges while a compaction is pending
+MAX_RECENT_EXCHANGES = 5
+
+SUMMARY_INSTRUCTIONS = """You maintain the long-term memory of a career counsellor's ongoing conversation with an Australian secondary school student.
+
+Update the running summary with the new exchanges. Keep:
+- interests, strengths, values and concerns the student has shared
+- careers, courses, universities and ATAR targets discussed, and how the student felt about them
+- advice given, decisions made and next steps agreed
+- open questions to follow up on
+
+Drop small talk and anything the profile already covers. Write concise notes in the third person, no more than 250 words. Reply with the updated summary only."""
+
+# One background worker, so a student's compactions never overlap
+_compaction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-memory")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) - close enough for a budget"""
+    return len(text or '') // 4 + 1
+
+
+def exchange_tokens(exchange: Dict) -> int:
+    return estimate_tokens(exchange['user_message']) + estimate_tokens(exchange['ai_response'])
+
+
+class ConversationMemory:
+    """Reads and maintains conversation_summaries; the schema is owned by schema_migrations"""
+
+    def __init__(self, db_path="community_career_explorer.db"):
+        self.db_path = db_path
+        schema_migrations.ensure_schema(self.db_path)
+
+    def get_context(self, student_id: str) -> Tuple[str, List[Dict]]:
+        """Running summary plus the newest unsummarised exchanges that fit the budget, oldest first"""
+        summary, summarised_through_id = self._get_summary(student_id)
+        exchanges = self._get_exchanges(student_id, summarised_through_id, newest=MAX_RECENT_EXCHANGES)
+
+        # Bounded even if a compaction hasn't caught up yet
+        recent = []
+        tokens = 0
+        for exchange in reversed(exchanges):
+            tokens += exchange_tokens(exchange)
+            if recent and tokens > HISTORY_TOKEN_BUDGET:
+                break
+            recent.append(exchange)
+        recent.reverse()
+
+        return summary, recent
+
+    def compact(self, client, student_id: str, keep_recent: int = RECENT_EXCHANGES, force: bool = False) -> bool:
+        """Fold older exchanges into the summary once the unsummarised ones pass the budget or
+        outnumber the MAX_RECENT_EXCHANGES that get_context replays, so none are dropped unsummarised.
+
+        force folds everything but keep_recent regardless of size. Returns True if the summary changed.
+        """
+        if not client:
+            return False
+
+        summary, summarised_through_id = self._get_summary(student_id)
+        exchanges = self._get_exchanges(student_id, summarised_through_id)
+        compacted = False
+
+        while len(exchanges) > keep_recent:
+            if (not force and len(exchanges) <= MAX_RECENT_EXCHANGES
+                    and sum(exchange_tokens(e) for e in exchanges) <= HISTORY_TOKEN_BUDGET):
+                break
+
+            # Fold the oldest exchanges, about a budget's worth per call
+            foldable = exchanges[:len(exchanges) - keep_recent]
+            batch = []
+            tokens = 0
+            for exchange in foldable:
+                if batch and tokens + exchange_tokens(exchange) > HISTORY_TOKEN_BUDGET:
+                    break
+                batch.append(exchange)
+                tokens += exchange_tokens(exchange)
+
+            summary = self._summarise(client, summary, batch)
+            self._save_summary(student_id, summary, batch[-1]['id'], len(batch))
+            exchanges = exchanges[len(batch):]
+            compacted = True
+
+        return compacted
+
+    def compact_in_background(self, client, student_id: str, keep_recent: int = RECENT_EXCHANGES,
+                              force: bool = False):
+        """Compact after the reply has been shown, so chat latency doesn't include the summary call"""
+        def run():
+            try:
+                if self.compact(client, student_id, keep_recent, force):
+                    print(f"🧠 Compacted conversation memory for {student_id}")
+            except Exception as e:
+                print(f"❌ Conversation compaction failed for {student_id}: {str(e)}")
+
+        _compaction_executor.submit(run)
+
+    def _summarise(self, client, summary: str, exchanges: List[Dict]) -> str:
+        transcript = "\n\n".join(
+            f"Student: {exchange['user_message']}\nCounsellor: {exchange['ai_response']}"
+            for exchange in exchanges
+        )
+        response = resilient_call(
+            client,
+            lambda client: client.messages.create(
+                model=SUMMARY_MODEL,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                system=SUMMARY_INSTRUCTIONS,
+                messages=[{
+                    "role": "user",
+                    "content": f"CURRENT SUMMARY:\n{summary or '(none yet)'}\n\nNEW EXCHANGES:\n{transcript}"
+                }]
+            ),
+            SUMMARY_DEADLINE_SECONDS,
+            max_retries=1,
+            feature='conversation_summary'
+        )
+        return response.content[0].text.strip()
+
+    def _get_summary(self, student_id: str) -> Tuple[str, int]:
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT summary, summarised_through_id FROM conversation_summaries WHERE student_id = ?
+        ''', (student_id,))
+        result = cursor.fetchone()
+        conn.close()
+        return (result[0] or '', result[1] or 0) if result else ('', 0)
+
+    def _get_exchanges(self, student_id: str, after_id: int, newest: int = None) -> List[Dict]:
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        if newest:
+            cursor.execute('''
+                SELECT id, user_message, agent_response FROM conversations
+                WHERE student_id = ? AND id > ?
+                ORDER BY id DESC LIMIT ?
+            ''', (student_id, after_id, newest))
+            rows = cursor.fetchall()[::-1]
+        else:
+            cursor.execute('''
+                SELECT id, user_message, agent_response FROM conversations
+                WHERE student_id = ? AND id > ?
+                ORDER BY id
+            ''', (student_id, after_id))
+            rows = cursor.fetchall()
+        conn.close()
+
+        return [
+            {'id': row_id, 'user_message': user_message or '', 'ai_response': agent_response or ''}
+            for row_id, user_message, agent_response in rows
+        ]
+
+    def _save_summary(self, student_id: str, summary: str, summarised_through_id: int, exchange_count: int):
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            conn.execute('''
+                INSERT INTO conversation_summaries
+                (student_id, summary, summarised_through_id, exchanges_summarised, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (student_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    summarised_through_id = excluded.summarised_through_id,
+                    exchanges_summarised = exchanges_summarised + excluded.exchanges_summarised,
+                    updated_at = excluded.updated_at
+            ''', (student_id, summary, summarised_through_id, exchange_count, datetime.now().isoformat()))
+        conn.close()
@@ -0,0 +1,108 @@
+# database_pool.py - Shared SQLite access layer: one pooled connection per thread per database
+import sqlite3
+import threading
+from typing import Dict
+
+DEFAULT_DB_PATH = "community_career_explorer.db"
+BUSY_TIMEOUT_SECONDS = 30.0
+# Prepared statements kept per connection - a Streamlit rerun repeats the same few dozen queries
+CACHED_STATEMENTS = 256
+
+# Applied once when a thread's connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",        # Readers no longer block the writer (and vice versa)
+    "PRAGMA synchronous = NORMAL",      # Safe with WAL, avoids an fsync per commit
+    "PRAGMA cache_size = -16000",       # ~16MB page cache
+    "PRAGMA mmap_size = 134217728",     # 128MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class PooledConnection:
+    """Checked-out handle on a thread's shared connection; close() returns it to the pool"""
+
+    def __init__(self, pool: 'DatabasePool', db_path: str, conn: sqlite3.Connection):
+        self._pool = pool
+        self._db_path = db_path
+        self._conn = conn
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        """Check the connection back in (the underlying connection stays open)"""
+        if not self._closed:
+            self._closed = True
+            self._pool.release(self._db_path, self._conn)
+
+    def __del__(self):
+        # Handles dropped without close() (e.g. an early return) behave like a garbage-collected connection
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class DatabasePool:
+    """Thread-local SQLite connections with WAL, tuned pragmas and a prepared statement cache"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _connections(self) -> Dict[str, Dict]:
+        if not hasattr(self._local, 'connections'):
+            self._local.connections = {}
+        return self._local.connections
+
+    def connect(self, db_path: str = DEFAULT_DB_PATH) -> PooledConnection:
+        """Check out this thread's connection to db_path, opening it on first use"""
+        connections = self._connections()
+        entry = connections.get(db_path)
+
+        if entry is None:
+            # check_same_thread is off so a sync can hand its connection to a helper thread
+            # it waits on; connections are otherwise only ever used by their own thread
+            conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS,
+                                   cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                try:
+                    conn.execute(pragma)
+                except sqlite3.DatabaseError as e:
+                    print(f"⚠️ Could not apply '{pragma}': {e}")
+            entry = {'conn': conn, 'checked_out': 0}
+            connections[db_path] = entry
+
+        entry['checked_out'] += 1
+        return PooledConnection(self, db_path, entry['conn'])
+
+    def release(self, db_path: str, conn: sqlite3.Connection):
+        """Return a checkout; uncommitted work is rolled back once the last handle is closed"""
+        entry = self._connections().get(db_path)
+        if entry is None or entry['conn'] is not conn:
+            return
+
+        entry['checked_out'] = max(entry['checked_out'] - 1, 0)
+        if entry['checked_out'] == 0 and conn.in_transaction:
+            conn.rollback()
+
+    def close_all(self):
+        """Close every connection opened by the calling thread"""
+        connections = self._connections()
+        for entry in connections.values():
+            entry['conn'].close()
+        connections.clear()
+
+
+pool = DatabasePool()
+
+
+def connect(db_path: str = DEFAULT_DB_PATH) -> PooledConnection:
+    """Drop-in replacement for sqlite3.connect() backed by the shared pool"""
+    return pool.connect(db_path)
@@ -1,60 +1,17 @@
 # enhanced_auth.py - Clean version with NO email dependencies
 import hashlib
 import secrets
-import sqlite3
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 import streamlit as st
+import database_pool
+import schema_migrations
 
 
 class EnhancedAuthSystem:
     def __init__(self, db_path="community_career_explorer.db"):
         self.db_path = db_path
-        self.init_auth_tables()
-
-    def init_auth_tables(self):
-        """Initialize enhanced authentication tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute('ALTER TABLE families ADD COLUMN password_hash TEXT')
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-
-        try:
-            cursor.execute('ALTER TABLE families ADD COLUMN email_verified BOOLEAN DEFAULT TRUE')
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-
-        # User sessions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id TEXT PRIMARY KEY,
-                family_id TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                expires_at DATETIME,
-                user_agent TEXT,
-                ip_address TEXT,
-                is_active BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (family_id) REFERENCES families (id)
-            )
-        ''')
-
-        # Login events
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS login_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                family_id TEXT,
-                login_method TEXT,
-                login_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-                success BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (family_id) REFERENCES families (id)
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        schema_migrations.ensure_schema(self.db_path)
 
     def hash_password(self, password: str) -> str:
         """Securely hash password with salt"""
@@ -88,7 +45,7 @@ class EnhancedAuthSystem:
         access_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
         password_hash = self.hash_password(password)
 
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -108,7 +65,7 @@ class EnhancedAuthSystem:
 
     def authenticate_family(self, email: str, password: str) -> Optional[Dict]:
         """Authenticate family with email/password"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -135,7 +92,7 @@ class EnhancedAuthSystem:
         session_id = secrets.token_urlsafe(32)
         expires_at = datetime.now() + timedelta(hours=24)
 
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -150,7 +107,7 @@ class EnhancedAuthSystem:
 
     def validate_session(self, session_id: str) -> Optional[Dict]:
         """Validate active session"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -175,7 +132,7 @@ class EnhancedAuthSystem:
 
     def logout_session(self, session_id: str):
         """Logout session"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -187,7 +144,7 @@ class EnhancedAuthSystem:
 
     def cleanup_expired_sessions(self):
         """Clean up expired sessions"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -324,7 +281,7 @@ def create_enhanced_registration_form():
             # Check for existing email
             if not errors:
                 try:
-                    conn = sqlite3.connect("community_career_explorer.db")
+                    conn = database_pool.connect("community_career_explorer.db")
                     cursor = conn.cursor()
                     cursor.execute('SELECT id FROM families WHERE email = ?', (email,))
                     if cursor.fetchone():
@@ -493,7 +450,7 @@ def create_enhanced_registration_form():
 def track_login_event(family_id: str, method: str):
     """Track login events"""
     try:
-        conn = sqlite3.connect("community_career_explorer.db")
+        conn = database_pool.connect("community_career_explorer.db")
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -0,0 +1,265 @@
+# job_outlook_crawler.py - Resumable crawl of the whole Job Outlook catalogue into the occupations table
+# python job_outlook_crawler.py [--max-pages N]; --fixture-site crawls the local copy in fixtures/ instead
+# The frontier lives in crawl_frontier and each batch of pages is checkpointed in one transaction, so an
+# interrupted crawl resumes where it stopped. Re-crawls only rewrite pages whose content hash changed.
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urldefrag, urljoin, urlparse
+
+import aiohttp
+
+import database_pool
+import schema_migrations
+from canvas_sync_module import run_async
+from live_data_extraction import occupation_metrics, parse_page
+from occupation_repository import delete_occupation, upsert_occupation
+from rate_limiter import HostRateLimiter
+
+JOB_OUTLOOK_URL = 'https://joboutlook.gov.au'
+CATALOGUE_PATH = '/occupations'
+OCCUPATION_PATH = re.compile(r'^/occupations/([a-z0-9-]+)/?$')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+# Be respectful to government servers: one request a second, a few in flight
+REQUESTS_PER_SECOND = 1.0
+MAX_CONCURRENT_REQUESTS = 4
+REQUEST_TIMEOUT_SECONDS = 15
+# Pages fetched between checkpoints
+BATCH_SIZE = 20
+# When a fetched page is due again; an unchanged page costs one request and no writes
+RECRAWL_AFTER = {
+    'catalogue': timedelta(days=1),
+    'occupation': timedelta(days=7)
+}
+MAX_ATTEMPTS = 5
+# Doubled after each failed attempt
+RETRY_BACKOFF = timedelta(minutes=5)
+
+# (path, kind, content hash, attempts) as claimed from the frontier; paths are relative to the base URL,
+# so the same catalogue served from another origin (a mirror, the fixture site) reuses the frontier
+FrontierEntry = Tuple[str, str, Optional[str], int]
+# (HTTP status or None, body, error)
+FetchResult = Tuple[Optional[int], Optional[bytes], Optional[str]]
+
+
+def page_title(root) -> str:
+    headings = root.xpath('//h1')
+    if headings:
+        return ' '.join(headings[0].text_content().split())
+    title = root.findtext('.//title') or ''
+    return title.split('|')[0].strip()
+
+
+class JobOutlookCrawler:
+    """Crawls the occupation catalogue from a persistent frontier, a checkpointed batch at a time"""
+
+    def __init__(self, db_path=database_pool.DEFAULT_DB_PATH, base_url: str = JOB_OUTLOOK_URL,
+                 requests_per_second: float = REQUESTS_PER_SECOND, max_concurrent: int = MAX_CONCURRENT_REQUESTS,
+                 batch_size: int = BATCH_SIZE):
+        self.db_path = db_path
+        self.base_url = base_url.rstrip('/')
+        self.host = urlparse(self.base_url).netloc
+        self.max_concurrent = max_concurrent
+        self.batch_size = batch_size
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        schema_migrations.ensure_schema(self.db_path)
+
+    def normalise(self, page_url: str, href: str) -> Optional[Tuple[str, str]]:
+        """(canonical path, kind) for a link the crawler follows, or None"""
+        url, _ = urldefrag(urljoin(page_url, href))
+        parsed = urlparse(url)
+        if parsed.netloc != self.host:
+            return None
+
+        path = parsed.path.rstrip('/')
+        if path == CATALOGUE_PATH:
+            # Only the page number matters; anything else would queue duplicate pages
+            page = parse_qs(parsed.query).get('page', ['1'])[0]
+            return CATALOGUE_PATH + (f"?page={page}" if page != '1' else ''), 'catalogue'
+        if OCCUPATION_PATH.match(path):
+            return path, 'occupation'
+        return None
+
+    def seed(self):
+        """Queue the catalogue's first page (a no-op once it's in the frontier)"""
+        now = datetime.now().isoformat()
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO crawl_frontier (path, kind, status, discovered_at, next_fetch_at)
+                VALUES (?, 'catalogue', 'pending', ?, ?)
+            ''', (CATALOGUE_PATH, now, now))
+        conn.close()
+
+    def claim_due(self, limit: int) -> List[FrontierEntry]:
+        """Pages that are new, due for a re-crawl or due a retry - catalogue pages first"""
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT path, kind, content_hash, attempts FROM crawl_frontier
+            WHERE status IN ('pending', 'done') AND next_fetch_at <= ?
+            ORDER BY CASE kind WHEN 'catalogue' THEN 0 ELSE 1 END, next_fetch_at
+            LIMIT ?
+        ''', (datetime.now().isoformat(), limit))
+        entries = cursor.fetchall()
+        conn.close()
+        return entries
+
+    async def fetch(self, session: aiohttp.ClientSession, path: str) -> FetchResult:
+        url = f"{self.base_url}{path}"
+        await self.rate_limiter.acquire_async(url)
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return 200, await response.read(), None
+                return response.status, None, f"HTTP {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return None, None, str(e) or type(e).__name__
+
+    def checkpoint(self, entries: List[FrontierEntry], results: List[FetchResult]) -> Dict[str, int]:
+        """Record one batch - frontier updates, new links and occupation rows - in a single transaction"""
+        now = datetime.now()
+        counts = {'updated': 0, 'unchanged': 0, 'discovered': 0, 'gone': 0, 'failed': 0}
+
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            cursor = conn.cursor()
+            for (path, kind, previous_hash, attempts), (status, body, error) in zip(entries, results):
+                if body is None:
+                    self._record_failure(cursor, path, kind, status, error, attempts, now, counts)
+                    continue
+
+                try:
+                    root, text = parse_page(body)
+                except Exception as e:
+                    self._record_failure(cursor, path, kind, None, f"unparseable page: {e}", attempts, now, counts)
+                    continue
+
+                # Hash the visible text, so script tokens and the like don't count as changes
+                content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+                if content_hash == previous_hash:
+                    counts['unchanged'] += 1
+                else:
+                    counts['discovered'] += self._queue_links(cursor, f"{self.base_url}{path}", root, now)
+                    if kind == 'occupation':
+                        occupation = occupation_metrics(root, text)
+                        occupation.update({
+                            'slug': OCCUPATION_PATH.match(path).group(1),
+                            'title': page_title(root),
+                            # The public page, whichever origin it was crawled from
+                            'url': f"{JOB_OUTLOOK_URL}{path}",
+                            'content_hash': content_hash,
+                            'crawled_at': now.isoformat()
+                        })
+                        upsert_occupation(cursor, occupation)
+                    counts['updated'] += 1
+
+                cursor.execute('''
+                    UPDATE crawl_frontier
+                    SET status = 'done', attempts = 0, content_hash = ?, last_fetched_at = ?,
+                        next_fetch_at = ?, last_error = NULL
+                    WHERE path = ?
+                ''', (content_hash, now.isoformat(), (now + RECRAWL_AFTER[kind]).isoformat(), path))
+        conn.close()
+        return counts
+
+    def _queue_links(self, cursor, page_url: str, root, now: datetime) -> int:
+        links = {self.normalise(page_url, href) for href in root.xpath('//a/@href')}
+        links.discard(None)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO crawl_frontier (path, kind, status, discovered_at, next_fetch_at)
+            VALUES (?, ?, 'pending', ?, ?)
+        ''', [(path, kind, now.isoformat(), now.isoformat()) for path, kind in links])
+        return cursor.rowcount if cursor.rowcount > 0 else 0
+
+    def _record_failure(self, cursor, path: str, kind: str, status: Optional[int], error: str, attempts: int,
+                        now: datetime, counts: Dict[str, int]):
+        if status in (404, 410):
+            # The occupation has been retired from the catalogue
+            cursor.execute('''
+                UPDATE crawl_frontier SET status = 'gone', last_fetched_at = ?, last_error = ? WHERE path = ?
+            ''', (now.isoformat(), error, path))
+            if kind == 'occupation':
+                delete_occupation(cursor, OCCUPATION_PATH.match(path).group(1))
+            counts['gone'] += 1
+            return
+
+        attempts += 1
+        cursor.execute('''
+            UPDATE crawl_frontier
+            SET status = ?, attempts = ?, last_fetched_at = ?, next_fetch_at = ?, last_error = ?
+            WHERE path = ?
+        ''', ('failed' if attempts >= MAX_ATTEMPTS else 'pending', attempts, now.isoformat(),
+              (now + RETRY_BACKOFF * 2 ** (attempts - 1)).isoformat(), error, path))
+        counts['failed'] += 1
+
+    async def crawl_async(self, max_pages: int = None) -> Dict[str, int]:
+        self.seed()
+        stats = {'fetched': 0, 'updated': 0, 'unchanged': 0, 'discovered': 0, 'gone': 0, 'failed': 0}
+
+        async with aiohttp.ClientSession(
+            headers={'User-Agent': USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+            connector=aiohttp.TCPConnector(limit_per_host=self.max_concurrent)
+        ) as session:
+            while max_pages is None or stats['fetched'] < max_pages:
+                limit = self.batch_size if max_pages is None else min(self.batch_size, max_pages - stats['fetched'])
+                entries = self.claim_due(limit)
+                if not entries:
+                    break
+
+                results = await asyncio.gather(*(self.fetch(session, path) for path, _, _, _ in entries))
+                counts = self.checkpoint(entries, results)
+
+                stats['fetched'] += len(entries)
+                for key, value in counts.items():
+                    stats[key] += value
+                print(f"🕷️ {stats['fetched']} pages fetched: {stats['updated']} updated, "
+                      f"{stats['unchanged']} unchanged, {stats['discovered']} new links, {stats['failed']} failed")
+
+        return stats
+
+    def crawl(self, max_pages: int = None) -> Dict[str, int]:
+        """Crawl until nothing is due (or max_pages have been fetched); safe to stop and rerun at any point"""
+        return run_async(self.crawl_async(max_pages))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the Job Outlook occupation catalogue into the occupations table")
+    parser.add_argument("--db", default=None, help="Database to fill (defaults to the app's, or a scratch copy "
+                                                   "with --fixture-site)")
+    parser.add_argument("--base-url", default=JOB_OUTLOOK_URL)
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after this many pages (resume later)")
+    parser.add_argument("--requests-per-second", type=float, default=REQUESTS_PER_SECOND)
+    parser.add_argument("--fixture-site", action="store_true", help="Crawl the local fixture site, offline")
+    args = parser.parse_args()
+
+    site = None
+    scratch_dir = None
+    db_path = args.db or database_pool.DEFAULT_DB_PATH
+    base_url = args.base_url
+    if args.fixture_site:
+        from job_outlook_fixture_site import JobOutlookFixtureSite
+
+        site = JobOutlookFixtureSite()
+        base_url = site.start()
+        if not args.db:
+            scratch_dir = tempfile.mkdtemp(prefix="job-outlook-crawl-")
+            db_path = os.path.join(scratch_dir, "crawl.db")
+
+    print(f"🕷️ Crawling {base_url}{CATALOGUE_PATH} into {db_path}")
+    try:
+        stats = JobOutlookCrawler(db_path, base_url, args.requests_per_second).crawl(args.max_pages)
+        print(f"✅ Crawl finished: {stats}")
+    finally:
+        if site:
+            site.stop()
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
@@ -0,0 +1,88 @@
+# job_outlook_fixture_site.py - Serves fixtures/job_outlook_site with Job Outlook's URL layout, for offline crawls
+# /occupations?page=N -> occupations/index.html or page-N.html, /occupations/<slug> -> occupations/<slug>.html
+import argparse
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from job_outlook_crawler import CATALOGUE_PATH, OCCUPATION_PATH
+
+FIXTURE_SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'job_outlook_site')
+
+
+class FixtureSiteHandler(BaseHTTPRequestHandler):
+    server: "JobOutlookFixtureSite"
+
+    def log_message(self, format, *args):
+        pass  # Keep crawl output readable
+
+    def do_GET(self):
+        self.server.record(self.path)
+        path = self.server.file_for(self.path)
+        if not path or not os.path.exists(path):
+            self.send_error(404)
+            return
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class JobOutlookFixtureSite(ThreadingHTTPServer):
+    """Threaded local copy of the Job Outlook catalogue; start() runs it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, directory: str = FIXTURE_SITE_DIR, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), FixtureSiteHandler)
+        self.directory = directory
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def file_for(self, request_path: str) -> Optional[str]:
+        parsed = urlparse(request_path)
+        occupations_dir = os.path.join(self.directory, 'occupations')
+        if parsed.path.rstrip('/') == CATALOGUE_PATH:
+            page = parse_qs(parsed.query).get('page', ['1'])[0]
+            if not page.isdigit():
+                return None
+            return os.path.join(occupations_dir, 'index.html' if page == '1' else f'page-{page}.html')
+
+        match = OCCUPATION_PATH.match(parsed.path)
+        return os.path.join(occupations_dir, f'{match.group(1)}.html') if match else None
+
+    def record(self, path: str):
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.serve_forever, name="job-outlook-fixture", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Job Outlook fixture site")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--directory", default=FIXTURE_SITE_DIR)
+    args = parser.parse_args()
+
+    site = JobOutlookFixtureSite(args.directory, port=args.port)
+    print(f"🧪 Job Outlook fixture site on {site.base_url}{CATALOGUE_PATH}")
+    site.serve_forever()
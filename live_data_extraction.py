@@ -0,0 +1,126 @@
+# live_data_extraction.py - Metric extraction for the live data sources, one parse per page
+# Each page is parsed once with lxml and its text serialised once; every metric's patterns are
+# compiled at import and run against that shared text
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+import lxml.html
+from lxml import etree
+
+# Left out of the page text, as BeautifulSoup's get_text() does
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+# (metric, patterns in priority order, result template, default when nothing matches)
+# Patterns run against the lower-cased page text unless the metric is listed in CASE_SENSITIVE_METRICS
+ABS_METRIC_RULES: List[Tuple[str, List[str], str, str]] = [
+    ('unemployment_rate', [
+        r'unemployment rate.*?(\d+\.?\d*)%',
+        r'(\d+\.?\d*)%.*?unemployment',
+        r'unemployment.*?(\d+\.?\d*) per cent'
+    ], '{}%', '3.8%'),
+    ('participation_rate', [
+        r'participation rate.*?(\d+\.?\d*)%',
+        r'(\d+\.?\d*)%.*?participation'
+    ], '{}%', '66.8%'),
+    ('employment_growth', [
+        r'employment.*?grew.*?(\d+\.?\d*)%',
+        r'(\d+\.?\d*)%.*?employment growth',
+        r'employment.*?increase.*?(\d+\.?\d*)%'
+    ], '+{}%', '+2.1%'),
+]
+
+OCCUPATION_METRIC_RULES: List[Tuple[str, List[str], str, str]] = [
+    ('weekly_earnings', [
+        r'\$(\d{1,3},?\d{3})\s*(?:per week|weekly)',
+        r'weekly.*?\$(\d{1,3},?\d{3})',
+        r'\$(\d{1,3},?\d{3})\s*per week'
+    ], '${} per week', 'Data not available'),
+    ('employment_size', [
+        r'(\d{1,3},?\d{3})\s*people.*?employed',
+        r'workforce.*?(\d{1,3},?\d{3})',
+        r'(\d{1,3},?\d{3})\s*workers'
+    ], '{} employed', 'Workforce data not available'),
+    ('growth_forecast', [
+        r'grow.*?(\d+\.?\d*)%.*?(?:2024|2025|2026|2027|2028)',
+        r'(\d+\.?\d*)%.*?growth.*?(?:2024|2025|2026|2027|2028)',
+        r'forecast.*?(\d+\.?\d*)%'
+    ], '{}% growth forecast', 'Growth data not available'),
+]
+
+# Earnings and workforce figures are matched against the page text as written
+CASE_SENSITIVE_METRICS = {'weekly_earnings', 'employment_size'}
+
+# Job Outlook marks its rating with classes like "outlook-rating"; matched per element, in page order
+OUTLOOK_ELEMENTS = etree.XPath(
+    "//*[self::span or self::div or self::p]"
+    "[contains(@class, 'outlook') or contains(@class, 'growth') or contains(@class, 'trend')]"
+)
+OUTLOOK_WORDS = ('strong', 'moderate', 'stable', 'decline')
+DEFAULT_OUTLOOK = 'Moderate Growth'
+
+CompiledRules = List[Tuple[str, List[Pattern], str, str]]
+
+
+def _compile(rules: List[Tuple[str, List[str], str, str]]) -> CompiledRules:
+    return [(metric, [re.compile(pattern) for pattern in patterns], template, default)
+            for metric, patterns, template, default in rules]
+
+
+ABS_RULES = _compile(ABS_METRIC_RULES)
+OCCUPATION_RULES = _compile(OCCUPATION_METRIC_RULES)
+
+
+def parse_page(content: bytes) -> Tuple[etree._Element, str]:
+    """Parse a page once; returns the tree and its visible text"""
+    root = lxml.html.fromstring(content)
+    etree.strip_elements(root, *NON_TEXT_TAGS, with_tail=False)
+    return root, root.text_content()
+
+
+def extract_metrics(text: str, rules: CompiledRules, lower_text: Optional[str] = None) -> Dict[str, str]:
+    """Apply every metric's patterns to the shared text; the first pattern that matches wins"""
+    lower_text = text.lower() if lower_text is None else lower_text
+    metrics = {}
+    for metric, patterns, template, default in rules:
+        haystack = text if metric in CASE_SENSITIVE_METRICS else lower_text
+        metrics[metric] = default
+        for pattern in patterns:
+            match = pattern.search(haystack)
+            if match:
+                metrics[metric] = template.format(match.group(1))
+                break
+    return metrics
+
+
+def extract_abs_metrics(content: bytes) -> Dict[str, str]:
+    """Unemployment, participation and employment growth from the ABS Labour Force page"""
+    _, text = parse_page(content)
+    return extract_metrics(text, ABS_RULES)
+
+
+def extract_outlook(root: etree._Element, lower_text: str) -> str:
+    for element in OUTLOOK_ELEMENTS(root):
+        element_text = element.text_content().strip().lower()
+        if any(word in element_text for word in OUTLOOK_WORDS):
+            return element_text.title()
+
+    if 'strong growth' in lower_text:
+        return 'Strong Growth'
+    elif 'moderate growth' in lower_text:
+        return 'Moderate Growth'
+    elif 'stable' in lower_text:
+        return 'Stable'
+    return DEFAULT_OUTLOOK
+
+
+def occupation_metrics(root: etree._Element, text: str) -> Dict[str, str]:
+    """Occupation page metrics from an already parsed page (see parse_page)"""
+    lower_text = text.lower()
+    metrics = {'employment_outlook': extract_outlook(root, lower_text)}
+    metrics.update(extract_metrics(text, OCCUPATION_RULES, lower_text))
+    return metrics
+
+
+def extract_occupation_metrics(content: bytes) -> Dict[str, str]:
+    """Outlook, weekly earnings, workforce size and growth forecast from a Job Outlook occupation page"""
+    return occupation_metrics(*parse_page(content))
@@ -0,0 +1,131 @@
+# live_data_store.py - Versioned snapshots of the live employment data, in place of live_employment_data.json
+# Each collection is published atomically as a new snapshot with one row per metric; readers get the
+# latest snapshot from an in-process cache that's only reloaded when a newer version appears
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import database_pool
+import schema_migrations
+
+LEGACY_JSON_FILE = "live_employment_data.json"
+
+# db_path -> (snapshot version, nested live data); shared by every session in the process
+_latest_cache: Dict[str, Tuple[int, Dict]] = {}
+_latest_lock = threading.Lock()
+
+
+def flatten_live_data(live_data: Dict) -> List[Tuple[str, str, str, str]]:
+    """(source, subject, metric, value) rows; subject is '' for sources without per-career figures"""
+    rows = []
+    for source, section in live_data.items():
+        if not isinstance(section, dict):
+            continue  # e.g. collection_timestamp
+        for key, value in section.items():
+            if isinstance(value, dict):
+                rows.extend((source, key, metric, str(metric_value)) for metric, metric_value in value.items())
+            else:
+                rows.append((source, '', key, str(value)))
+    return rows
+
+
+class LiveDataStore:
+    """Publishes live data collections as snapshots and serves the latest one"""
+
+    def __init__(self, db_path=database_pool.DEFAULT_DB_PATH):
+        self.db_path = db_path
+        schema_migrations.ensure_schema(self.db_path)
+
+    def publish(self, live_data: Dict) -> int:
+        """Store a collection as a new snapshot in one transaction; returns its version"""
+        collected_at = live_data.get('collection_timestamp') or datetime.now().isoformat()
+        rows = flatten_live_data(live_data)
+
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            cursor = conn.execute('''
+                INSERT INTO live_data_snapshots (collected_at, published_at, metric_count)
+                VALUES (?, ?, ?)
+            ''', (collected_at, datetime.now().isoformat(), len(rows)))
+            version = cursor.lastrowid
+            conn.executemany('''
+                INSERT INTO live_data_metrics (snapshot_version, source, subject, metric, value, collected_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(version, source, subject, metric, value, collected_at) for source, subject, metric, value in rows])
+        conn.close()
+
+        print(f"💾 Published live data snapshot {version} ({len(rows)} metrics)")
+        return version
+
+    def latest_version(self) -> Optional[int]:
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT MAX(version) FROM live_data_snapshots')
+        version = cursor.fetchone()[0]
+        conn.close()
+        return version
+
+    def get_latest(self) -> Optional[Dict]:
+        """Latest snapshot in the collector's nested shape (treat as read-only), or None if there is none"""
+        version = self.latest_version()
+        if version is None:
+            return None
+
+        cached = _latest_cache.get(self.db_path)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        live_data = self.get_snapshot(version)
+        with _latest_lock:
+            current = _latest_cache.get(self.db_path)
+            if not current or current[0] < version:
+                _latest_cache[self.db_path] = (version, live_data)
+        return live_data
+
+    def get_snapshot(self, version: int) -> Dict:
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT collected_at FROM live_data_snapshots WHERE version = ?', (version,))
+        row = cursor.fetchone()
+        cursor.execute('''
+            SELECT source, subject, metric, value FROM live_data_metrics WHERE snapshot_version = ?
+        ''', (version,))
+        metrics = cursor.fetchall()
+        conn.close()
+
+        live_data = {'collection_timestamp': row[0] if row else None, 'snapshot_version': version}
+        for source, subject, metric, value in metrics:
+            section = live_data.setdefault(source, {})
+            if subject:
+                section.setdefault(subject, {})[metric] = value
+            else:
+                section[metric] = value
+        return live_data
+
+    def get_metric_history(self, source: str, metric: str, subject: str = '',
+                           limit: int = 100) -> List[Tuple[str, str]]:
+        """(collected_at, value) for one metric across the most recent snapshots, oldest first"""
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT collected_at, value FROM live_data_metrics
+            WHERE source = ? AND metric = ? AND subject = ?
+            ORDER BY collected_at DESC
+            LIMIT ?
+        ''', (source, metric, subject, limit))
+        history = cursor.fetchall()
+        conn.close()
+        return list(reversed(history))
+
+    def import_legacy_json(self, filename: str = LEGACY_JSON_FILE) -> Optional[int]:
+        """Publish an old live_employment_data.json as the first snapshot if the store is still empty"""
+        if self.latest_version() is not None or not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return self.publish(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not import {filename}: {e}")
+            return None
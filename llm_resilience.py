@@ -0,0 +1,139 @@
+# llm_resilience.py - Deadlines, a circuit breaker and hedging shared by every Anthropic call
+# When the API is slow or failing, callers fail fast (or serve a rule-based answer) instead of
+# holding a Streamlit thread for the SDK's default ten-minute timeout
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Optional, Tuple, TypeVar
+
+import anthropic
+
+from llm_telemetry import llm_feature
+
+T = TypeVar('T')
+
+
+def is_dependency_failure(error: Exception) -> bool:
+    """True if the API itself is unhealthy - bad requests and parse failures don't count"""
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError)):  # Includes timeouts
+        return True
+    # 5xx, including 529 overloaded (which the SDK doesn't file under InternalServerError)
+    return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open, so the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Trips after consecutive failures or slow calls; lets one probe through after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_after_seconds: float = 30.0,
+                 slow_call_seconds: float = 20.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after_seconds = reset_after_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """True while calls are being refused (read-only - doesn't claim the half-open probe)"""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            return self._probe_in_flight or time.monotonic() - self._opened_at < self.reset_after_seconds
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probe_in_flight or time.monotonic() - self._opened_at < self.reset_after_seconds:
+                return False
+            # Half-open: this caller is the probe
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, elapsed_seconds: float, slow_call_seconds: float = None):
+        if elapsed_seconds > (slow_call_seconds or self.slow_call_seconds):
+            self.record_failure()
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                print("✅ Anthropic circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                print(f"⚠️ Anthropic circuit opened after {self._failures} failed or slow calls")
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+# One breaker for the Anthropic API, shared by every session in the process
+anthropic_breaker = CircuitBreaker()
+
+# Runs the AI half of hedged calls
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+
+def resilient_call(client, call: Callable[..., T], deadline_seconds: float, max_retries: int = 0,
+                   slow_call_seconds: float = None, breaker: CircuitBreaker = anthropic_breaker,
+                   feature: str = None, prompt_version: str = None) -> T:
+    """Run call(client) with a per-call deadline, through the circuit breaker.
+
+    The deadline is the SDK timeout: for a normal request that bounds the whole wait, for a stream
+    it bounds each gap between chunks. Raises CircuitOpenError without calling when the breaker is open.
+    feature/prompt_version tag the call's llm_calls rows.
+    """
+    if not breaker.allow_request():
+        raise CircuitOpenError("AI service temporarily unavailable")
+
+    started = time.monotonic()
+    try:
+        with llm_feature(feature or 'other', prompt_version):
+            result = call(client.with_options(timeout=deadline_seconds, max_retries=max_retries))
+    except Exception as e:
+        if is_dependency_failure(e):
+            breaker.record_failure()
+        else:
+            # The API answered; the failure is ours (bad request, unusable output)
+            breaker.record_success(0.0)
+        raise
+
+    breaker.record_success(time.monotonic() - started, slow_call_seconds)
+    return result
+
+
+def hedge(primary: Callable[[], T], fallback: Callable[[], T], hedge_after_seconds: float) -> Tuple[T, Optional[Future]]:
+    """Start primary in the background and wait up to hedge_after_seconds for it.
+
+    Returns (primary's result, None) if it finishes in time, otherwise (fallback(), future) so
+    the caller can serve the fallback now and upgrade once the future completes.
+    """
+    future = _hedge_executor.submit(primary)
+    try:
+        return future.result(timeout=hedge_after_seconds), None
+    except FutureTimeout:
+        return fallback(), future
+    except Exception as e:
+        print(f"❌ Hedged call failed: {str(e)}")
+        return fallback(), None
+
+
+def describe_llm_failure(error: Exception) -> str:
+    """Short, user-facing explanation of why an AI call didn't complete"""
+    if isinstance(error, CircuitOpenError):
+        return "The AI service is having trouble right now, so we've paused AI requests for a moment. Please try again shortly."
+    if isinstance(error, anthropic.APITimeoutError):
+        return "The AI service took too long to respond. Please try again."
+    if isinstance(error, anthropic.RateLimitError):
+        return "The AI service is busy. Please wait a moment and try again."
+    if is_dependency_failure(error):
+        return "Couldn't reach the AI service. Please check your connection and try again."
+    return f"Sorry, something went wrong: {str(error)}. Please try again."
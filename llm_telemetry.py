@@ -0,0 +1,268 @@
+# llm_telemetry.py - Latency and token telemetry for every Anthropic call, batched into llm_calls
+# anthropic_client wraps the shared client in InstrumentedAnthropic, so messages.create and
+# messages.stream are timed and recorded wherever they're called; callers tag the feature with llm_feature()
+import atexit
+import contextvars
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import database_pool
+import schema_migrations
+
+# USD per million tokens: (input, output, cache write, cache read)
+MODEL_PRICING = {
+    "claude-3-5-sonnet": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-5-haiku": (0.80, 4.00, 1.00, 0.08),
+}
+DEFAULT_PRICING = MODEL_PRICING["claude-3-5-sonnet"]
+
+FLUSH_INTERVAL_SECONDS = 2.0
+FLUSH_BATCH_SIZE = 50
+
+_current_call = contextvars.ContextVar("llm_call", default={"feature": "other", "prompt_version": None})
+
+
+@contextmanager
+def llm_feature(feature: str, prompt_version: Optional[str] = None):
+    """Tag the Anthropic calls made inside this block with a feature name (and prompt version)"""
+    token = _current_call.set({"feature": feature, "prompt_version": prompt_version})
+    try:
+        yield
+    finally:
+        _current_call.reset(token)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int,
+                  cache_write_tokens: int = 0, cache_read_tokens: int = 0) -> float:
+    """Estimated USD cost of one call"""
+    pricing = next((price for prefix, price in MODEL_PRICING.items() if (model or '').startswith(prefix)),
+                   DEFAULT_PRICING)
+    input_price, output_price, cache_write_price, cache_read_price = pricing
+    return (input_tokens * input_price + output_tokens * output_price +
+            cache_write_tokens * cache_write_price + cache_read_tokens * cache_read_price) / 1_000_000
+
+
+class TelemetryWriter:
+    """Queues call records and writes them in batches from a background thread"""
+
+    def __init__(self, db_path: str = database_pool.DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def record(self, row: Dict):
+        self._queue.put(row)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="llm-telemetry", daemon=True)
+                    self._thread.start()
+
+    def flush(self, timeout: float = 10.0):
+        """Block until everything queued so far has been written"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        rows: List[Dict] = []
+        deadline = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0) if rows else None)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):  # flush() request
+                self._write(rows)
+                rows = []
+                item.set()
+                continue
+
+            if item is not None:
+                if not rows:
+                    deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+                rows.append(item)
+
+            if rows and (item is None or len(rows) >= FLUSH_BATCH_SIZE or time.monotonic() >= deadline):
+                self._write(rows)
+                rows = []
+
+    def _write(self, rows: List[Dict]):
+        if not rows:
+            return
+        try:
+            schema_migrations.ensure_schema(self.db_path)
+            conn = database_pool.connect(self.db_path)
+            with conn:
+                conn.executemany('''
+                    INSERT INTO llm_calls
+                    (created_at, feature, prompt_version, model, streamed, success, error_type, stop_reason,
+                     latency_ms, input_tokens, output_tokens, cache_write_tokens, cache_read_tokens)
+                    VALUES (:created_at, :feature, :prompt_version, :model, :streamed, :success, :error_type,
+                            :stop_reason, :latency_ms, :input_tokens, :output_tokens, :cache_write_tokens,
+                            :cache_read_tokens)
+                ''', rows)
+            conn.close()
+        except Exception as e:
+            print(f"❌ Could not write {len(rows)} LLM telemetry rows: {str(e)}")
+
+
+writer = TelemetryWriter()
+atexit.register(writer.flush)
+
+
+def record_call(model: str, streamed: bool, started: float, message=None, error: Exception = None):
+    """Queue one llm_calls row; message is the final Message (if any arrived)"""
+    usage = getattr(message, 'usage', None)
+    tags = _current_call.get()
+    writer.record({
+        'created_at': datetime.now().isoformat(),
+        'feature': tags['feature'],
+        'prompt_version': tags['prompt_version'],
+        'model': getattr(message, 'model', None) or model,
+        'streamed': streamed,
+        'success': error is None,
+        'error_type': type(error).__name__ if error else None,
+        'stop_reason': getattr(message, 'stop_reason', None),
+        'latency_ms': (time.perf_counter() - started) * 1000,
+        'input_tokens': getattr(usage, 'input_tokens', 0) or 0,
+        'output_tokens': getattr(usage, 'output_tokens', 0) or 0,
+        'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+        'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0
+    })
+
+
+class _InstrumentedStream:
+    """Wraps a MessageStreamManager; records once the `with` block exits"""
+
+    def __init__(self, manager, model: str):
+        self._manager = manager
+        self._model = model
+        self._stream = None
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        try:
+            self._stream = self._manager.__enter__()
+        except Exception as e:
+            record_call(self._model, True, self._started, error=e)
+            raise
+        return self._stream
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            message = self._stream.current_message_snapshot
+        except Exception:
+            message = None
+        record_call(self._model, True, self._started, message, exc_value)
+        return self._manager.__exit__(exc_type, exc_value, traceback)
+
+
+class InstrumentedMessages:
+    def __init__(self, messages):
+        self._messages = messages
+
+    def create(self, **kwargs):
+        started = time.perf_counter()
+        try:
+            message = self._messages.create(**kwargs)
+        except Exception as e:
+            record_call(kwargs.get('model'), bool(kwargs.get('stream')), started, error=e)
+            raise
+        record_call(kwargs.get('model'), bool(kwargs.get('stream')), started, message)
+        return message
+
+    def stream(self, **kwargs):
+        return _InstrumentedStream(self._messages.stream(**kwargs), kwargs.get('model'))
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class InstrumentedAnthropic:
+    """Anthropic client whose messages calls are recorded in llm_calls"""
+
+    def __init__(self, client):
+        self._client = client
+        self.messages = InstrumentedMessages(client.messages)
+
+    def with_options(self, **kwargs) -> 'InstrumentedAnthropic':
+        return InstrumentedAnthropic(self._client.with_options(**kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def get_feature_stats(db_path: str = database_pool.DEFAULT_DB_PATH, days: int = 7) -> List[Dict]:
+    """Per-feature call counts, latency percentiles, tokens per request and estimated cost"""
+    schema_migrations.ensure_schema(db_path)
+    conn = database_pool.connect(db_path)
+    cursor = conn.cursor()
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+
+    cursor.execute('''
+        SELECT feature, model, COUNT(*),
+               SUM(CASE WHEN success THEN 0 ELSE 1 END),
+               SUM(input_tokens), SUM(output_tokens), SUM(cache_write_tokens), SUM(cache_read_tokens)
+        FROM llm_calls
+        WHERE created_at >= ?
+        GROUP BY feature, model
+    ''', (since,))
+    by_model = cursor.fetchall()
+
+    # Nearest-rank percentiles over successful calls
+    cursor.execute('''
+        WITH ranked AS (
+            SELECT feature, latency_ms,
+                   ROW_NUMBER() OVER (PARTITION BY feature ORDER BY latency_ms) AS position,
+                   COUNT(*) OVER (PARTITION BY feature) AS total
+            FROM llm_calls
+            WHERE created_at >= ? AND success
+        )
+        SELECT feature,
+               MAX(CASE WHEN position = CAST(0.50 * (total - 1) AS INTEGER) + 1 THEN latency_ms END),
+               MAX(CASE WHEN position = CAST(0.95 * (total - 1) AS INTEGER) + 1 THEN latency_ms END),
+               MAX(CASE WHEN position = CAST(0.99 * (total - 1) AS INTEGER) + 1 THEN latency_ms END)
+        FROM ranked
+        GROUP BY feature
+    ''', (since,))
+    latencies = {feature: (p50, p95, p99) for feature, p50, p95, p99 in cursor.fetchall()}
+    conn.close()
+
+    stats: Dict[str, Dict] = {}
+    for feature, model, calls, failures, input_tokens, output_tokens, cache_write, cache_read in by_model:
+        entry = stats.setdefault(feature, {
+            'feature': feature, 'calls': 0, 'failures': 0, 'input_tokens': 0, 'output_tokens': 0,
+            'cache_write_tokens': 0, 'cache_read_tokens': 0, 'cost_usd': 0.0
+        })
+        entry['calls'] += calls
+        entry['failures'] += failures
+        entry['input_tokens'] += input_tokens
+        entry['output_tokens'] += output_tokens
+        entry['cache_write_tokens'] += cache_write
+        entry['cache_read_tokens'] += cache_read
+        entry['cost_usd'] += estimate_cost(model, input_tokens, output_tokens, cache_write, cache_read)
+
+    for feature, entry in stats.items():
+        p50, p95, p99 = latencies.get(feature, (None, None, None))
+        prompt_tokens = entry['input_tokens'] + entry['cache_write_tokens'] + entry['cache_read_tokens']
+        entry.update({
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'prompt_tokens_per_call': prompt_tokens / entry['calls'],
+            'output_tokens_per_call': entry['output_tokens'] / entry['calls'],
+            'cache_read_share': entry['cache_read_tokens'] / prompt_tokens if prompt_tokens else 0.0,
+            'cost_per_call_usd': entry['cost_usd'] / entry['calls']
+        })
+
+    return sorted(stats.values(), key=lambda entry: entry['cost_usd'], reverse=True)
@@ -0,0 +1,68 @@
+# llm_telemetry_dashboard.py - Admin view of AI usage: streamlit run llm_telemetry_dashboard.py
+# Per-feature latency, tokens and estimated cost from llm_calls, to pick which prompts to shrink or cache
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import database_pool
+from llm_telemetry import get_feature_stats
+from structured_milestones import get_parse_failure_rate
+
+st.set_page_config(
+    page_title="AI Usage | Career Pathway Explorer",
+    page_icon="📈",
+    layout="wide"
+)
+
+
+def show_llm_telemetry_dashboard(db_path: str = database_pool.DEFAULT_DB_PATH):
+    """Per-feature latency, token and cost summary"""
+    st.markdown("## 📈 AI Usage & Latency")
+
+    days = st.selectbox("Period", [1, 7, 30], index=1, format_func=lambda d: f"Last {d} day{'s' if d > 1 else ''}")
+    stats = get_feature_stats(db_path, days)
+
+    if not stats:
+        st.info("No AI calls recorded in this period yet.")
+        return
+
+    total_calls = sum(entry['calls'] for entry in stats)
+    total_cost = sum(entry['cost_usd'] for entry in stats)
+    total_failures = sum(entry['failures'] for entry in stats)
+    parse_stats = get_parse_failure_rate(db_path, days)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("AI Calls", f"{total_calls:,}")
+    col2.metric("Estimated Cost", f"${total_cost:,.2f}")
+    col3.metric("Failed Calls", f"{total_failures / total_calls:.1%}")
+    col4.metric("Milestone Parse Failures", f"{parse_stats['parse_failure_rate']:.1%}")
+
+    df = pd.DataFrame(stats)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.bar(df, x='feature', y=['p50_ms', 'p95_ms'], barmode='group',
+                     title="Latency by Feature (ms)", labels={'value': 'ms', 'variable': ''})
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = px.bar(df, x='feature', y=['prompt_tokens_per_call', 'output_tokens_per_call'], barmode='stack',
+                     title="Tokens per Call", labels={'value': 'tokens', 'variable': ''})
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("#### Per-Feature Breakdown")
+    table = df[['feature', 'calls', 'failures', 'p50_ms', 'p95_ms', 'p99_ms', 'prompt_tokens_per_call',
+                'output_tokens_per_call', 'cache_read_share', 'cost_per_call_usd', 'cost_usd']].rename(columns={
+        'feature': 'Feature', 'calls': 'Calls', 'failures': 'Failures', 'p50_ms': 'p50 ms', 'p95_ms': 'p95 ms',
+        'p99_ms': 'p99 ms', 'prompt_tokens_per_call': 'Prompt tokens/call',
+        'output_tokens_per_call': 'Output tokens/call', 'cache_read_share': 'Cached prompt share',
+        'cost_per_call_usd': 'Cost/call ($)', 'cost_usd': 'Cost ($)'
+    })
+    st.dataframe(table.style.format({
+        'p50 ms': '{:.0f}', 'p95 ms': '{:.0f}', 'p99 ms': '{:.0f}', 'Prompt tokens/call': '{:.0f}',
+        'Output tokens/call': '{:.0f}', 'Cached prompt share': '{:.0%}', 'Cost/call ($)': '{:.4f}',
+        'Cost ($)': '{:.2f}'
+    }, na_rep='-'), use_container_width=True, hide_index=True)
+
+
+if __name__ == "__main__":
+    show_llm_telemetry_dashboard()
@@ -0,0 +1,188 @@
+# load_test_ai.py - Drive the AI features with N concurrent simulated students: python load_test_ai.py
+# Runs against mock_anthropic_server by default (no network, no spend) and a scratch copy of the
+# database, then reports p50/p95/p99 latency and throughput per scenario
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from mock_anthropic_server import MockAnthropicServer, add_mock_arguments, config_from_args
+
+SCENARIOS = ["study_plan", "chat", "milestone_generator"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class LoadTestResults:
+    """Thread-safe latency samples per scenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, scenario: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies.setdefault(scenario, []).append(seconds)
+            if not ok:
+                self.failures[scenario] = self.failures.get(scenario, 0) + 1
+
+    def report(self, wall_seconds: float):
+        print(f"\n📊 {'scenario':<20} {'calls':>6} {'fail':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'req/s':>7}")
+        for scenario, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            print(f"   {scenario:<20} {len(ordered):>6} {self.failures.get(scenario, 0):>5} "
+                  f"{percentile(ordered, 0.50) * 1000:>8.0f} {percentile(ordered, 0.95) * 1000:>8.0f} "
+                  f"{percentile(ordered, 0.99) * 1000:>8.0f} {statistics.mean(ordered) * 1000:>8.0f} "
+                  f"{len(ordered) / wall_seconds:>7.1f}")
+
+
+class SimulatedStudent:
+    """One student's session: an agent, a chat history and some assignments"""
+
+    def __init__(self, index: int, app, family_id: str):
+        self.app = app
+        self.student = {
+            'id': f"loadtest-student-{index}",
+            'name': f"Student {index}",
+            'age': 16,
+            'year_level': 11,
+            'interests': ['engineering', 'design'],
+            'timeline': 'Finishing school in 2027',
+            'location_preference': 'Newcastle',
+            'goals': ['Get into university']
+        }
+        self.family_info = {'id': family_id}
+        self.history: List[Dict] = []
+
+    def assignment(self) -> Dict:
+        # Unique content so the study plan cache doesn't absorb the load
+        due = datetime.now() + timedelta(days=14)
+        return {
+            'assignment_id': f"loadtest-{uuid.uuid4().hex[:12]}",
+            'assignment_name': f"Assessment Task #{uuid.uuid4().hex[:6]} - Research Report",
+            'course_name': 'Year 11 Science',
+            'due_date': due.isoformat(),
+            'points_possible': 100,
+            'description': 'Investigate a local environmental issue and present your findings.'
+        }
+
+    def study_plan(self, agent) -> bool:
+        assignment = self.assignment()
+        milestones = agent.generate_ai_study_plan(assignment['assignment_name'], assignment['due_date'],
+                                                  assignment['description'])
+        return bool(milestones)
+
+    def chat(self, agent) -> bool:
+        before = len(self.history)
+        self.app.handle_career_conversation(self.student, self.family_info,
+                                            "What should I study if I like building things?", self.history)
+        return len(self.history) > before
+
+    def milestone_generator(self, generator) -> bool:
+        return bool(generator.generate_milestones_for_assignment(self.student['id'], self.assignment()))
+
+
+def run_load_test(students: int, iterations: int, scenarios: List[str], db_path: str,
+                  tokens_per_minute: float = None) -> LoadTestResults:
+    # Imported here so ANTHROPIC_BASE_URL / ANTHROPIC_API_KEY are already set
+    import streamlit as st
+    import secure_family_web_app as app
+    from ai_milestone_generator import AIStudyMilestoneGenerator
+    from multi_family_database import MultiFamilyDatabase
+    from rate_limiter import ApiKeyLimits
+
+    import llm_telemetry
+    llm_telemetry.writer.db_path = db_path
+
+    db = MultiFamilyDatabase(db_path)
+    st.session_state.secure_db = db
+    agent = app.SecureFamilyCareerAgent()
+    if tokens_per_minute:
+        agent.api_limits = ApiKeyLimits(max(students, 1), tokens_per_minute)
+    st.session_state.career_agent = agent
+    generator = AIStudyMilestoneGenerator(db_path)
+
+    family_id = f"loadtest-family-{uuid.uuid4().hex[:8]}"
+    simulated = [SimulatedStudent(i, app, family_id) for i in range(students)]
+    targets: Dict[str, Callable] = {
+        'study_plan': lambda student: student.study_plan(agent),
+        'chat': lambda student: student.chat(agent),
+        'milestone_generator': lambda student: student.milestone_generator(generator),
+    }
+    results = LoadTestResults()
+
+    def session(student: SimulatedStudent):
+        for i in range(iterations):
+            scenario = scenarios[i % len(scenarios)]
+            started = time.perf_counter()
+            try:
+                ok = targets[scenario](student)
+            except Exception as e:
+                print(f"❌ {scenario} raised: {str(e)}")
+                ok = False
+            results.record(scenario, time.perf_counter() - started, ok)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=students) as executor:
+        list(executor.map(session, simulated))
+    results.report(time.perf_counter() - started)
+
+    llm_telemetry.writer.flush()
+    print(f"\n📈 {'feature':<22} {'calls':>6} {'p95 ms':>8} {'tokens/call':>12} {'cost $':>8}")
+    for entry in llm_telemetry.get_feature_stats(db_path, days=1):
+        print(f"   {entry['feature']:<22} {entry['calls']:>6} {entry['p95_ms'] or 0:>8.0f} "
+              f"{entry['prompt_tokens_per_call'] + entry['output_tokens_per_call']:>12.0f} {entry['cost_usd']:>8.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the AI features against a mock (or real) Messages API")
+    parser.add_argument("--students", type=int, default=20, help="Concurrent simulated students")
+    parser.add_argument("--iterations", type=int, default=5, help="Requests per student")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--db", default="community_career_explorer.db",
+                        help="Database to copy; the test never writes to it")
+    parser.add_argument("--base-url", default=None,
+                        help="Use an already running API (e.g. the real one) instead of starting the mock")
+    parser.add_argument("--tokens-per-minute", type=float, default=None,
+                        help="Override the per-key token budget (defaults to the app's)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url:
+        os.environ["ANTHROPIC_BASE_URL"] = args.base_url
+    else:
+        server = MockAnthropicServer(config_from_args(args))
+        os.environ["ANTHROPIC_BASE_URL"] = server.start()
+        os.environ.setdefault("ANTHROPIC_API_KEY", "mock-key")
+    print(f"🧪 {args.students} students x {args.iterations} requests against {os.environ['ANTHROPIC_BASE_URL']}")
+
+    scratch_dir = tempfile.mkdtemp(prefix="ai-load-test-")
+    scratch_db = os.path.join(scratch_dir, "load_test.db")
+    if os.path.exists(args.db):
+        shutil.copy(args.db, scratch_db)
+
+    try:
+        run_load_test(args.students, args.iterations,
+                      SCENARIOS if args.scenario == "all" else [args.scenario],
+                      scratch_db, args.tokens_per_minute)
+        if server:
+            print(f"\n🖥️ Mock server: {server.stats}")
+    finally:
+        if server:
+            server.stop()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
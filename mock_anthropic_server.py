@@ -0,0 +1,262 @@
+# mock_anthropic_server.py - Local stand-in for the Anthropic Messages API: python mock_anthropic_server.py
+# Point the app at it with ANTHROPIC_BASE_URL=http://127.0.0.1:8089 (any API key works).
+# Serves canned study plans (record_study_plan tool calls) and counsellor replies, streamed or not,
+# with a configurable latency distribution and injected errors, so AI paths can be load tested offline
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from structured_milestones import TOOL_NAME
+
+CANNED_MILESTONES = [
+    {"title": "Unpack the Task", "description": "Read the task notification and marking criteria, highlight the verbs and list what has to be handed in.",
+     "type": "planning", "days_before_due": 10, "estimated_hours": 1},
+    {"title": "Research & Notes", "description": "Gather 4-5 reliable sources and take structured notes against each criterion.",
+     "type": "research", "days_before_due": 7, "estimated_hours": 3},
+    {"title": "First Draft", "description": "Write a complete first draft from your outline without stopping to polish.",
+     "type": "draft", "days_before_due": 4, "estimated_hours": 4},
+    {"title": "Review & Submit", "description": "Check against the marking criteria, proofread, fix references and submit early.",
+     "type": "finalise", "days_before_due": 1, "estimated_hours": 2},
+]
+
+CANNED_CHAT_REPLY = (
+    "That's a really thoughtful question, and it's great that you're thinking about it now. "
+    "Students with interests like yours often do well in courses that mix hands-on work with theory - "
+    "at Newcastle and Macquarie, for example, you can combine a practical major with a broader degree, "
+    "and ATAR entry is usually in the 70-85 range. The best next step is to pick two or three courses "
+    "and look at their first-year subjects to see which ones genuinely excite you. "
+    "What part of that kind of work do you think you'd enjoy most day to day?"
+)
+
+ERROR_TYPES = {
+    429: "rate_limit_error",
+    500: "api_error",
+    529: "overloaded_error",
+}
+
+
+class MockConfig:
+    """Latency, streaming speed and error injection for the mock server"""
+
+    def __init__(self, median_ms: float = 800.0, p99_ms: float = 4000.0, token_delay_ms: float = 10.0,
+                 error_rate: float = 0.0, error_statuses: List[int] = None, hang_rate: float = 0.0,
+                 hang_seconds: float = 120.0, seed: Optional[int] = None):
+        self.median_ms = median_ms
+        self.p99_ms = max(p99_ms, median_ms)
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 529]
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Seconds before the first byte: log-normal with the configured median and p99"""
+        sigma = math.log(self.p99_ms / self.median_ms) / 2.326 if self.p99_ms > self.median_ms else 0.0
+        with self.lock:
+            z = self.random.gauss(0.0, 1.0)
+        return self.median_ms * math.exp(sigma * z) / 1000.0
+
+    def sample_fault(self) -> Optional[str]:
+        """None, 'hang' or an HTTP status to fail with"""
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.hang_rate:
+                return 'hang'
+            if roll < self.hang_rate + self.error_rate:
+                return self.random.choice(self.error_statuses)
+        return None
+
+
+def estimate_tokens(value) -> int:
+    return len(json.dumps(value)) // 4 + 1
+
+
+def build_content(request: Dict) -> List[Dict]:
+    """Tool call for study plan requests, canned counsellor text for everything else"""
+    tool_names = [tool.get('name') for tool in request.get('tools') or []]
+    if TOOL_NAME in tool_names:
+        return [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": TOOL_NAME,
+                 "input": {"milestones": CANNED_MILESTONES}}]
+    return [{"type": "text", "text": CANNED_CHAT_REPLY}]
+
+
+def chunk_text(text: str, size: int) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class MockMessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockAnthropic/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Keep load test output readable
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        if self.path.split('?')[0] != '/v1/messages':
+            self._send_error(404, "not_found_error", f"Unknown path {self.path}")
+            return
+
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            self._send_error(400, "invalid_request_error", "Body is not JSON")
+            return
+
+        config: MockConfig = self.server.config
+        self.server.record('requests')
+
+        fault = config.sample_fault()
+        if fault == 'hang':
+            self.server.record('hangs')
+            time.sleep(config.hang_seconds)
+            return
+        time.sleep(config.sample_latency())
+        if fault:
+            self.server.record('errors')
+            self._send_error(fault, ERROR_TYPES.get(fault, "api_error"), "Injected failure")
+            return
+
+        content = build_content(request)
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get('model', 'mock'),
+            "content": content,
+            "stop_reason": "tool_use" if content[0]["type"] == "tool_use" else "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": estimate_tokens(request.get('messages')) + estimate_tokens(request.get('system', '')),
+                "output_tokens": estimate_tokens(content),
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0
+            }
+        }
+
+        if request.get('stream'):
+            self._stream(message, config)
+        else:
+            self._send_json(200, message)
+
+    def _stream(self, message: Dict, config: MockConfig):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        content = message["content"]
+        start = dict(message, content=[], stop_reason=None,
+                     usage=dict(message["usage"], output_tokens=1))
+        self._event("message_start", {"type": "message_start", "message": start})
+
+        for index, block in enumerate(content):
+            if block["type"] == "tool_use":
+                self._event("content_block_start", {"type": "content_block_start", "index": index,
+                                                    "content_block": dict(block, input={})})
+                deltas = [{"type": "input_json_delta", "partial_json": part}
+                          for part in chunk_text(json.dumps(block["input"]), 24)]
+            else:
+                self._event("content_block_start", {"type": "content_block_start", "index": index,
+                                                    "content_block": {"type": "text", "text": ""}})
+                deltas = [{"type": "text_delta", "text": part} for part in chunk_text(block["text"], 12)]
+
+            for delta in deltas:
+                time.sleep(config.token_delay_ms / 1000.0)
+                self._event("content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta})
+            self._event("content_block_stop", {"type": "content_block_stop", "index": index})
+
+        self._event("message_delta", {"type": "message_delta",
+                                      "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                      "usage": {"output_tokens": message["usage"]["output_tokens"]}})
+        self._event("message_stop", {"type": "message_stop"})
+
+    def _event(self, name: str, data: Dict):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('request-id', f"req_{uuid.uuid4().hex[:24]}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, error_type: str, message: str):
+        headers = {'retry-after': '1'} if status == 429 else {}
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+
+class MockAnthropicServer(ThreadingHTTPServer):
+    """Threaded mock Messages API server; start() runs it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockMessagesHandler)
+        self.config = config or MockConfig()
+        self.stats = {'requests': 0, 'errors': 0, 'hangs': 0}
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-anthropic", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--median-ms", type=float, default=800.0, help="Median time to first byte")
+    parser.add_argument("--p99-ms", type=float, default=4000.0, help="99th percentile time to first byte")
+    parser.add_argument("--token-delay-ms", type=float, default=10.0, help="Delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 429/500/529")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Share of requests that never answer")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(median_ms=args.median_ms, p99_ms=args.p99_ms, token_delay_ms=args.token_delay_ms,
+                      error_rate=args.error_rate, hang_rate=args.hang_rate, seed=args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Anthropic Messages API")
+    parser.add_argument("--port", type=int, default=8089)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockAnthropicServer(config_from_args(args), port=args.port)
+    print(f"🧪 Mock Anthropic API on {server.base_url} - set ANTHROPIC_BASE_URL to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -3,107 +3,20 @@ import json
 from datetime import datetime
 from typing import Dict, List, Optional
 import uuid
+import database_pool
+import schema_migrations
 
 
 class MultiFamilyDatabase:
     def __init__(self, db_path="community_career_explorer.db"):
         self.db_path = db_path
-        self.init_database()
-
-    def init_database(self):
-        """Initialize database with multi-family support"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Families table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS families (
-                id TEXT PRIMARY KEY,
-                family_name TEXT NOT NULL,
-                email TEXT,
-                location TEXT,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_active DATETIME DEFAULT CURRENT_TIMESTAMP,
-                settings TEXT DEFAULT '{}'
-            )
-        ''')
-
-        # Students table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id TEXT PRIMARY KEY,
-                family_id TEXT,
-                name TEXT NOT NULL,
-                age INTEGER,
-                year_level INTEGER,
-                interests TEXT,
-                preferences TEXT,
-                timeline TEXT,
-                location_preference TEXT,
-                career_considerations TEXT,
-                goals TEXT,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (family_id) REFERENCES families (id)
-            )
-        ''')
-
-        # Conversations table (enhanced)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                family_id TEXT,
-                student_id TEXT,
-                student_name TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_message TEXT,
-                agent_response TEXT,
-                topic_tags TEXT,
-                session_id TEXT,
-                FOREIGN KEY (family_id) REFERENCES families (id),
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-
-        # Applications tracking (enhanced)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                family_id TEXT,
-                student_id TEXT,
-                student_name TEXT,
-                university TEXT,
-                course TEXT,
-                deadline DATE,
-                status TEXT DEFAULT 'planned',
-                notes TEXT,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (family_id) REFERENCES families (id),
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-
-        # Platform analytics
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS platform_analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date DATE DEFAULT CURRENT_DATE,
-                total_families INTEGER DEFAULT 0,
-                total_students INTEGER DEFAULT 0,
-                total_conversations INTEGER DEFAULT 0,
-                total_reports_generated INTEGER DEFAULT 0,
-                active_families_today INTEGER DEFAULT 0
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
-        print("✅ Multi-family database initialized")
+        schema_migrations.ensure_schema(self.db_path)
 
     def create_family(self, family_name: str, email: str = "", location: str = "") -> str:
         """Create a new family"""
         family_id = str(uuid.uuid4())
 
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -121,7 +34,7 @@ class MultiFamilyDatabase:
         """Add a student to a family"""
         student_id = str(uuid.uuid4())
 
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -147,7 +60,7 @@ class MultiFamilyDatabase:
 
     def get_all_families(self) -> List[Dict]:
         """Get all families"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -175,7 +88,7 @@ class MultiFamilyDatabase:
 
     def get_family_students(self, family_id: str) -> List[Dict]:
         """Get all students for a family"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -205,7 +118,7 @@ class MultiFamilyDatabase:
     def save_conversation(self, family_id: str, student_id: str, student_name: str,
                           user_message: str, agent_response: str, topics: List[str] = None):
         """Save conversation with family context"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         topic_tags = ','.join(topics) if topics else ''
@@ -229,7 +142,7 @@ class MultiFamilyDatabase:
 
     def get_platform_analytics(self) -> Dict:
         """Get platform-wide analytics"""
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         # Total families
@@ -294,16 +207,9 @@ class MultiFamilyDatabase:
         # Generate unique access code (8 characters)
         access_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
 
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
-        # Ensure access_code column exists
-        try:
-            cursor.execute('ALTER TABLE families ADD COLUMN access_code TEXT')
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-
         # Check if access code already exists (very unlikely but be safe)
         max_attempts = 10
         attempts = 0
@@ -340,7 +246,7 @@ class MultiFamilyDatabase:
         if not access_code or len(access_code.strip()) < 6:
             return None
 
-        conn = sqlite3.connect(self.db_path)
+        conn = database_pool.connect(self.db_path)
         cursor = conn.cursor()
 
         try:
@@ -379,81 +285,10 @@ class MultiFamilyDatabase:
         finally:
             conn.close()
 
-    # Add this method to your MultiFamilyDatabase class in multi_family_database.py
-
-    def init_canvas_tables(self):
-        """Initialize Canvas integration tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Canvas credentials table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_credentials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                canvas_url TEXT,
-                access_token TEXT,
-                student_name TEXT,
-                canvas_user_id TEXT,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_sync DATETIME,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                UNIQUE(student_id)
-            )
-        ''')
-
-        # Canvas assignments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_assignments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                course_name TEXT,
-                assignment_name TEXT,
-                due_date DATETIME,
-                points_possible REAL,
-                description TEXT,
-                html_url TEXT,
-                is_quiz BOOLEAN DEFAULT FALSE,
-                last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                UNIQUE(student_id, assignment_id)
-            )
-        ''')
-
-        # Simple milestones table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS simple_milestones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                assignment_name TEXT,
-                title TEXT,
-                description TEXT,
-                target_date TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
-        print("✅ Canvas tables initialized")
-
-    # Also update your init_database method to call this:
-    def init_database(self):
-        """Initialize database with multi-family support"""
-        # ... your existing code ...
-
-        # Add this line at the end of your existing init_database method:
-        self.init_canvas_tables()
-
     def test_database_connection(self):
         """Test database connection and show sample data"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             # Test connection
@@ -2,11 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
-import anthropic
-import os
 import json
-from dotenv import load_dotenv
 from multi_family_database import MultiFamilyDatabase
+from anthropic_client import get_client
 
 # Page configuration
 st.set_page_config(
@@ -420,13 +418,7 @@ st.markdown("""
 
 class SecureFamilyCareerAgent:
     def __init__(self):
-        try:
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-        except:
-            load_dotenv()
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_client()
 
         if 'secure_db' not in st.session_state:
             st.session_state.secure_db = MultiFamilyDatabase()
@@ -0,0 +1,134 @@
+# occupation_repository.py - The crawled Job Outlook catalogue, queried locally by the chat and dashboards
+# job_outlook_crawler fills the table; reads never touch the network
+import re
+from typing import Dict, List, Optional
+
+import database_pool
+import schema_migrations
+
+OCCUPATION_COLUMNS = ['slug', 'title', 'url', 'employment_outlook', 'weekly_earnings', 'weekly_earnings_value',
+                      'employment_size', 'employment_size_value', 'growth_forecast', 'growth_forecast_pct',
+                      'crawled_at', 'updated_at']
+
+# Sort orders the dashboards may ask for
+RANKINGS = {
+    'earnings': 'weekly_earnings_value',
+    'growth': 'growth_forecast_pct',
+    'size': 'employment_size_value'
+}
+
+# Words in a chat message that say nothing about which occupation it's about
+STOP_WORDS = {
+    'about', 'after', 'also', 'been', 'best', 'could', 'does', 'doing', 'from', 'have', 'into', 'just', 'know',
+    'like', 'looking', 'maybe', 'more', 'much', 'need', 'really', 'should', 'some', 'study', 'than', 'that',
+    'them', 'then', 'there', 'they', 'thing', 'things', 'think', 'this', 'want', 'what', 'when', 'where',
+    'which', 'while', 'will', 'with', 'work', 'would', 'year', 'your', 'career', 'careers', 'job', 'jobs'
+}
+MIN_WORD_LENGTH = 4
+
+
+def parse_number(value: str) -> Optional[float]:
+    """First number in a figure like '$1,900 per week' or '7.8% growth forecast'"""
+    match = re.search(r'\d[\d,]*(?:\.\d+)?', value or '')
+    return float(match.group().replace(',', '')) if match else None
+
+
+def upsert_occupation(cursor, occupation: Dict):
+    """Insert or refresh one occupation and its search entry, inside the caller's transaction"""
+    earnings = parse_number(occupation.get('weekly_earnings'))
+    size = parse_number(occupation.get('employment_size'))
+    cursor.execute('''
+        INSERT INTO occupations
+        (slug, title, url, employment_outlook, weekly_earnings, weekly_earnings_value, employment_size,
+         employment_size_value, growth_forecast, growth_forecast_pct, content_hash, crawled_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(slug) DO UPDATE SET
+            title = excluded.title,
+            url = excluded.url,
+            employment_outlook = excluded.employment_outlook,
+            weekly_earnings = excluded.weekly_earnings,
+            weekly_earnings_value = excluded.weekly_earnings_value,
+            employment_size = excluded.employment_size,
+            employment_size_value = excluded.employment_size_value,
+            growth_forecast = excluded.growth_forecast,
+            growth_forecast_pct = excluded.growth_forecast_pct,
+            content_hash = excluded.content_hash,
+            crawled_at = excluded.crawled_at,
+            updated_at = excluded.updated_at
+    ''', (
+        occupation['slug'], occupation['title'], occupation['url'], occupation.get('employment_outlook'),
+        occupation.get('weekly_earnings'), int(earnings) if earnings is not None else None,
+        occupation.get('employment_size'), int(size) if size is not None else None,
+        occupation.get('growth_forecast'), parse_number(occupation.get('growth_forecast')),
+        occupation.get('content_hash'), occupation['crawled_at'], occupation['crawled_at']
+    ))
+    cursor.execute('DELETE FROM occupations_fts WHERE slug = ?', (occupation['slug'],))
+    cursor.execute('INSERT INTO occupations_fts (slug, title) VALUES (?, ?)', (occupation['slug'], occupation['title']))
+
+
+def delete_occupation(cursor, slug: str):
+    """Drop an occupation that no longer exists on Job Outlook"""
+    cursor.execute('DELETE FROM occupations WHERE slug = ?', (slug,))
+    cursor.execute('DELETE FROM occupations_fts WHERE slug = ?', (slug,))
+
+
+class OccupationRepository:
+    """Read access to the local occupations table"""
+
+    def __init__(self, db_path=database_pool.DEFAULT_DB_PATH):
+        self.db_path = db_path
+        schema_migrations.ensure_schema(self.db_path)
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = [dict(zip(OCCUPATION_COLUMNS, row)) for row in cursor.fetchall()]
+        conn.close()
+        return rows
+
+    def count(self) -> int:
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM occupations')
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def get(self, slug: str) -> Optional[Dict]:
+        rows = self._query(f'SELECT {", ".join(OCCUPATION_COLUMNS)} FROM occupations WHERE slug = ?', (slug,))
+        return rows[0] if rows else None
+
+    def _match(self, fts_query: str, limit: int) -> List[Dict]:
+        if not fts_query:
+            return []
+        columns = ', '.join(f'o.{column}' for column in OCCUPATION_COLUMNS)
+        return self._query(f'''
+            SELECT {columns}
+            FROM occupations_fts
+            JOIN occupations o ON o.slug = occupations_fts.slug
+            WHERE occupations_fts MATCH ?
+            ORDER BY bm25(occupations_fts)
+            LIMIT ?
+        ''', (fts_query, limit))
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Occupations whose title contains every word typed so far (the last one as a prefix)"""
+        words = re.findall(r'[a-z0-9]+', (query or '').lower())
+        return self._match(' '.join(f'"{word}"*' for word in words), limit)
+
+    def find_mentioned(self, message: str, limit: int = 3) -> List[Dict]:
+        """Best-matching occupations for the words in a chat message"""
+        words = {word for word in re.findall(r'[a-z]+', (message or '').lower())
+                 if len(word) >= MIN_WORD_LENGTH and word not in STOP_WORDS}
+        return self._match(' OR '.join(f'"{word}"' for word in sorted(words)), limit)
+
+    def top(self, ranking: str = 'earnings', limit: int = 10) -> List[Dict]:
+        """Highest-ranked occupations by earnings, growth or workforce size"""
+        column = RANKINGS[ranking]
+        return self._query(f'''
+            SELECT {", ".join(OCCUPATION_COLUMNS)} FROM occupations
+            WHERE {column} IS NOT NULL
+            ORDER BY {column} DESC
+            LIMIT ?
+        ''', (limit,))
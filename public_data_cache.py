@@ -0,0 +1,95 @@
+# public_data_cache.py - HTTP cache for public data pages (ABS, Job Outlook), kept in SQLite
+# Only the live data collector reads through it; Canvas and other authenticated requests are never cached.
+# Fresh pages are served without a request, stale ones are revalidated with If-None-Match /
+# If-Modified-Since so an unchanged page costs a 304 rather than a download
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import database_pool
+import schema_migrations
+
+# How long each source's pages are served without asking the server again
+SOURCE_TTL_SECONDS = {
+    'abs': 6 * 3600,  # Labour Force figures are released monthly
+    'job_outlook': 24 * 3600
+}
+DEFAULT_TTL_SECONDS = 3600
+
+
+@dataclass
+class CachedPage:
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: datetime
+
+    def is_fresh(self) -> bool:
+        return datetime.now() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators for revalidating this copy with the server"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PublicDataCache:
+    """Cached public pages with per-source freshness and ETag / Last-Modified validators"""
+
+    def __init__(self, db_path=database_pool.DEFAULT_DB_PATH, ttl_seconds: Dict[str, float] = None):
+        self.db_path = db_path
+        self.ttl_seconds = dict(SOURCE_TTL_SECONDS, **(ttl_seconds or {}))
+        schema_migrations.ensure_schema(self.db_path)
+
+    def expiry_for(self, source: str) -> datetime:
+        return datetime.now() + timedelta(seconds=self.ttl_seconds.get(source, DEFAULT_TTL_SECONDS))
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """The cached copy of url (fresh or not), or None"""
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT body, etag, last_modified, expires_at FROM public_http_cache WHERE url = ?
+        ''', (url,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        body, etag, last_modified, expires_at = row
+        return CachedPage(url, body, etag, last_modified, datetime.fromisoformat(expires_at))
+
+    def store(self, url: str, source: str, body: bytes, etag: Optional[str] = None,
+              last_modified: Optional[str] = None):
+        """Save a freshly downloaded page"""
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            conn.execute('''
+                INSERT INTO public_http_cache (url, source, body, etag, last_modified, fetched_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    source = excluded.source,
+                    body = excluded.body,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at,
+                    expires_at = excluded.expires_at
+            ''', (url, source, body, etag, last_modified, datetime.now().isoformat(),
+                  self.expiry_for(source).isoformat()))
+        conn.close()
+
+    def revalidated(self, url: str, source: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """The server answered 304: keep the body, restart its freshness and take any new validators"""
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            conn.execute('''
+                UPDATE public_http_cache
+                SET expires_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+            ''', (self.expiry_for(source).isoformat(), etag, last_modified, url))
+        conn.close()
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available; returns 0 on success, otherwise seconds to wait before retrying"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        """Block the calling thread until tokens are available"""
+        # Requests larger than the bucket can never be satisfied in one go - cap them
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1):
+        """Wait for tokens without blocking the event loop"""
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class ApiKeyLimits:
+    """Concurrency cap plus a token-per-minute budget for one API key"""
+
+    def __init__(self, max_concurrent: int, tokens_per_minute: float):
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.tokens = TokenBucket(rate=tokens_per_minute / 60.0, capacity=tokens_per_minute)
+
+    @contextmanager
+    def reserve(self, estimated_tokens: float):
+        """Hold a concurrency slot and spend the estimated tokens for the duration of one call"""
+        self.tokens.acquire(estimated_tokens)
+        with self.semaphore:
+            yield
+
+
+class HostRateLimiter:
+    """One token bucket per host, so each server sees at most its own requests-per-second rate"""
+
+    def __init__(self, default_rate: float, host_rates: Dict[str, float] = None, burst: float = 1):
+        self.default_rate = default_rate
+        self.host_rates = host_rates or {}
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                rate = self.host_rates.get(host, self.default_rate)
+                self._buckets[host] = TokenBucket(rate=rate, capacity=self.burst)
+            return self._buckets[host]
+
+    async def acquire_async(self, url: str):
+        """Wait for the URL's host to have a request slot, without blocking the event loop"""
+        await self.bucket_for(url).acquire_async()
+
+
+_api_key_limits: Dict[str, ApiKeyLimits] = {}
+_api_key_limits_lock = threading.Lock()
+
+
+def limits_for_api_key(api_key: str, max_concurrent: int = 4, tokens_per_minute: float = 40000) -> ApiKeyLimits:
+    """Shared limits per API key, so every caller in the process draws on the same budget"""
+    # Key the registry by a digest so the raw key isn't kept around
+    key = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+    with _api_key_limits_lock:
+        if key not in _api_key_limits:
+            _api_key_limits[key] = ApiKeyLimits(max_concurrent, tokens_per_minute)
+        return _api_key_limits[key]
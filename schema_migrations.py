@@ -0,0 +1,604 @@
+# schema_migrations.py - Versioned schema for community_career_explorer.db
+# Run once per process via ensure_schema(); add new changes as a new numbered migration, never edit old ones
+import sqlite3
+import threading
+from typing import Callable, List, Tuple
+from urllib.parse import urlparse
+
+import database_pool
+from assignment_categories import categorize_assignment
+
+DEFAULT_DB_PATH = "community_career_explorer.db"
+
+
+def _add_column(cursor, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN unless the column is already there (older databases grew columns ad hoc)"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _001_base_tables(cursor):
+    """Families, students, conversations, auth and Canvas tables"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS families (
+            id TEXT PRIMARY KEY,
+            family_name TEXT NOT NULL,
+            email TEXT,
+            location TEXT,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_active DATETIME DEFAULT CURRENT_TIMESTAMP,
+            settings TEXT DEFAULT '{}'
+        )
+    ''')
+    _add_column(cursor, 'families', 'access_code', 'TEXT')
+    _add_column(cursor, 'families', 'password_hash', 'TEXT')
+    _add_column(cursor, 'families', 'email_verified', 'BOOLEAN DEFAULT TRUE')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS students (
+            id TEXT PRIMARY KEY,
+            family_id TEXT,
+            name TEXT NOT NULL,
+            age INTEGER,
+            year_level INTEGER,
+            interests TEXT,
+            preferences TEXT,
+            timeline TEXT,
+            location_preference TEXT,
+            career_considerations TEXT,
+            goals TEXT,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (family_id) REFERENCES families (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            family_id TEXT,
+            student_id TEXT,
+            student_name TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_message TEXT,
+            agent_response TEXT,
+            topic_tags TEXT,
+            session_id TEXT,
+            FOREIGN KEY (family_id) REFERENCES families (id),
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            family_id TEXT,
+            student_id TEXT,
+            student_name TEXT,
+            university TEXT,
+            course TEXT,
+            deadline DATE,
+            status TEXT DEFAULT 'planned',
+            notes TEXT,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (family_id) REFERENCES families (id),
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS platform_analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE DEFAULT CURRENT_DATE,
+            total_families INTEGER DEFAULT 0,
+            total_students INTEGER DEFAULT 0,
+            total_conversations INTEGER DEFAULT 0,
+            total_reports_generated INTEGER DEFAULT 0,
+            active_families_today INTEGER DEFAULT 0
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id TEXT PRIMARY KEY,
+            family_id TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME,
+            user_agent TEXT,
+            ip_address TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            FOREIGN KEY (family_id) REFERENCES families (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS login_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            family_id TEXT,
+            login_method TEXT,
+            login_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+            success BOOLEAN DEFAULT TRUE,
+            FOREIGN KEY (family_id) REFERENCES families (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS canvas_credentials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT,
+            canvas_url TEXT,
+            access_token TEXT,
+            student_name TEXT,
+            canvas_user_id TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_sync DATETIME,
+            FOREIGN KEY (student_id) REFERENCES students (id),
+            UNIQUE(student_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS canvas_assignments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT,
+            assignment_id TEXT,
+            course_name TEXT,
+            assignment_name TEXT,
+            due_date DATETIME,
+            points_possible REAL,
+            description TEXT,
+            html_url TEXT,
+            is_quiz BOOLEAN DEFAULT FALSE,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students (id),
+            UNIQUE(student_id, assignment_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS simple_milestones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT,
+            assignment_id TEXT,
+            assignment_name TEXT,
+            title TEXT,
+            description TEXT,
+            target_date TEXT,
+            completed BOOLEAN DEFAULT FALSE,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS milestone_generation_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT,
+            assignment_id TEXT,
+            generation_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            success BOOLEAN,
+            error_message TEXT,
+            milestones_generated INTEGER DEFAULT 0
+        )
+    ''')
+
+
+def _002_study_milestones(cursor):
+    """One study_milestones layout for the web app and the AI generator"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS study_milestones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id TEXT,
+            assignment_id TEXT,
+            assignment_name TEXT,
+            course_name TEXT,
+            title TEXT,
+            description TEXT,
+            milestone_type TEXT,
+            target_date TEXT,
+            completed BOOLEAN DEFAULT FALSE,
+            completed_date DATETIME,
+            ai_generated BOOLEAN DEFAULT TRUE,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+
+    # Databases created by either of the old layouts pick up the columns they were missing
+    for column, definition in (('course_name', 'TEXT'), ('title', 'TEXT'), ('description', 'TEXT'),
+                               ('milestone_type', 'TEXT'), ('completed_date', 'DATETIME'),
+                               ('ai_generated', 'BOOLEAN DEFAULT TRUE')):
+        _add_column(cursor, 'study_milestones', column, definition)
+
+    # The AI generator used to write milestone_title/milestone_description
+    cursor.execute('PRAGMA table_info(study_milestones)')
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'milestone_title' in columns:
+        cursor.execute('''
+            UPDATE study_milestones
+            SET title = COALESCE(title, milestone_title),
+                description = COALESCE(description, milestone_description)
+            WHERE title IS NULL OR description IS NULL
+        ''')
+
+
+def _003_canvas_delta_sync(cursor):
+    """Delta-sync columns and per-course sync state"""
+    _add_column(cursor, 'canvas_assignments', 'course_id', 'TEXT')
+    _add_column(cursor, 'canvas_assignments', 'canvas_updated_at', 'TEXT')
+    _add_column(cursor, 'canvas_assignments', 'deleted_at', 'DATETIME')
+
+    # One row per (student, course, resource): page ETags, item ids and the updated_at high-water mark
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS canvas_sync_state (
+            student_id TEXT,
+            course_id TEXT,
+            resource TEXT,
+            page_state TEXT,
+            high_water_mark TEXT,
+            synced_at DATETIME,
+            PRIMARY KEY (student_id, course_id, resource)
+        )
+    ''')
+
+
+def _004_hot_path_indexes(cursor):
+    """Indexes for the queries every page load runs"""
+    # Assignment list: WHERE student_id = ? ... ORDER BY due_date
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_canvas_assignments_student_due
+        ON canvas_assignments (student_id, due_date)
+    ''')
+    # Milestones per assignment, returned in target_date order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_study_milestones_student_assignment
+        ON study_milestones (student_id, assignment_id, target_date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_simple_milestones_student_assignment
+        ON simple_milestones (student_id, assignment_id)
+    ''')
+    # Conversation history by family or student, newest first, and the weekly analytics window
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_family_time
+        ON conversations (family_id, timestamp)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_student_time
+        ON conversations (student_id, timestamp)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_time
+        ON conversations (timestamp)
+    ''')
+    # Login: verify_family_access matches on UPPER(access_code), password login on email
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_families_access_code
+        ON families (UPPER(access_code))
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_families_email
+        ON families (email)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_students_family
+        ON students (family_id)
+    ''')
+    # Sessions are looked up by id (primary key); expiry sweeps filter on is_active + expires_at
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_active_expiry
+        ON user_sessions (is_active, expires_at)
+    ''')
+
+
+def _005_assignment_categories(cursor):
+    """Precomputed assignment category, filled at sync time and backfilled here"""
+    _add_column(cursor, 'canvas_assignments', 'category', 'TEXT')
+
+    cursor.execute('SELECT id, assignment_name, is_quiz FROM canvas_assignments')
+    cursor.executemany('UPDATE canvas_assignments SET category = ? WHERE id = ?', [
+        (categorize_assignment(name, 'QUIZ' if is_quiz else ''), row_id)
+        for row_id, name, is_quiz in cursor.fetchall()
+    ])
+
+    # Type filter: WHERE student_id = ? AND category = ? ... ORDER BY due_date
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_canvas_assignments_student_category_due
+        ON canvas_assignments (student_id, category, due_date)
+    ''')
+
+
+def _006_study_plan_cache(cursor):
+    """Cached AI study plans, shared by every student with the same assignment"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_study_plan_cache (
+            cache_key TEXT PRIMARY KEY,
+            prompt_version TEXT,
+            plan TEXT,
+            created_at DATETIME,
+            last_used_at DATETIME,
+            hit_count INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_ai_study_plan_cache_last_used
+        ON ai_study_plan_cache (last_used_at)
+    ''')
+
+
+def _007_conversation_summaries(cursor):
+    """Running summary of each student's older career chat exchanges"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            student_id TEXT PRIMARY KEY,
+            summary TEXT,
+            summarised_through_id INTEGER DEFAULT 0,
+            exchanges_summarised INTEGER DEFAULT 0,
+            updated_at DATETIME,
+            FOREIGN KEY (student_id) REFERENCES students (id)
+        )
+    ''')
+    # Unsummarised exchanges: WHERE student_id = ? AND id > ? ORDER BY id
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_student_id
+        ON conversations (student_id, id)
+    ''')
+
+
+def _008_milestone_parse_tracking(cursor):
+    """Which generator made each attempt, and whether a paid completion failed to parse"""
+    _add_column(cursor, 'milestone_generation_log', 'source', 'TEXT')
+    _add_column(cursor, 'milestone_generation_log', 'parse_failed', 'BOOLEAN DEFAULT FALSE')
+
+
+def _009_llm_calls(cursor):
+    """One row per Anthropic API call: feature, model, latency and token usage"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at DATETIME,
+            feature TEXT,
+            prompt_version TEXT,
+            model TEXT,
+            streamed BOOLEAN,
+            success BOOLEAN,
+            error_type TEXT,
+            stop_reason TEXT,
+            latency_ms REAL,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            cache_write_tokens INTEGER DEFAULT 0,
+            cache_read_tokens INTEGER DEFAULT 0
+        )
+    ''')
+    # Dashboard: WHERE created_at >= ? GROUP BY feature
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_llm_calls_created_feature
+        ON llm_calls (created_at, feature)
+    ''')
+
+
+def _010_public_http_cache(cursor):
+    """Cached public data pages (ABS, Job Outlook) with their validators for conditional GETs"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS public_http_cache (
+            url TEXT PRIMARY KEY,
+            source TEXT,
+            body BLOB,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at DATETIME,
+            expires_at DATETIME
+        )
+    ''')
+
+
+def _011_live_data_snapshots(cursor):
+    """Versioned live employment data: one row per metric per collection"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS live_data_snapshots (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            collected_at DATETIME,
+            published_at DATETIME,
+            metric_count INTEGER
+        )
+    ''')
+    # The primary key serves "every metric in snapshot N"
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS live_data_metrics (
+            snapshot_version INTEGER,
+            source TEXT,
+            subject TEXT DEFAULT '',
+            metric TEXT,
+            value TEXT,
+            collected_at DATETIME,
+            PRIMARY KEY (snapshot_version, source, subject, metric),
+            FOREIGN KEY (snapshot_version) REFERENCES live_data_snapshots (version)
+        )
+    ''')
+    # Trend charts: WHERE source = ? AND metric = ? AND subject = ? ORDER BY collected_at
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_live_data_metrics_history
+        ON live_data_metrics (source, metric, subject, collected_at)
+    ''')
+
+
+def _012_job_outlook_occupations(cursor):
+    """The crawled Job Outlook catalogue, and the crawler's persistent frontier"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_frontier (
+            url TEXT PRIMARY KEY,
+            kind TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            content_hash TEXT,
+            discovered_at DATETIME,
+            last_fetched_at DATETIME,
+            next_fetch_at DATETIME,
+            last_error TEXT
+        )
+    ''')
+    # Claiming work: WHERE status IN (...) AND next_fetch_at <= ?
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_crawl_frontier_due
+        ON crawl_frontier (status, next_fetch_at)
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS occupations (
+            slug TEXT PRIMARY KEY,
+            title TEXT,
+            url TEXT,
+            employment_outlook TEXT,
+            weekly_earnings TEXT,
+            weekly_earnings_value INTEGER,
+            employment_size TEXT,
+            employment_size_value INTEGER,
+            growth_forecast TEXT,
+            growth_forecast_pct REAL,
+            content_hash TEXT,
+            crawled_at DATETIME,
+            updated_at DATETIME
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_occupations_title
+        ON occupations (title COLLATE NOCASE)
+    ''')
+    # Dashboards: ORDER BY weekly_earnings_value / growth_forecast_pct
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_occupations_earnings
+        ON occupations (weekly_earnings_value)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_occupations_growth
+        ON occupations (growth_forecast_pct)
+    ''')
+    # Career chat: which occupations does a message mention? (porter stems "teacher" / "teachers")
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS occupations_fts
+        USING fts5(slug UNINDEXED, title, tokenize='porter')
+    ''')
+
+
+def _013_crawl_frontier_paths(cursor):
+    """Key the crawl frontier on the path under the crawl's base URL rather than the absolute URL"""
+    cursor.execute('''
+        SELECT url, kind, status, attempts, content_hash, discovered_at, last_fetched_at, next_fetch_at, last_error
+        FROM crawl_frontier
+        ORDER BY COALESCE(last_fetched_at, '')
+    ''')
+    rows = cursor.fetchall()
+
+    cursor.execute('DROP TABLE crawl_frontier')
+    cursor.execute('''
+        CREATE TABLE crawl_frontier (
+            path TEXT PRIMARY KEY,
+            kind TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            content_hash TEXT,
+            discovered_at DATETIME,
+            last_fetched_at DATETIME,
+            next_fetch_at DATETIME,
+            last_error TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_crawl_frontier_due
+        ON crawl_frontier (status, next_fetch_at)
+    ''')
+
+    def relative(url):
+        parsed = urlparse(url)
+        return parsed.path + (f"?{parsed.query}" if parsed.query else '')
+
+    # The same page queued from several origins collapses to its most recently fetched row
+    cursor.executemany('''
+        INSERT OR REPLACE INTO crawl_frontier
+        (path, kind, status, attempts, content_hash, discovered_at, last_fetched_at, next_fetch_at, last_error)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(relative(row[0]),) + tuple(row[1:]) for row in rows])
+
+    # occupations.url is the public Job Outlook page, whichever origin it was crawled from
+    cursor.execute("UPDATE occupations SET url = 'https://joboutlook.gov.au/occupations/' || slug")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'base tables', _001_base_tables),
+    (2, 'unified study_milestones', _002_study_milestones),
+    (3, 'canvas delta sync', _003_canvas_delta_sync),
+    (4, 'hot path indexes', _004_hot_path_indexes),
+    (5, 'assignment categories', _005_assignment_categories),
+    (6, 'study plan cache', _006_study_plan_cache),
+    (7, 'conversation summaries', _007_conversation_summaries),
+    (8, 'milestone parse tracking', _008_milestone_parse_tracking),
+    (9, 'llm call telemetry', _009_llm_calls),
+    (10, 'public http cache', _010_public_http_cache),
+    (11, 'live data snapshots', _011_live_data_snapshots),
+    (12, 'job outlook occupations', _012_job_outlook_occupations),
+    (13, 'crawl frontier paths', _013_crawl_frontier_paths),
+]
+
+_migrated_paths = set()
+_lock = threading.Lock()
+
+
+def get_schema_version(cursor) -> int:
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+    return cursor.fetchone()[0]
+
+
+def migrate(db_path: str = DEFAULT_DB_PATH) -> int:
+    """Apply pending migrations in order, each in its own transaction; returns the schema version"""
+    conn = database_pool.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        version = get_schema_version(cursor)
+        conn.commit()
+
+        for migration_version, description, apply in MIGRATIONS:
+            if migration_version <= version:
+                continue
+
+            # IMMEDIATE takes the write lock up front, so a second process waits and then skips
+            cursor.execute('BEGIN IMMEDIATE')
+            if get_schema_version(cursor) >= migration_version:
+                conn.rollback()
+                continue
+
+            try:
+                apply(cursor)
+                cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                               (migration_version, description))
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+            version = migration_version
+            print(f"✅ Applied schema migration {migration_version}: {description}")
+
+        return version
+    finally:
+        conn.close()
+
+
+def ensure_schema(db_path: str = DEFAULT_DB_PATH):
+    """Migrate db_path the first time this process touches it; later calls are free"""
+    if db_path in _migrated_paths:
+        return
+
+    with _lock:
+        if db_path not in _migrated_paths:
+            migrate(db_path)
+            _migrated_paths.add(db_path)
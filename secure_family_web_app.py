@@ -3,14 +3,24 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import anthropic
-import os
-import json
 import requests
 import uuid
-import sqlite3
-from dotenv import load_dotenv
+import time
 from multi_family_database import MultiFamilyDatabase
+from canvas_sync_module import CanvasSyncManager
+import database_pool
+import schema_migrations
+from assignment_categories import categorize_assignment as categorize_assignment_name
+from career_chat import build_career_chat_request, summarise_usage
+from study_plan_cache import StudyPlanCache
+from study_milestone_repository import StudyMilestoneRepository, empty_study_plan_summary
+from rate_limiter import limits_for_api_key
+from anthropic_client import get_api_key, get_client
+from term_planner import StudyPlanUnavailable, plan_assignments
+from conversation_memory import ConversationMemory
+from occupation_repository import OccupationRepository
+from structured_milestones import MilestoneParseError, generate_milestones, log_generation
+from llm_resilience import CircuitOpenError, anthropic_breaker, describe_llm_failure, hedge, resilient_call
 
 # Page configuration
 st.set_page_config(
@@ -413,62 +423,8 @@ class CanvasIntegrator:
 
     def __init__(self, db_path="community_career_explorer.db"):
         self.db_path = db_path
-        self.init_canvas_tables()
-
-    def init_canvas_tables(self):
-        """Initialize Canvas tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Canvas credentials table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_credentials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                canvas_url TEXT,
-                access_token TEXT,
-                student_name TEXT,
-                canvas_user_id TEXT,
-                is_active BOOLEAN DEFAULT TRUE,
-                last_sync DATETIME,
-                UNIQUE(student_id)
-            )
-        ''')
-
-        # Canvas assignments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_assignments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                course_name TEXT,
-                assignment_name TEXT,
-                due_date DATETIME,
-                points_possible REAL,
-                description TEXT,
-                html_url TEXT,
-                is_quiz BOOLEAN DEFAULT FALSE,
-                UNIQUE(student_id, assignment_id)
-            )
-        ''')
-
-        # Study milestones table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS study_milestones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                assignment_name TEXT,
-                title TEXT,
-                description TEXT,
-                target_date TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        conn.commit()
-        conn.close()
+        schema_migrations.ensure_schema(self.db_path)
+        self.milestones = StudyMilestoneRepository(self.db_path)
 
     def test_canvas_connection(self, canvas_url: str, access_token: str):
         """Test Canvas API connection"""
@@ -504,7 +460,7 @@ class CanvasIntegrator:
                                 user_name: str, user_id: str = ""):
         """Save Canvas credentials for a student"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -524,7 +480,7 @@ class CanvasIntegrator:
     def has_canvas_credentials(self, student_id: str):
         """Check if student has Canvas credentials"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -542,7 +498,7 @@ class CanvasIntegrator:
     def get_canvas_credentials(self, student_id: str):
         """Get Canvas credentials for a student"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -568,160 +524,53 @@ class CanvasIntegrator:
             return None
 
     def sync_assignments(self, student_id: str):
-        """Sync assignments from Canvas"""
+        """Sync assignments from Canvas - courses are fetched concurrently, then written in one batch"""
         try:
             credentials = self.get_canvas_credentials(student_id)
             if not credentials:
                 return {'success': False, 'message': 'No Canvas credentials found'}
 
-            canvas_url = credentials['canvas_url']
-            access_token = credentials['access_token']
-
-            # Get courses
-            courses_response = requests.get(
-                f"{canvas_url}/api/v1/courses",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"enrollment_state": "active", "per_page": 20},
-                timeout=15
+            sync_manager = CanvasSyncManager(self.db_path)
+            return sync_manager.sync_student(
+                student_id,
+                credentials['canvas_url'],
+                credentials['access_token']
             )
 
-            if courses_response.status_code != 200:
-                return {'success': False, 'message': 'Failed to fetch courses'}
-
-            courses = courses_response.json()
-            total_assignments = 0
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Clear existing assignments
-            cursor.execute('DELETE FROM canvas_assignments WHERE student_id = ?', (student_id,))
-
-            # Sync assignments from each course
-            for course in courses[:10]:  # Limit to 10 courses
-                course_id = course['id']
-                course_name = course.get('name', 'Unknown Course')
-
-                # Get assignments
-                try:
-                    assignments_response = requests.get(
-                        f"{canvas_url}/api/v1/courses/{course_id}/assignments",
-                        headers={"Authorization": f"Bearer {access_token}"},
-                        params={"per_page": 50},
-                        timeout=15
-                    )
-
-                    if assignments_response.status_code == 200:
-                        assignments = assignments_response.json()
-
-                        for assignment in assignments:
-                            due_date = assignment.get('due_at')
-                            if due_date:
-                                try:
-                                    # Parse Canvas date
-                                    due_datetime = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-                                    due_datetime = due_datetime.replace(tzinfo=None)
-
-                                    cursor.execute('''
-                                        INSERT OR REPLACE INTO canvas_assignments
-                                        (student_id, assignment_id, course_name, assignment_name, 
-                                         due_date, points_possible, description, html_url, is_quiz)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                    ''', (
-                                        student_id,
-                                        str(assignment['id']),
-                                        course_name,
-                                        assignment.get('name', 'Untitled Assignment'),
-                                        due_datetime.isoformat(),
-                                        assignment.get('points_possible', 0),
-                                        assignment.get('description', '')[:500],
-                                        assignment.get('html_url', ''),
-                                        False
-                                    ))
-
-                                    total_assignments += 1
-
-                                except Exception:
-                                    continue
-
-                    # Get quizzes
-                    quizzes_response = requests.get(
-                        f"{canvas_url}/api/v1/courses/{course_id}/quizzes",
-                        headers={"Authorization": f"Bearer {access_token}"},
-                        params={"per_page": 50},
-                        timeout=15
-                    )
-
-                    if quizzes_response.status_code == 200:
-                        quizzes = quizzes_response.json()
-
-                        for quiz in quizzes:
-                            due_date = quiz.get('due_at')
-                            if due_date:
-                                try:
-                                    due_datetime = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-                                    due_datetime = due_datetime.replace(tzinfo=None)
-
-                                    cursor.execute('''
-                                        INSERT OR REPLACE INTO canvas_assignments
-                                        (student_id, assignment_id, course_name, assignment_name, 
-                                         due_date, points_possible, description, html_url, is_quiz)
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                    ''', (
-                                        student_id,
-                                        f"quiz_{quiz['id']}",
-                                        course_name,
-                                        quiz.get('title', 'Untitled Quiz'),
-                                        due_datetime.isoformat(),
-                                        quiz.get('points_possible', 0),
-                                        quiz.get('description', '')[:500],
-                                        quiz.get('html_url', ''),
-                                        True
-                                    ))
-
-                                    total_assignments += 1
-
-                                except Exception:
-                                    continue
-
-                except Exception:
-                    continue
-
-            # Update last sync time
-            cursor.execute('''
-                UPDATE canvas_credentials 
-                SET last_sync = ? 
-                WHERE student_id = ?
-            ''', (datetime.now().isoformat(), student_id))
-
-            conn.commit()
-            conn.close()
-
-            return {
-                'success': True,
-                'message': f'Successfully synced {total_assignments} assignments and quizzes',
-                'count': total_assignments
-            }
-
         except Exception as e:
             return {
                 'success': False,
                 'message': f'Sync failed: {str(e)}'
             }
 
-    def get_student_assignments(self, student_id: str):
-        """Get assignments for a student"""
+    def get_sync_generation(self, student_id: str):
+        """Get the student's last_sync stamp - it only moves when a sync changed their assignments"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = database_pool.connect(self.db_path)
             cursor = conn.cursor()
 
-            cursor.execute('''
+            cursor.execute('SELECT last_sync FROM canvas_credentials WHERE student_id = ?', (student_id,))
+            result = cursor.fetchone()
+            conn.close()
+            return result[0] if result else None
+
+        except Exception:
+            return None
+
+    def get_student_assignments(self, student_id: str, category: str = None):
+        """Get assignments for a student, optionally only one category (served by an index)"""
+        try:
+            conn = database_pool.connect(self.db_path)
+            cursor = conn.cursor()
+
+            category_filter = 'AND category = ?' if category else ''
+            cursor.execute(f'''
                 SELECT assignment_id, course_name, assignment_name, due_date, 
-                       points_possible, description, html_url, is_quiz
+                       points_possible, description, html_url, is_quiz, category
                 FROM canvas_assignments 
-                WHERE student_id = ?
+                WHERE student_id = ? {category_filter} AND deleted_at IS NULL
                 ORDER BY due_date ASC
-            ''', (student_id,))
+            ''', (student_id, category) if category else (student_id,))
 
             assignments = []
             for row in cursor.fetchall():
@@ -733,7 +582,9 @@ class CanvasIntegrator:
                     'points': row[4],
                     'description': row[5] or '',
                     'html_url': row[6] or '',
-                    'type': 'Quiz' if row[7] else 'Assignment'
+                    'type': 'Quiz' if row[7] else 'Assignment',
+                    # Rows synced before categories existed are categorized on read
+                    'category': row[8] or categorize_assignment_name(row[2], 'QUIZ' if row[7] else '')
                 })
 
             conn.close()
@@ -742,257 +593,159 @@ class CanvasIntegrator:
         except Exception as e:
             return []
 
-    # REPLACE your CanvasIntegrator save_study_milestones method with this version that creates the table:
-
     def save_study_milestones(self, student_id: str, assignment_id: str, assignment_name: str, milestones: list):
-        """Save study milestones for an assignment - FIXED with table creation"""
+        """Save study milestones for an assignment"""
         try:
-            print(f"🔍 SAVE DEBUG: Starting save for {len(milestones)} milestones")
-            print(f"🔍 SAVE DEBUG: student_id={student_id}, assignment_id={assignment_id}")
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # ENSURE TABLE EXISTS - Create it if missing
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS study_milestones (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    student_id TEXT,
-                    assignment_id TEXT,
-                    assignment_name TEXT,
-                    title TEXT,
-                    description TEXT,
-                    target_date TEXT,
-                    completed BOOLEAN DEFAULT FALSE,
-                    created_date DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            print("🔍 SAVE DEBUG: Ensured study_milestones table exists")
-
-            # Clear existing milestones for this assignment
-            cursor.execute('''
-                DELETE FROM study_milestones 
-                WHERE student_id = ? AND assignment_id = ?
-            ''', (student_id, assignment_id))
-
-            rows_deleted = cursor.rowcount
-            print(f"🔍 SAVE DEBUG: Deleted {rows_deleted} existing milestones")
-
-            # Insert new milestones
-            for i, milestone in enumerate(milestones):
-                title = milestone.get('title', f'Milestone {i + 1}')
-                description = milestone.get('description', '')
-                target_date = milestone.get('target_date', '')
-
-                print(f"🔍 SAVE DEBUG: Inserting milestone {i}: {title}")
-
-                cursor.execute('''
-                    INSERT INTO study_milestones
-                    (student_id, assignment_id, assignment_name, title, description, target_date, completed)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    student_id,
-                    assignment_id,
-                    assignment_name,
-                    title,
-                    description,
-                    target_date,
-                    False
-                ))
-
-            conn.commit()
-
-            # Verify what we saved
-            cursor.execute('''
-                SELECT COUNT(*) FROM study_milestones 
-                WHERE student_id = ? AND assignment_id = ?
-            ''', (student_id, assignment_id))
-
-            saved_count = cursor.fetchone()[0]
-            print(f"🔍 SAVE DEBUG: Verified {saved_count} milestones saved")
+            self.milestones.save_milestones(student_id, assignment_id, assignment_name, milestones)
+            print(f"✅ Saved {len(milestones)} milestones for {assignment_id}")
+            return True
 
-            conn.close()
+        except Exception as e:
+            print(f"❌ SAVE ERROR: {str(e)}")
+            return False
 
-            return saved_count == len(milestones)
+    def save_study_milestones_for_assignments(self, student_id: str, plans: list):
+        """Save study milestones for many assignments in one transaction"""
+        try:
+            self.milestones.save_milestones_for_assignments(student_id, plans)
+            print(f"✅ Saved study plans for {len(plans)} assignments")
+            return True
 
         except Exception as e:
             print(f"❌ SAVE ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
             return False
 
-    # ALSO UPDATE your get_study_milestones method to ensure table exists:
-
     def get_study_milestones(self, student_id: str, assignment_id: str):
-        """Get study milestones for an assignment - FIXED with table creation"""
+        """Get study milestones for an assignment"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # ENSURE TABLE EXISTS
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS study_milestones (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    student_id TEXT,
-                    assignment_id TEXT,
-                    assignment_name TEXT,
-                    title TEXT,
-                    description TEXT,
-                    target_date TEXT,
-                    completed BOOLEAN DEFAULT FALSE,
-                    created_date DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            cursor.execute('''
-                SELECT title, description, target_date, completed
-                FROM study_milestones 
-                WHERE student_id = ? AND assignment_id = ?
-                ORDER BY target_date ASC
-            ''', (student_id, assignment_id))
+            return self.milestones.get_milestones(student_id, assignment_id)
 
-            milestones = []
-            for row in cursor.fetchall():
-                milestones.append({
-                    'title': row[0],
-                    'description': row[1],
-                    'target_date': row[2],
-                    'completed': bool(row[3])
-                })
+        except Exception as e:
+            print(f"❌ Error retrieving milestones: {str(e)}")
+            return []
 
-            conn.close()
-            print(f"🔍 Retrieved {len(milestones)} milestones for {assignment_id}")
-            return milestones
+    def get_study_milestones_for_assignments(self, student_id: str, assignment_ids: list):
+        """Get study milestones for many assignments at once, keyed by assignment_id"""
+        try:
+            return self.milestones.get_milestones_for_assignments(student_id, assignment_ids)
 
         except Exception as e:
             print(f"❌ Error retrieving milestones: {str(e)}")
-            return []
+            return {}
 
-    # OPTIONAL: Also fix your CanvasIntegrator __init__ method to ensure tables are created:
-    def __init__(self, db_path="community_career_explorer.db"):
-        self.db_path = db_path
-        self.init_canvas_tables()  # Make sure this gets called
-
-    def init_canvas_tables(self):
-        """Initialize Canvas tables if they don't exist - COMPLETE VERSION"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Canvas credentials table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_credentials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                canvas_url TEXT,
-                access_token TEXT,
-                student_name TEXT,
-                canvas_user_id TEXT,
-                is_active BOOLEAN DEFAULT TRUE,
-                last_sync DATETIME,
-                UNIQUE(student_id)
-            )
-        ''')
-
-        # Canvas assignments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS canvas_assignments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                course_name TEXT,
-                assignment_name TEXT,
-                due_date DATETIME,
-                points_possible REAL,
-                description TEXT,
-                html_url TEXT,
-                is_quiz BOOLEAN DEFAULT FALSE,
-                UNIQUE(student_id, assignment_id)
-            )
-        ''')
-
-        # Study milestones table - ENSURE IT'S CREATED HERE TOO
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS study_milestones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                assignment_id TEXT,
-                assignment_name TEXT,
-                title TEXT,
-                description TEXT,
-                target_date TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                created_date DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+    def get_study_plan_summaries(self, student_id: str, assignment_ids: list):
+        """Get study plan progress for many assignments at once, keyed by assignment_id"""
+        try:
+            return self.milestones.get_study_plan_summaries(student_id, assignment_ids)
 
-        conn.commit()
-        conn.close()
-        print("✅ All Canvas tables initialized successfully")
+        except Exception as e:
+            print(f"❌ Error summarising study plans: {str(e)}")
+            return {}
+
+# Bump when the study plan prompt changes so old cached plans are not reused
+STUDY_PLAN_PROMPT_VERSION = "study-plan-v2"
+STUDY_PLAN_MAX_TOKENS = 1000
+# Prompt plus worst-case completion, charged against the API key's token budget
+STUDY_PLAN_ESTIMATED_TOKENS = 400 + STUDY_PLAN_MAX_TOKENS
+
+# Shared by every session using the same API key
+ANTHROPIC_MAX_CONCURRENT_REQUESTS = 16
+ANTHROPIC_TOKENS_PER_MINUTE = 80000
+
+# Per-call deadlines (seconds). Interactive calls get no retries, so the deadline is the whole wait
+STUDY_PLAN_DEADLINE_SECONDS = 25
+# How long the study plan screen waits for the AI plan before serving the rule-based one
+STUDY_PLAN_HEDGE_SECONDS = 3
+ADVICE_DEADLINE_SECONDS = 30
+LONG_FORM_DEADLINE_SECONDS = 60
+# Chat streams: the deadline bounds each gap between chunks; a long reply legitimately runs ~30s
+CHAT_DEADLINE_SECONDS = 20
+CHAT_SLOW_CALL_SECONDS = 60
 
 class SecureFamilyCareerAgent:
     def __init__(self):
-        try:
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-        except:
-            load_dotenv()
-            api_key = os.getenv("ANTHROPIC_API_KEY")
+        api_key = get_api_key()
 
         if api_key:
-            self.client = anthropic.Anthropic(api_key=api_key)
+            self.client = get_client()
+            self.api_limits = limits_for_api_key(api_key, ANTHROPIC_MAX_CONCURRENT_REQUESTS,
+                                                 ANTHROPIC_TOKENS_PER_MINUTE)
         else:
             self.client = None
+            self.api_limits = None
+            st.warning("⚠️ AI features require an Anthropic API key. Please configure your API key.")
 
         if 'secure_db' not in st.session_state:
             st.session_state.secure_db = MultiFamilyDatabase()
         self.db = st.session_state.secure_db
-
-    def generate_ai_study_plan(self, assignment_name, due_date, assignment_description=""):
-        """Generate AI study plan milestones for an assignment"""
-        if not self.client:
+        self.study_plan_cache = StudyPlanCache(self.db.db_path)
+        self.conversation_memory = ConversationMemory(self.db.db_path)
+        self.occupations = OccupationRepository(self.db.db_path)
+
+    def generate_ai_study_plan(self, assignment_name, due_date, assignment_description="", fallback=True):
+        """Generate AI study plan milestones for an assignment
+
+        With fallback=False a plan that can't be generated raises StudyPlanUnavailable instead of
+        returning the default milestones, so batch callers don't save generic plans as real ones.
+        """
+        # Classmates and siblings share assignments - reuse a plan generated for the same content
+        cached_plan = self.study_plan_cache.get(assignment_name, assignment_description, due_date,
+                                                STUDY_PLAN_PROMPT_VERSION)
+        if cached_plan:
+            return cached_plan
+
+        due_datetime = parse_assignment_due_date(due_date)
+        if not self.client or not due_datetime:
+            if not fallback:
+                raise StudyPlanUnavailable("AI service unavailable" if not self.client else f"unreadable due date {due_date!r}")
             return self.get_default_milestones(assignment_name, due_date)
 
-        try:
-            prompt = f"""
-            Create a 4-step study plan for this assignment:
-
-            Assignment: {assignment_name}
-            Due Date: {due_date}
-            Description: {assignment_description}
+        prompt = f"""Create a 4-step study plan for this assignment:
 
-            Please create 4 specific, actionable study milestones that would help a student complete this assignment effectively. Format as JSON:
+Assignment: {assignment_name}
+Due Date: {due_datetime.strftime('%A, %d %B %Y')} ({max((due_datetime - datetime.now()).days, 0)} days from today)
+Description: {assignment_description}
 
-            [
-                {{
-                    "title": "Milestone 1 title",
-                    "description": "Detailed description of what to do",
-                    "target_date": "YYYY-MM-DD"
-                }},
-                ...
-            ]
+Record 4 specific, actionable study milestones that would help a student complete this assignment effectively, using the record_study_plan tool. Make them realistic and well-distributed leading up to the due date."""
 
-            Make the milestones specific, realistic, and well-distributed leading up to the due date.
-            """
-
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[{"role": "user", "content": prompt}]
-            )
+        try:
+            with self.api_limits.reserve(STUDY_PLAN_ESTIMATED_TOKENS):
+                specs = resilient_call(
+                    self.client,
+                    lambda client: generate_milestones(client, prompt, "claude-3-5-sonnet-20241022",
+                                                       STUDY_PLAN_MAX_TOKENS),
+                    STUDY_PLAN_DEADLINE_SECONDS,
+                    feature='study_plan',
+                    prompt_version=STUDY_PLAN_PROMPT_VERSION
+                )
 
-            # Parse the response to extract JSON
-            content = response.content[0].text
-            import re
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                milestones_data = json.loads(json_match.group())
-                return milestones_data
-            else:
-                return self.get_default_milestones(assignment_name, due_date)
+        except MilestoneParseError as e:
+            print(f"❌ Study plan response unusable: {str(e)}")
+            log_generation(self.db.db_path, 'study_plan', None, None, False, 0, True, str(e))
+            if not fallback:
+                raise StudyPlanUnavailable(str(e)) from e
+            return self.get_default_milestones(assignment_name, due_date)
 
         except Exception as e:
+            print(f"❌ Study plan generation failed: {str(e)}")
+            log_generation(self.db.db_path, 'study_plan', None, None, False, 0, False, str(e))
+            if not fallback:
+                raise StudyPlanUnavailable(str(e)) from e
             return self.get_default_milestones(assignment_name, due_date)
 
+        log_generation(self.db.db_path, 'study_plan', None, None, True, len(specs))
+        milestones_data = [
+            {
+                "title": spec.title,
+                "description": spec.description,
+                "target_date": spec.target_date(due_datetime).strftime('%Y-%m-%d')
+            }
+            for spec in specs
+        ]
+        self.study_plan_cache.put(assignment_name, assignment_description, due_date,
+                                  STUDY_PLAN_PROMPT_VERSION, milestones_data)
+        return milestones_data
+
     def get_default_milestones(self, assignment_name, due_date):
         """Fallback default milestones"""
         try:
@@ -1743,10 +1496,16 @@ def generate_hsc_study_schedule(student, hsc_subjects, days_to_hsc):
             Be encouraging but realistic about the work required.
             """
 
-            response = agent.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
+            response = resilient_call(
+                agent.client,
+                lambda client: client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=2000,
+                    messages=[{"role": "user", "content": prompt}]
+                ),
+                LONG_FORM_DEADLINE_SECONDS,
+                slow_call_seconds=LONG_FORM_DEADLINE_SECONDS,
+                feature='hsc_schedule'
             )
 
             study_schedule = response.content[0].text
@@ -1759,7 +1518,7 @@ def generate_hsc_study_schedule(student, hsc_subjects, days_to_hsc):
                 st.success("✅ HSC study schedule saved to your progress tracking!")
 
         except Exception as e:
-            st.error(f"Error generating study schedule: {str(e)}")
+            st.error(describe_llm_failure(e))
 
 
 def create_university_pathways_section(student):
@@ -1875,10 +1634,15 @@ def get_ai_university_advice(student, university, uni_data):
             Be encouraging and specific to NSW context.
             """
 
-            response = agent.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[{"role": "user", "content": prompt}]
+            response = resilient_call(
+                agent.client,
+                lambda client: client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=1000,
+                    messages=[{"role": "user", "content": prompt}]
+                ),
+                ADVICE_DEADLINE_SECONDS,
+                feature='university_advice'
             )
 
             advice = response.content[0].text
@@ -1887,7 +1651,7 @@ def get_ai_university_advice(student, university, uni_data):
             st.markdown(advice)
 
         except Exception as e:
-            st.error(f"Error getting AI advice: {str(e)}")
+            st.error(describe_llm_failure(e))
 
 
 def create_subject_specific_study_plan(student, course, year):
@@ -1917,10 +1681,16 @@ def create_subject_specific_study_plan(student, course, year):
             Include weekly goals and revision strategies.
             """
 
-            response = agent.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1500,
-                messages=[{"role": "user", "content": prompt}]
+            response = resilient_call(
+                agent.client,
+                lambda client: client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=1500,
+                    messages=[{"role": "user", "content": prompt}]
+                ),
+                LONG_FORM_DEADLINE_SECONDS,
+                slow_call_seconds=LONG_FORM_DEADLINE_SECONDS,
+                feature='subject_study_plan'
             )
 
             study_plan = response.content[0].text
@@ -1929,7 +1699,7 @@ def create_subject_specific_study_plan(student, course, year):
             st.markdown(study_plan)
 
         except Exception as e:
-            st.error(f"Error creating study plan: {str(e)}")
+            st.error(describe_llm_failure(e))
 
 
 def is_hsc_subject(course_name):
@@ -2067,8 +1837,12 @@ def create_career_guidance_tab(student, family_info):
 
     with col2:
         if st.button("🔄 New Topic", use_container_width=True, key=f"new_topic_{student['id']}", type="secondary"):
-            # Clear conversation history
+            # Clear conversation history; what was said moves into the long-term summary
             st.session_state[f"career_conversation_{student['id']}"] = []
+            agent = st.session_state.get('career_agent')
+            if agent and agent.client:
+                agent.conversation_memory.compact_in_background(agent.client, student['id'],
+                                                                keep_recent=0, force=True)
             st.rerun()
 
 
@@ -2085,117 +1859,95 @@ def handle_career_conversation(student, family_info, user_input, conversation_hi
         st.error("AI service not available. Please check your API key configuration.")
         return
 
-    with st.spinner("🤖 Your career counsellor is thinking..."):
-        try:
-            # Build conversational context
-            system_prompt = create_conversational_system_prompt(student, conversation_history)
+    try:
+        # Static counsellor instructions (prompt-cached) + student profile + running summary
+        # + the exchanges the summary doesn't cover yet
+        # + Job Outlook figures for any occupations the message mentions (crawled into the local table)
+        summary, recent_exchanges = agent.conversation_memory.get_context(student['id'])
+        occupations = agent.occupations.find_mentioned(user_input)
+        chat_request = build_career_chat_request(student, recent_exchanges, user_input, summary, occupations)
+
+        # Show the question straight away, then stream the answer into its bubble
+        st.markdown(f"""
+        <div style="background: #e3f2fd; border-radius: 8px; padding: 12px; margin: 8px 0; text-align: right;">
+            <strong>You:</strong> {user_input}
+        </div>
+        """, unsafe_allow_html=True)
+        response_placeholder = st.empty()
+        response_placeholder.markdown("🤖 *Your career counsellor is thinking...*")
+
+        ai_response = resilient_call(
+            agent.client,
+            lambda client: stream_career_response(client, chat_request, response_placeholder),
+            CHAT_DEADLINE_SECONDS,
+            slow_call_seconds=CHAT_SLOW_CALL_SECONDS,
+            feature='career_chat'
+        )
 
-            # Create conversation messages for the AI
-            messages = [{"role": "user", "content": system_prompt}]
+        # Add to conversation history
+        conversation_history.append({
+            'user_message': user_input,
+            'ai_response': ai_response,
+            'timestamp': datetime.now().isoformat()
+        })
 
-            # Add conversation history (last 10 exchanges to stay within token limits)
-            for exchange in conversation_history[-5:]:
-                messages.append({"role": "user", "content": exchange['user_message']})
-                messages.append({"role": "assistant", "content": exchange['ai_response']})
+        # Save to database once the full reply has arrived
+        try:
+            db = st.session_state.secure_db
+            db.save_conversation(
+                family_info['id'],
+                student['id'],
+                student['name'],
+                user_input,
+                ai_response,
+                extract_conversation_topics(user_input, ai_response)
+            )
+            # Keeps the next prompt bounded; runs after the reply so it adds no latency
+            agent.conversation_memory.compact_in_background(agent.client, student['id'])
+        except Exception as e:
+            st.warning(f"Conversation not saved to database: {str(e)}")
 
-            # Add current user message
-            messages.append({"role": "user", "content": user_input})
+    except Exception as e:
+        st.error(describe_llm_failure(e))
 
-            # Get AI response
-            response = agent.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1500,
-                messages=messages
-            )
 
-            ai_response = response.content[0].text
+def stream_career_response(client, chat_request, placeholder):
+    """Stream the counsellor's reply into a chat bubble as tokens arrive; returns the full text"""
+    started = time.perf_counter()
+    first_token_ms = None
+    last_render = 0.0
+    chunks = []
 
-            # Add to conversation history
-            conversation_history.append({
-                'user_message': user_input,
-                'ai_response': ai_response,
-                'timestamp': datetime.now().isoformat()
-            })
+    def render(text, cursor=""):
+        placeholder.markdown(f"""
+        <div style="background: #f3e5f5; border-radius: 8px; padding: 12px; margin: 8px 0;">
+            <strong>🤖 Career Counsellor:</strong> {text}{cursor}
+        </div>
+        """, unsafe_allow_html=True)
 
-            # Save to database
-            try:
-                db = st.session_state.secure_db
-                db.save_conversation(
-                    family_info['id'],
-                    student['id'],
-                    student['name'],
-                    user_input,
-                    ai_response,
-                    extract_conversation_topics(user_input, ai_response)
-                )
-            except Exception as e:
-                st.warning(f"Conversation not saved to database: {str(e)}")
+    with client.messages.stream(**chat_request) as stream:
+        for text in stream.text_stream:
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+            chunks.append(text)
 
-        except Exception as e:
-            st.error(f"Sorry, I encountered an error: {str(e)}. Please try again.")
+            # Re-rendering on every token floods the websocket; ~20 updates a second looks live
+            now = time.perf_counter()
+            if now - last_render >= 0.05:
+                render(''.join(chunks), "▌")
+                last_render = now
 
+        final_message = stream.get_final_message()
 
-def create_conversational_system_prompt(student, conversation_history):
-    """Create a dynamic system prompt for conversational career guidance"""
+    ai_response = ''.join(block.text for block in final_message.content if block.type == 'text')
+    render(ai_response)
 
-    # Get previous conversation context
-    conversation_context = ""
-    if conversation_history:
-        recent_topics = []
-        for exchange in conversation_history[-3:]:
-            if any(word in exchange['user_message'].lower() for word in ['university', 'course', 'degree']):
-                recent_topics.append("university planning")
-            if any(word in exchange['user_message'].lower() for word in ['career', 'job', 'work']):
-                recent_topics.append("career exploration")
-            if any(word in exchange['user_message'].lower() for word in ['worried', 'stressed', 'overwhelmed']):
-                recent_topics.append("anxiety/concerns")
-
-        if recent_topics:
-            conversation_context = f"\n\nCONVERSATION CONTEXT: We've been discussing {', '.join(set(recent_topics))}. Build on this naturally."
-
-    return f"""You are an experienced, warm, and insightful career counsellor specializing in Australian secondary school students. You're having an ongoing conversation with {student['name']}, building rapport and providing personalized career guidance.
-
-STUDENT PROFILE - {student['name']}:
-- Age: {student.get('age', 'Not specified')}
-- Year Level: Year {student.get('year_level', 'Not specified')}
-- Interests: {', '.join(student.get('interests', [])) if student.get('interests') else 'Still exploring'}
-- University Timeline: {student.get('timeline', 'Not specified')}
-- Location Preference: {student.get('location_preference', 'Not specified')}
-- Goals: {', '.join(student.get('goals', [])) if student.get('goals') else 'Still developing'}
-
-CURRENT NSW/ACT CONTEXT (2025):
-- Newcastle, Macquarie, Sydney, UNSW, ANU are key universities
-- Strong job market in health, education, technology, trades
-- ATAR requirements vary: 70-99+ depending on course/uni
-- Army Reserves education benefits available
-- Graduate employment rate: ~89% overall
-
-YOUR CONVERSATION APPROACH:
-1. **Be conversational and warm** - like talking to a trusted mentor
-2. **Ask probing follow-up questions** - help them think deeper
-3. **Reference their specific interests/situation** - make it personal
-4. **Share specific, actionable insights** - real university names, ATAR ranges, course details
-5. **Balance optimism with realism** - honest about challenges and opportunities
-6. **Encourage reflection** - "What excites you most about that?" "How does that align with your values?"
-
-CONVERSATION TECHNIQUES:
-- Use their name naturally in conversation
-- Ask "What if..." and "How do you feel about..." questions  
-- Share specific examples: "Students like you often thrive in..."
-- Reference NSW/ACT opportunities specifically
-- Connect their interests to real career paths and university courses
-- Acknowledge any concerns or emotions they express
-
-REMEMBER:
-- This is an ongoing conversation - reference what you've discussed before
-- Be encouraging but honest about effort required
-- Provide specific next steps they can take
-- Keep responses conversational (150-300 words), not essay-like
-- End with a thoughtful question to continue the dialogue
-
-{conversation_context}
-
-Respond as their career counsellor, continuing this natural conversation."""
+    total_ms = (time.perf_counter() - started) * 1000
+    usage = summarise_usage(final_message.usage)
+    print(f"⏱️ Career chat: first token {first_token_ms or total_ms:.0f}ms, complete {total_ms:.0f}ms | "
+          f"prompt {usage['prompt_tokens']} tokens ({usage['cache_read_tokens']} cached, "
+          f"{usage['cache_write_tokens']} written, {usage['input_tokens']} uncached)")
+    return ai_response
 
 
 def extract_conversation_topics(user_message, ai_response):
@@ -2220,30 +1972,6 @@ def extract_conversation_topics(user_message, ai_response):
     return topics if topics else ['general_career_guidance']
 
 
-# ALSO UPDATE your SecureFamilyCareerAgent class to ensure it has proper AI capabilities:
-
-class SecureFamilyCareerAgent:
-    def __init__(self):
-        try:
-            # Try secrets first (for deployed apps)
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-        except:
-            # Fall back to environment variable
-            load_dotenv()
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-
-        if api_key:
-            self.client = anthropic.Anthropic(api_key=api_key)
-        else:
-            self.client = None
-            st.warning("⚠️ AI features require an Anthropic API key. Please configure your API key.")
-
-        if 'secure_db' not in st.session_state:
-            st.session_state.secure_db = MultiFamilyDatabase()
-        self.db = st.session_state.secure_db
-
-    # ... (keep your existing AI study planning methods)
-
 def create_canvas_integration_tab(student):
     """Canvas integration with AI study planning"""
 
@@ -2267,65 +1995,33 @@ def show_assignments_list_with_study_plans(student, canvas):
     # Get filter values
     days_filter, course_filter, type_filter = show_assignment_filters(student)
 
-    # Get assignments from database
-    assignments = canvas.get_student_assignments(student['id'])
+    # Get pre-parsed assignments (cached until the next sync changes them)
+    model = get_assignment_view_model(student['id'], canvas)
 
-    if not assignments:
+    if not model['assignments']:
         st.info("📚 No assignments found. Click 'Sync Now' to get your latest Canvas assignments.")
         return
 
-    # Filter assignments with SAFE date handling
-    current_time = datetime.now()
+    # Apply TYPE filter by picking the precomputed category partition
+    if type_filter in TYPE_FILTER_CATEGORIES:
+        assignments = model['by_category'].get(TYPE_FILTER_CATEGORIES[type_filter], [])
+    else:
+        assignments = model['assignments']
+
     filtered_assignments = []
 
     for assignment in assignments:
-        try:
-            due_date_str = assignment.get('due_date')
-            due_date = None  # Initialize as None
-
-            # SAFE date parsing
-            if due_date_str:
-                try:
-                    if isinstance(due_date_str, str):
-                        clean_date_str = due_date_str.replace('Z', '').replace('+00:00', '')
-                        due_date = datetime.fromisoformat(clean_date_str)
-                        assignment['parsed_due_date'] = due_date
-                    elif isinstance(due_date_str, datetime):
-                        due_date = due_date_str
-                        assignment['parsed_due_date'] = due_date
-                except Exception:
-                    due_date = None
-                    assignment['parsed_due_date'] = None
-
-            # Apply TIME filter - ONLY if we have a valid due date
-            if due_date:
-                days_until_due = (due_date - current_time).days
-                if days_until_due > days_filter or days_until_due < -30:
-                    continue  # Skip assignments outside time range
-            # If no due date, include it (will be handled separately)
-
-            # Apply COURSE filter
-            if course_filter != "All Courses":
-                assignment_course = assignment.get('course', 'Unknown Course')
-                if assignment_course != course_filter:
-                    continue
-
-            # Apply TYPE filter
-            assignment_category = categorize_assignment(assignment)
-            if type_filter == "Assessment Tasks Only" and assignment_category != "Assessment Tasks":
-                continue
-            elif type_filter == "Quizzes & Tests" and assignment_category != "Quizzes & Tests":
-                continue
-            elif type_filter == "Course Materials" and assignment_category != "Course Materials":
-                continue
-
-            filtered_assignments.append(assignment)
+        # Apply TIME filter - ONLY if we have a valid due date
+        days_until_due = assignment['days_until_due']
+        if days_until_due is not None and (days_until_due > days_filter or days_until_due < -30):
+            continue  # Skip assignments outside time range
 
-        except Exception as e:
-            # If any error, skip this assignment but log it
-            st.warning(f"Skipped assignment due to error: {str(e)}")
+        # Apply COURSE filter
+        if course_filter != "All Courses" and assignment.get('course', 'Unknown Course') != course_filter:
             continue
 
+        filtered_assignments.append(assignment)
+
     # Sort by due date - handle None dates safely
     def safe_sort_key(assignment):
         due_date = assignment.get('parsed_due_date')
@@ -2348,37 +2044,21 @@ def show_assignments_list_with_study_plans(student, canvas):
     # Enhanced assignment display with study plan indicators
     st.markdown("### 📅 Assignments with Due Dates")
 
-    for i, assignment in enumerate(filtered_assignments[:20]):
+    # Summarise the study plans of every rendered assignment in one query
+    shown_assignments = filtered_assignments[:20]
+    study_plan_summaries = canvas.get_study_plan_summaries(
+        student['id'], [get_study_plan_assignment_id(assignment) for assignment in shown_assignments]
+    )
+
+    for i, assignment in enumerate(shown_assignments):
         try:
-            # Get study plan info for this assignment
-            study_plan_info = get_assignment_study_plan_summary(canvas, student['id'], assignment)
+            study_plan_info = study_plan_summaries.get(get_study_plan_assignment_id(assignment),
+                                                       empty_study_plan_summary())
 
             due_date = assignment.get('parsed_due_date')
 
-            # SAFE urgency calculation
-            if due_date:
-                days_until_due = (due_date - current_time).days
-
-                if days_until_due < 0:
-                    urgency_class = "overdue"
-                    urgency_text = "OVERDUE"
-                    urgency_badge_class = "urgency-overdue"
-                elif days_until_due <= 3:
-                    urgency_class = "due-soon"
-                    urgency_text = "DUE SOON"
-                    urgency_badge_class = "urgency-soon"
-                else:
-                    urgency_class = "future"
-                    urgency_text = "FUTURE"
-                    urgency_badge_class = "urgency-future"
-
-                due_date_display = due_date.strftime('%Y-%m-%d %H:%M')
-            else:
-                # Handle assignments without due dates
-                urgency_class = "future"
-                urgency_text = "NO DATE"
-                urgency_badge_class = "urgency-future"
-                due_date_display = "Date TBD"
+            urgency_class, urgency_text, urgency_badge_class = URGENCY_DISPLAY[assignment['urgency']]
+            due_date_display = due_date.strftime('%Y-%m-%d %H:%M') if due_date else "Date TBD"
 
             # Create enhanced assignment container
             with st.container():
@@ -2476,91 +2156,26 @@ def show_assignments_list_with_study_plans(student, canvas):
             st.error(f"Error displaying assignment {i}: {str(e)}")
             continue
 
-def get_assignment_study_plan_summary(canvas, student_id, assignment):
-    """Get summary info about study plan for an assignment - SAFE DATE HANDLING"""
-    try:
-        assignment_id = assignment.get('assignment_id', f"assignment_dated_{assignment.get('name', '')}")
-        milestones = canvas.get_study_milestones(student_id, assignment_id)
-
-        if not milestones:
-            return {
-                'has_plan': False,
-                'total': 0,
-                'completed': 0,
-                'progress_percent': 0,
-                'next_milestone': None
-            }
-
-        # Calculate progress
-        total_milestones = len(milestones)
-        completed_milestones = sum(1 for m in milestones if m.get('completed', False))
-        progress_percent = int((completed_milestones / total_milestones) * 100) if total_milestones > 0 else 0
-
-        # Find next incomplete milestone with SAFE date handling
-        next_milestone = None
-        current_date = datetime.now().date()
+def get_study_plan_assignment_id(assignment):
+    """Key study milestones are stored under for an assignment"""
+    return assignment.get('assignment_id', f"assignment_dated_{assignment.get('name', '')}")
 
-        for milestone in milestones:
-            if not milestone.get('completed', False):
-                try:
-                    target_date_str = milestone.get('target_date', '')
-                    if target_date_str:
-                        target_date = datetime.strptime(target_date_str, '%Y-%m-%d').date()
-                        days_until_due = (target_date - current_date).days
-
-                        next_milestone = {
-                            'title': milestone['title'],
-                            'target_date': milestone['target_date'],
-                            'days_until_due': days_until_due
-                        }
-                        break  # Get the first incomplete milestone
-                except Exception:
-                    # If date parsing fails, still include the milestone but with safe defaults
-                    next_milestone = {
-                        'title': milestone.get('title', 'Milestone'),
-                        'target_date': milestone.get('target_date', 'Date TBD'),
-                        'days_until_due': 999  # Safe default
-                    }
-                    break
-
-        return {
-            'has_plan': True,
-            'total': total_milestones,
-            'completed': completed_milestones,
-            'progress_percent': progress_percent,
-            'next_milestone': next_milestone
-        }
-
-    except Exception as e:
-        return {
-            'has_plan': False,
-            'total': 0,
-            'completed': 0,
-            'progress_percent': 0,
-            'next_milestone': None
-        }
+def get_assignment_study_plan_summary(canvas, student_id, assignment):
+    """Get summary info about study plan for an assignment"""
+    assignment_id = get_study_plan_assignment_id(assignment)
+    return canvas.get_study_plan_summaries(student_id, [assignment_id]).get(assignment_id, empty_study_plan_summary())
 
 def complete_milestone(canvas, student_id, assignment, milestone_info):
     """Mark a milestone as complete - SAFE IMPLEMENTATION"""
     try:
-        conn = sqlite3.connect(canvas.db_path)
-        cursor = conn.cursor()
-
-        assignment_id = assignment.get('assignment_id', f"assignment_dated_{assignment.get('name', '')}")
         milestone_title = milestone_info.get('title', '')
 
         if not milestone_title:
             return False
 
-        cursor.execute('''
-            UPDATE study_milestones 
-            SET completed = TRUE 
-            WHERE student_id = ? AND assignment_id = ? AND title = ?
-        ''', (student_id, assignment_id, milestone_title))
-
-        conn.commit()
-        conn.close()
-        return cursor.rowcount > 0  # Return True if a row was actually updated
+        return canvas.milestones.complete_milestone(
+            student_id, get_study_plan_assignment_id(assignment), milestone_title
+        )
 
     except Exception as e:
         return False
@@ -2571,8 +2186,8 @@ def show_assignments_list(student, canvas):
     # Get filter values
     days_filter, course_filter, type_filter = show_assignment_filters(student)
 
-    # Get assignments from database
-    assignments = canvas.get_student_assignments(student['id'])
+    # Get assignments from database - the type filter is an indexed category predicate
+    assignments = canvas.get_student_assignments(student['id'], TYPE_FILTER_CATEGORIES.get(type_filter))
 
     if not assignments:
         st.info("📚 No assignments found. Click 'Sync Now' to get your latest Canvas assignments.")
@@ -2624,17 +2239,6 @@ def show_assignments_list(student, canvas):
                 if assignment_course != course_filter:
                     continue  # Skip assignments not matching the selected course
 
-            # NEW: Apply ASSIGNMENT TYPE filter
-            assignment_category = categorize_assignment(assignment)
-
-            if type_filter == "Assessment Tasks Only" and assignment_category != "Assessment Tasks":
-                continue
-            elif type_filter == "Quizzes & Tests" and assignment_category != "Quizzes & Tests":
-                continue
-            elif type_filter == "Course Materials" and assignment_category != "Course Materials":
-                continue
-            # "All Items" shows everything, so no filtering needed
-
             # If we get here, the assignment passed all filters
             filtered_assignments.append(assignment)
 
@@ -2789,13 +2393,39 @@ def show_ai_study_planning_dated(student, assignment, assignment_index):
         with st.spinner("🤖 AI is creating your study plan..."):
             due_date = assignment.get('parsed_due_date')
             due_date_str = due_date.isoformat() if due_date else (datetime.now() + timedelta(days=7)).isoformat()
-
-            milestones = agent.generate_ai_study_plan(
-                assignment.get('name', 'Assignment'),
-                due_date_str,
-                assignment.get('description', '')
+            assignment_name = assignment.get('name', 'Assignment')
+
+            # Hedge: if the AI plan isn't back quickly, show the rule-based plan and upgrade later
+            milestones, pending_plan = hedge(
+                lambda: agent.generate_ai_study_plan(assignment_name, due_date_str,
+                                                     assignment.get('description', '')),
+                lambda: agent.get_default_milestones(assignment_name, due_date_str),
+                STUDY_PLAN_HEDGE_SECONDS
             )
             st.session_state[f"milestones_{unique_id}"] = milestones
+            if pending_plan:
+                st.session_state[f"pending_milestones_{unique_id}"] = pending_plan
+
+    pending_plan = st.session_state.get(f"pending_milestones_{unique_id}")
+    if pending_plan:
+        if pending_plan.done():
+            del st.session_state[f"pending_milestones_{unique_id}"]
+            try:
+                upgraded_milestones = pending_plan.result()
+            except Exception as e:
+                print(f"❌ Background study plan failed: {str(e)}")
+                upgraded_milestones = None
+
+            if upgraded_milestones:
+                # Drop the starter plan's widget state so the AI plan's values show
+                for j in range(len(st.session_state[f"milestones_{unique_id}"])):
+                    for widget in ("milestone_select", "milestone_desc", "milestone_date"):
+                        st.session_state.pop(f"{widget}_{unique_id}_{j}", None)
+                st.session_state[f"milestones_{unique_id}"] = upgraded_milestones
+                st.success("🤖 Your AI study plan is ready!")
+        else:
+            st.info("🤖 Here's a starter plan - your personalised AI plan will replace it as soon as it's ready.")
+            st.button("🔄 Check for AI Plan", key=f"check_ai_plan_{unique_id}")
 
     milestones = st.session_state[f"milestones_{unique_id}"]
 
@@ -2888,8 +2518,7 @@ def show_ai_study_planning_dated(student, assignment, assignment_index):
 
                 # Test database connection first
                 try:
-                    import sqlite3
-                    conn = sqlite3.connect(canvas.db_path)
+                    conn = database_pool.connect(canvas.db_path)
                     cursor = conn.cursor()
 
                     # Check if table exists
@@ -3242,46 +2871,159 @@ def show_canvas_dashboard(student, canvas):
                 else:
                     st.error(f"Sync failed: {sync_result['message']}")
 
+    show_plan_whole_term(student, canvas)
+
     # Show assignments
     show_assignments_list_with_study_plans(student, canvas) #change made
 
-def get_assignment_counts(student, canvas):
-    """Get assignment counts for user feedback"""
+def get_unplanned_assignments(student_id, canvas):
+    """Assignments that are not yet overdue and have no saved study plan"""
+    current_time = datetime.now()
+    upcoming = []
+    for assignment in canvas.get_student_assignments(student_id):
+        due_date = parse_assignment_due_date(assignment.get('due_date'))
+        if due_date is None or due_date >= current_time:
+            upcoming.append(assignment)
+
+    summaries = canvas.get_study_plan_summaries(student_id, [get_study_plan_assignment_id(a) for a in upcoming])
+    return [a for a in upcoming
+            if not summaries.get(get_study_plan_assignment_id(a), empty_study_plan_summary())['has_plan']]
+
+def show_plan_whole_term(student, canvas):
+    """Generate and save study plans for every unplanned assignment at once"""
+    if not st.button("🗓️ Plan My Whole Term", use_container_width=True, key=f"plan_term_{student['id']}"):
+        return
+
+    if anthropic_breaker.is_open():
+        st.warning(describe_llm_failure(CircuitOpenError()))
+        return
+
+    unplanned = get_unplanned_assignments(student['id'], canvas)
+    if not unplanned:
+        st.info("✅ Every upcoming assignment already has a study plan")
+        return
+
+    if 'career_agent' not in st.session_state:
+        st.session_state.career_agent = SecureFamilyCareerAgent()
+    agent = st.session_state.career_agent
+
+    progress = st.progress(0.0, text=f"🤖 Planning {len(unplanned)} assignments...")
+    start_time = time.time()
+
+    # Only AI-generated plans are saved; failed assignments stay unplanned so the next run retries them
+    plans, failed = plan_assignments(
+        lambda name, due_date, description: agent.generate_ai_study_plan(name, due_date, description, fallback=False),
+        [dict(a, assignment_id=get_study_plan_assignment_id(a)) for a in unplanned],
+        on_progress=lambda done, total: progress.progress(done / total, text=f"🤖 Planned {done} of {total} assignments...")
+    )
+    print(f"🗓️ Planned {len(plans)}/{len(unplanned)} assignments in {time.time() - start_time:.1f}s")
+
+    if plans and not canvas.save_study_milestones_for_assignments(student['id'], plans):
+        st.error("❌ Failed to save study plans")
+        return
+
+    if failed:
+        # No rerun here, so the warning stays visible; saved plans show up on the next interaction
+        st.warning(f"⚠️ Planned {len(plans)} of {len(unplanned)} assignments, {len(failed)} failed: "
+                   f"{', '.join(failed)}. Try again later to plan the rest.")
+    else:
+        st.success(f"✅ Saved study plans for {len(plans)} assignments")
+        st.rerun()
+
+def parse_assignment_due_date(due_date):
+    """Parse a Canvas due date string, returning None if missing or malformed"""
+    if isinstance(due_date, datetime):
+        return due_date
+    if not due_date or not isinstance(due_date, str):
+        return None
     try:
-        assignments = canvas.get_student_assignments(student['id'])
-        if not assignments:
-            return "No assignments found"
+        return datetime.fromisoformat(due_date.replace('Z', '').replace('+00:00', ''))
+    except ValueError:
+        return None
+
+# Assignment type filter option -> stored category ("All Items" has no entry)
+TYPE_FILTER_CATEGORIES = {
+    "Assessment Tasks Only": "Assessment Tasks",
+    "Quizzes & Tests": "Quizzes & Tests",
+    "Course Materials": "Course Materials"
+}
+
+# Urgency bucket -> (row class, badge text, badge class)
+URGENCY_DISPLAY = {
+    "overdue": ("overdue", "OVERDUE", "urgency-overdue"),
+    "due-soon": ("due-soon", "DUE SOON", "urgency-soon"),
+    "future": ("future", "FUTURE", "urgency-future"),
+    "no-date": ("future", "NO DATE", "urgency-future")
+}
+
+def get_urgency_bucket(days_until_due):
+    """Urgency bucket used for badges and counts"""
+    if days_until_due is None:
+        return "no-date"
+    if days_until_due < 0:
+        return "overdue"
+    if days_until_due <= 3:
+        return "due-soon"
+    return "future"
+
+def build_assignment_view_model(assignments, current_time):
+    """Parse dates, bucket urgency and partition by the stored category once per sync generation"""
+    course_names = set()
+    by_category = {}
+    counts = {'overdue': 0, 'due-soon': 0, 'future': 0, 'no-date': 0}
 
-        current_time = datetime.now()
-        overdue = 0
-        due_soon = 0
-        future = 0
-        total = len(assignments)
+    for assignment in assignments:
+        due_date = parse_assignment_due_date(assignment.get('due_date'))
+        days_until_due = (due_date - current_time).days if due_date else None
+
+        assignment['parsed_due_date'] = due_date
+        assignment['days_until_due'] = days_until_due
+        assignment['urgency'] = get_urgency_bucket(days_until_due)
+        assignment['category'] = categorize_assignment(assignment)
+        by_category.setdefault(assignment['category'], []).append(assignment)
+        counts[assignment['urgency']] += 1
+
+        course_name = assignment.get('course', 'Unknown Course')
+        if course_name and course_name.strip():
+            course_names.add(course_name)
+
+    return {
+        'assignments': assignments,
+        'by_category': by_category,
+        'courses': sorted(course_names),
+        'counts': counts
+    }
 
-        for assignment in assignments:
-            try:
-                due_date_str = assignment.get('due_date')
-                if due_date_str and isinstance(due_date_str, str):
-                    clean_date_str = due_date_str.replace('Z', '').replace('+00:00', '')
-                    due_date = datetime.fromisoformat(clean_date_str)
-                    days_until_due = (due_date - current_time).days
+def get_assignment_view_model(student_id, canvas):
+    """Cached, pre-parsed assignments for a student - rebuilt when a sync changes their data"""
+    # Urgency depends on the clock too, so buckets are also refreshed hourly
+    cache_key = (canvas.get_sync_generation(student_id), datetime.now().strftime('%Y-%m-%d %H'))
+    state_key = f"assignment_view_model_{student_id}"
 
-                    if days_until_due < 0:
-                        overdue += 1
-                    elif days_until_due <= 3:
-                        due_soon += 1
-                    else:
-                        future += 1
-            except:
-                future += 1
+    cached = st.session_state.get(state_key)
+    if cached and cached['key'] == cache_key:
+        return cached['model']
 
+    model = build_assignment_view_model(canvas.get_student_assignments(student_id), datetime.now())
+    st.session_state[state_key] = {'key': cache_key, 'model': model}
+    return model
+
+def get_assignment_counts(student, canvas):
+    """Get assignment counts for user feedback"""
+    try:
+        model = get_assignment_view_model(student['id'], canvas)
+        total = len(model['assignments'])
+        if not total:
+            return "No assignments found"
+
+        counts = model['counts']
         status_parts = []
-        if overdue > 0:
-            status_parts.append(f"{overdue} overdue")
-        if due_soon > 0:
-            status_parts.append(f"{due_soon} due soon")
-        if future > 0:
-            status_parts.append(f"{future} future")
+        if counts['overdue'] > 0:
+            status_parts.append(f"{counts['overdue']} overdue")
+        if counts['due-soon'] > 0:
+            status_parts.append(f"{counts['due-soon']} due soon")
+        if counts['future'] > 0:
+            status_parts.append(f"{counts['future']} future")
 
         if status_parts:
             return f"Total: {total} assignments ({', '.join(status_parts)})"
@@ -3293,59 +3035,9 @@ def get_assignment_counts(student, canvas):
 
 def categorize_assignment(assignment):
     """Categorize assignment by type - ULTRA RESTRICTIVE for Assessment Tasks"""
-
-    name = assignment.get('name', '').upper()
-    assignment_type = assignment.get('type', '').upper()
-
-    # Course Materials - documents, syllabi, etc. (CHECK FIRST - EXPANDED)
-    if (
-            'REGISTER OF RECEIPT' in name or
-            'COURSE DOCUMENTS' in name or
-            'SYLLABUS' in name or
-            'SCOPE AND SEQUENCE' in name or
-            'ASSESSMENT SCHEDULE' in name or
-            'REFLECTION' in name or
-            'DRAFT' in name or
-            'SUBMISSION' in name or
-            'INTERVIEW' in name or
-            'PROGRESS' in name or
-            'CHECK' in name or
-            'SURVEY' in name or
-            'CHECKPOINT' in name or
-            'CHAPTER ANALYSIS' in name or  # NEW: Chapter analyses are course materials
-            'WRITING TASK' in name or  # NEW: Writing tasks are typically smaller exercises
-            'PRACTICE' in name or  # NEW: Practice assignments
-            'TUTORIAL' in name  # NEW: Tutorial work
-    ):
-        return "Course Materials"
-
-    # Quizzes & Tests - smaller assessments (EXPANDED)
-    elif (
-            'QUIZ' in name or
-            'TEST' in name or
-            'CQ' in name or  # Check questions like "CQ2.1: Describe..."
-            assignment_type == 'QUIZ' or
-            name.startswith('CQ') or  # NEW: Questions starting with CQ
-            'CHECK IN' in name or  # NEW: Check-in assignments
-            'DISCURSIVE' in name or  # NEW: Discursive writing (typically shorter)
-            'PERSUASIVE' in name  # NEW: Persuasive writing (typically shorter)
-    ):
-        return "Quizzes & Tests"
-
-    # Assessment Tasks - ONLY major starred assessments and clearly labeled assessment tasks
-    elif (
-            name.startswith('⭐') or  # Starred assignments are definitely major assessments
-            (
-                    'ASSESSMENT TASK' in name and 'REGISTER OF RECEIPT' not in name and '#' in name) or  # Only numbered assessment tasks
-            ('INVESTIGATION' in name and '⭐' in name) or  # Only starred investigations
-            ('CAMPAIGN' in name and '⭐' in name) or  # Only starred campaigns
-            ('PROJECT' in name and '⭐' in name)  # Only starred projects
-    ):
-        return "Assessment Tasks"
-
-    # Everything else defaults to Course Materials (SAFEST)
-    else:
-        return "Course Materials"
+    if assignment.get('category'):
+        return assignment['category']
+    return categorize_assignment_name(assignment.get('name', ''), assignment.get('type', ''))
 
 def show_assignment_filters(student):
     """Add filtering UI elements - WITH ASSIGNMENT TYPE FILTER"""
@@ -3355,17 +3047,10 @@ def show_assignment_filters(student):
     # Get assignments to extract course names
     if 'canvas_integrator' in st.session_state:
         canvas = st.session_state.canvas_integrator
-        assignments = canvas.get_student_assignments(student['id'])
-
-        # Extract unique course names
-        course_names = set()
-        for assignment in assignments:
-            course_name = assignment.get('course', 'Unknown Course')
-            if course_name and course_name.strip():
-                course_names.add(course_name)
+        model = get_assignment_view_model(student['id'], canvas)
 
-        # Sort course names and add "All Courses" at the beginning
-        sorted_courses = ["All Courses"] + sorted(list(course_names))
+        # Add "All Courses" at the beginning of the (already sorted) course names
+        sorted_courses = ["All Courses"] + model['courses']
 
         # If no courses found, show default
         if len(sorted_courses) == 1:
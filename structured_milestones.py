@@ -0,0 +1,231 @@
+# structured_milestones.py - Study milestones via forced tool use, validated as they stream in
+# The model has to answer by calling record_study_plan, so its output is JSON matching the schema
+# below; milestones are validated one by one as their objects close, so a reply cut off at
+# max_tokens still yields everything before the cut
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import database_pool
+import schema_migrations
+
+TOOL_NAME = "record_study_plan"
+MAX_MILESTONES = 8
+MILESTONE_TYPES = ["research", "planning", "draft", "writing", "practice", "summary", "review", "revision",
+                   "finalise", "general"]
+
+MILESTONE_TOOL = {
+    "name": TOOL_NAME,
+    "description": "Record the study milestones for the assignment, in the order the student should complete them.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "milestones": {
+                "type": "array",
+                "minItems": 1,
+                "maxItems": MAX_MILESTONES,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "description": "Short, specific milestone title"},
+                        "description": {"type": "string", "description": "Concrete actions for this milestone"},
+                        "type": {"type": "string", "enum": MILESTONE_TYPES},
+                        "days_before_due": {"type": "integer", "minimum": 0,
+                                            "description": "Days before the due date this should be done"},
+                        "estimated_hours": {"type": "number", "minimum": 0.5, "maximum": 12}
+                    },
+                    "required": ["title", "description", "days_before_due"]
+                }
+            }
+        },
+        "required": ["milestones"]
+    }
+}
+
+
+class MilestoneParseError(ValueError):
+    """A paid completion came back without a single usable milestone"""
+
+
+@dataclass
+class MilestoneSpec:
+    title: str
+    description: str
+    days_before_due: int
+    type: str = "general"
+    estimated_hours: float = 2.0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MilestoneSpec':
+        """Validate one milestone from the tool input; raises ValueError if it can't be used"""
+        if not isinstance(data, dict):
+            raise ValueError(f"Milestone is not an object: {data!r}")
+
+        title = str(data.get('title') or '').strip()
+        if not title:
+            raise ValueError("Milestone has no title")
+
+        days_before_due = int(data['days_before_due'])  # KeyError/ValueError/TypeError if unusable
+        if days_before_due < 0:
+            raise ValueError(f"Negative days_before_due: {days_before_due}")
+
+        milestone_type = data.get('type') if data.get('type') in MILESTONE_TYPES else 'general'
+        estimated_hours = float(data.get('estimated_hours') or 2.0)
+
+        return cls(
+            title=title[:120],
+            description=str(data.get('description') or 'Work on assignment').strip(),
+            days_before_due=days_before_due,
+            type=milestone_type,
+            estimated_hours=min(max(estimated_hours, 0.5), 12.0)
+        )
+
+    def target_date(self, due_date: datetime) -> datetime:
+        """Target date for this milestone, never in the past"""
+        target = due_date - timedelta(days=self.days_before_due)
+        if target <= datetime.now():
+            target = datetime.now() + timedelta(days=1)
+        return target
+
+    def to_milestone(self, due_date: datetime) -> Dict:
+        return {
+            'title': self.title,
+            'description': self.description,
+            'type': self.type,
+            'target_date': self.target_date(due_date),
+            'estimated_hours': self.estimated_hours
+        }
+
+
+def parse_milestones(tool_input: Dict) -> List[MilestoneSpec]:
+    """Every valid milestone in a record_study_plan input; invalid ones are dropped"""
+    milestones = []
+    for item in (tool_input or {}).get('milestones') or []:
+        try:
+            milestones.append(MilestoneSpec.from_dict(item))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ Dropped invalid milestone: {str(e)}")
+    return milestones
+
+
+class IncrementalMilestoneParser:
+    """Pulls each complete milestone object out of the tool input JSON as it streams in"""
+
+    # {"milestones": [ {...}, {...} ]} - milestone objects open at nesting depth 3
+    MILESTONE_DEPTH = 3
+
+    def __init__(self):
+        self.milestones: List[MilestoneSpec] = []
+        self.invalid = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[MilestoneSpec]:
+        """Consume a partial_json chunk; returns the milestones it completed"""
+        completed = []
+        for char in chunk:
+            if self._current is not None:
+                self._current.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                if char == '{' and self._depth == self.MILESTONE_DEPTH:
+                    self._current = ['{']
+            elif char in '}]':
+                if char == '}' and self._depth == self.MILESTONE_DEPTH and self._current is not None:
+                    try:
+                        completed.append(MilestoneSpec.from_dict(json.loads(''.join(self._current))))
+                    except (KeyError, TypeError, ValueError):
+                        self.invalid += 1
+                    self._current = None
+                self._depth -= 1
+
+        self.milestones.extend(completed)
+        return completed
+
+
+def generate_milestones(client, prompt: str, model: str, max_tokens: int,
+                        on_milestone: Optional[Callable[[MilestoneSpec], None]] = None) -> List[MilestoneSpec]:
+    """One streamed, tool-forced call; raises MilestoneParseError if nothing usable came back"""
+    parser = IncrementalMilestoneParser()
+
+    with client.messages.stream(
+        model=model,
+        max_tokens=max_tokens,
+        tools=[MILESTONE_TOOL],
+        tool_choice={"type": "tool", "name": TOOL_NAME},
+        messages=[{"role": "user", "content": prompt}]
+    ) as stream:
+        for event in stream:
+            if event.type == 'content_block_delta' and event.delta.type == 'input_json_delta':
+                for milestone in parser.feed(event.delta.partial_json):
+                    if on_milestone:
+                        on_milestone(milestone)
+        final_message = stream.get_final_message()
+
+    tool_input = next((block.input for block in final_message.content
+                       if block.type == 'tool_use' and block.name == TOOL_NAME), None)
+    milestones = parse_milestones(tool_input) if isinstance(tool_input, dict) else []
+
+    # A reply truncated at max_tokens may not parse as a whole, but its finished objects do
+    if len(parser.milestones) > len(milestones):
+        milestones = parser.milestones
+
+    if not milestones:
+        raise MilestoneParseError(f"No usable milestones (stop_reason={final_message.stop_reason})")
+    return milestones[:MAX_MILESTONES]
+
+
+def log_generation(db_path: str, source: str, student_id: Optional[str], assignment_id: Optional[str],
+                   success: bool, milestones_generated: int, parse_failed: bool = False,
+                   error_message: str = None):
+    """Record one generation attempt in milestone_generation_log"""
+    try:
+        schema_migrations.ensure_schema(db_path)
+        conn = database_pool.connect(db_path)
+        with conn:
+            conn.execute('''
+                INSERT INTO milestone_generation_log
+                (student_id, assignment_id, source, success, parse_failed, milestones_generated, error_message)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (student_id, assignment_id, source, success, parse_failed, milestones_generated, error_message))
+        conn.close()
+
+    except Exception as e:
+        print(f"Error logging milestone generation: {e}")
+
+
+def get_parse_failure_rate(db_path: str = database_pool.DEFAULT_DB_PATH, days: int = 7) -> Dict:
+    """Share of paid completions in the last `days` that yielded no usable milestones"""
+    schema_migrations.ensure_schema(db_path)
+    conn = database_pool.connect(db_path)
+    cursor = conn.cursor()
+    # Completions that reached parsing - failed API calls never produced anything to parse
+    cursor.execute('''
+        SELECT COUNT(*), COALESCE(SUM(CASE WHEN parse_failed THEN 1 ELSE 0 END), 0)
+        FROM milestone_generation_log
+        WHERE generation_date >= datetime('now', ?)
+          AND (success OR parse_failed)
+    ''', (f'-{days} days',))
+    completions, parse_failures = cursor.fetchone()
+    conn.close()
+
+    return {
+        'completions': completions,
+        'parse_failures': parse_failures,
+        'parse_failure_rate': parse_failures / completions if completions else 0.0
+    }
@@ -0,0 +1,168 @@
+from typing import Dict, List, Tuple
+
+import database_pool
+import schema_migrations
+
+# SQLite's default limit on bound parameters per statement is 999
+MAX_IDS_PER_QUERY = 900
+
+
+def empty_study_plan_summary() -> Dict:
+    return {
+        'has_plan': False,
+        'total': 0,
+        'completed': 0,
+        'progress_percent': 0,
+        'next_milestone': None
+    }
+
+
+class StudyMilestoneRepository:
+    """Reads and writes study_milestones; the schema is owned by schema_migrations"""
+
+    def __init__(self, db_path="community_career_explorer.db"):
+        self.db_path = db_path
+        schema_migrations.ensure_schema(self.db_path)
+
+    def get_milestones(self, student_id: str, assignment_id: str) -> List[Dict]:
+        """Get the milestones for one assignment, earliest first"""
+        return self.get_milestones_for_assignments(student_id, [assignment_id]).get(assignment_id, [])
+
+    def get_milestones_for_assignments(self, student_id: str, assignment_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Get milestones for many assignments in one query, keyed by assignment_id"""
+        assignment_ids = list(dict.fromkeys(assignment_ids))
+        milestones = {assignment_id: [] for assignment_id in assignment_ids}
+        if not assignment_ids:
+            return milestones
+
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+
+        for start in range(0, len(assignment_ids), MAX_IDS_PER_QUERY):
+            chunk = assignment_ids[start:start + MAX_IDS_PER_QUERY]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT assignment_id, title, description, target_date, completed
+                FROM study_milestones
+                WHERE student_id = ? AND assignment_id IN ({placeholders})
+                ORDER BY assignment_id, target_date ASC
+            ''', (student_id, *chunk))
+
+            for assignment_id, title, description, target_date, completed in cursor.fetchall():
+                milestones[assignment_id].append({
+                    'title': title,
+                    'description': description,
+                    'target_date': target_date,
+                    'completed': bool(completed)
+                })
+
+        conn.close()
+        return milestones
+
+    def get_study_plan_summaries(self, student_id: str, assignment_ids: List[str]) -> Dict[str, Dict]:
+        """Progress and next incomplete milestone for many assignments, computed in one SQL pass"""
+        assignment_ids = list(dict.fromkeys(assignment_ids))
+        summaries = {assignment_id: empty_study_plan_summary() for assignment_id in assignment_ids}
+        if not assignment_ids:
+            return summaries
+
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+
+        for start in range(0, len(assignment_ids), MAX_IDS_PER_QUERY):
+            chunk = assignment_ids[start:start + MAX_IDS_PER_QUERY]
+            placeholders = ','.join('?' * len(chunk))
+            # Row 1 of each assignment is its earliest incomplete, dated milestone (if it has one);
+            # the per-assignment totals ride along on every row via the unordered window
+            cursor.execute(f'''
+                WITH ranked AS (
+                    SELECT assignment_id, title, target_date, completed,
+                           COUNT(*) OVER per_assignment AS total,
+                           SUM(CASE WHEN completed THEN 1 ELSE 0 END) OVER per_assignment AS completed_count,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY assignment_id
+                               ORDER BY (completed OR COALESCE(target_date, '') = ''), target_date, id
+                           ) AS position
+                    FROM study_milestones
+                    WHERE student_id = ? AND assignment_id IN ({placeholders})
+                    WINDOW per_assignment AS (PARTITION BY assignment_id)
+                )
+                SELECT assignment_id, total, completed_count,
+                       completed_count * 100 / total AS progress_percent,
+                       CASE WHEN NOT completed AND COALESCE(target_date, '') != '' THEN title END,
+                       CASE WHEN NOT completed AND COALESCE(target_date, '') != '' THEN target_date END,
+                       CAST(julianday(date(target_date)) - julianday(date('now', 'localtime')) AS INTEGER)
+                FROM ranked
+                WHERE position = 1
+            ''', (student_id, *chunk))
+
+            for (assignment_id, total, completed_count, progress_percent,
+                 next_title, next_target_date, days_until_due) in cursor.fetchall():
+                next_milestone = None
+                if next_title is not None:
+                    next_milestone = {
+                        'title': next_title,
+                        'target_date': next_target_date,
+                        'days_until_due': days_until_due if days_until_due is not None else 999
+                    }
+
+                summaries[assignment_id] = {
+                    'has_plan': True,
+                    'total': total,
+                    'completed': completed_count,
+                    'progress_percent': progress_percent,
+                    'next_milestone': next_milestone
+                }
+
+        conn.close()
+        return summaries
+
+    def save_milestones(self, student_id: str, assignment_id: str, assignment_name: str,
+                        milestones: List[Dict]) -> bool:
+        """Replace an assignment's milestones in a single transaction"""
+        return self.save_milestones_for_assignments(student_id, [(assignment_id, assignment_name, milestones)])
+
+    def save_milestones_for_assignments(self, student_id: str,
+                                        plans: List[Tuple[str, str, List[Dict]]]) -> bool:
+        """Replace milestones for many (assignment_id, assignment_name, milestones) in one transaction"""
+        if not plans:
+            return True
+
+        conn = database_pool.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany('''
+                    DELETE FROM study_milestones
+                    WHERE student_id = ? AND assignment_id = ?
+                ''', [(student_id, assignment_id) for assignment_id, _, _ in plans])
+
+                conn.executemany('''
+                    INSERT INTO study_milestones
+                    (student_id, assignment_id, assignment_name, title, description, target_date, completed)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (student_id, assignment_id, assignment_name,
+                     milestone.get('title', f'Milestone {i + 1}'),
+                     milestone.get('description', ''),
+                     milestone.get('target_date', ''),
+                     False)
+                    for assignment_id, assignment_name, milestones in plans
+                    for i, milestone in enumerate(milestones)
+                ])
+            return True
+        finally:
+            conn.close()
+
+    def complete_milestone(self, student_id: str, assignment_id: str, title: str) -> bool:
+        """Mark a milestone complete; returns False if nothing matched"""
+        conn = database_pool.connect(self.db_path)
+        try:
+            with conn:
+                cursor = conn.execute('''
+                    UPDATE study_milestones
+                    SET completed = TRUE, completed_date = CURRENT_TIMESTAMP
+                    WHERE student_id = ? AND assignment_id = ? AND title = ?
+                ''', (student_id, assignment_id, title))
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
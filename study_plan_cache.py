@@ -0,0 +1,130 @@
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import database_pool
+import schema_migrations
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def normalise_text(text: str) -> str:
+    """Lower-case and collapse whitespace so trivially different copies share a key"""
+    return re.sub(r'\s+', ' ', (text or '')).strip().lower()
+
+
+def parse_due_date(due_date) -> Optional[datetime]:
+    if isinstance(due_date, datetime):
+        return due_date
+    try:
+        return datetime.fromisoformat(str(due_date).replace('Z', '').replace('+00:00', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+class StudyPlanCache:
+    """SQLite cache of AI study plans with a TTL and least-recently-used eviction"""
+
+    def __init__(self, db_path="community_career_explorer.db", ttl_days: int = DEFAULT_TTL_DAYS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl = timedelta(days=ttl_days)
+        self.max_entries = max_entries
+        schema_migrations.ensure_schema(self.db_path)
+
+    def make_key(self, assignment_name: str, description: str, due_date, prompt_version: str) -> str:
+        """Hash of the normalised assignment content, due day and prompt version"""
+        due = parse_due_date(due_date)
+        parts = [
+            prompt_version,
+            normalise_text(assignment_name),
+            normalise_text(description),
+            due.strftime('%Y-%m-%d') if due else ''
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, assignment_name: str, description: str, due_date, prompt_version: str) -> Optional[List[Dict]]:
+        """Return the cached plan re-dated against today, or None on a miss"""
+        due = parse_due_date(due_date)
+        if not due:
+            return None
+
+        cache_key = self.make_key(assignment_name, description, due, prompt_version)
+        conn = database_pool.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT plan, created_at FROM ai_study_plan_cache WHERE cache_key = ?', (cache_key,))
+        result = cursor.fetchone()
+
+        if not result:
+            conn.close()
+            return None
+
+        plan, created_at = result
+        if datetime.fromisoformat(created_at) < datetime.now() - self.ttl:
+            cursor.execute('DELETE FROM ai_study_plan_cache WHERE cache_key = ?', (cache_key,))
+            conn.commit()
+            conn.close()
+            return None
+
+        cursor.execute('''
+            UPDATE ai_study_plan_cache
+            SET last_used_at = ?, hit_count = hit_count + 1
+            WHERE cache_key = ?
+        ''', (datetime.now().isoformat(), cache_key))
+        conn.commit()
+        conn.close()
+
+        return self._redate(json.loads(plan), due)
+
+    def put(self, assignment_name: str, description: str, due_date, prompt_version: str, milestones: List[Dict]):
+        """Store a freshly generated plan, evicting the least recently used entries over the limit"""
+        due = parse_due_date(due_date)
+        if not due or not milestones:
+            return
+
+        # Dates are stored as days before the due date so a hit can be re-dated
+        plan = []
+        for milestone in milestones:
+            entry = dict(milestone)
+            target = parse_due_date(milestone.get('target_date'))
+            entry['days_before_due'] = (due.date() - target.date()).days if target else None
+            entry.pop('target_date', None)
+            plan.append(entry)
+
+        now = datetime.now().isoformat()
+        conn = database_pool.connect(self.db_path)
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO ai_study_plan_cache
+                (cache_key, prompt_version, plan, created_at, last_used_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (self.make_key(assignment_name, description, due, prompt_version), prompt_version,
+                  json.dumps(plan), now, now))
+
+            conn.execute('''
+                DELETE FROM ai_study_plan_cache WHERE cache_key IN (
+                    SELECT cache_key FROM ai_study_plan_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+        conn.close()
+
+    def _redate(self, plan: List[Dict], due: datetime) -> List[Dict]:
+        today = datetime.now().date()
+        milestones = []
+        for entry in plan:
+            milestone = dict(entry)
+            days_before_due = milestone.pop('days_before_due', None)
+            if days_before_due is None:
+                target = today
+            else:
+                # Never schedule a milestone in the past, or after the due date
+                target = min(max(due.date() - timedelta(days=days_before_due), today), max(due.date(), today))
+            milestone['target_date'] = target.strftime('%Y-%m-%d')
+            milestones.append(milestone)
+        return milestones
@@ -0,0 +1,54 @@
+# term_planner.py - Generate study plans for a whole term's assignments in parallel
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_WORKERS = 16
+
+
+class StudyPlanUnavailable(Exception):
+    """Raised by a plan generator instead of falling back to default milestones"""
+
+
+def plan_assignments(generate_plan: Callable[[str, str, str], List[Dict]], assignments: List[Dict],
+                     max_workers: int = DEFAULT_MAX_WORKERS,
+                     on_progress: Optional[Callable[[int, int], None]] = None
+                     ) -> Tuple[List[Tuple[str, str, List[Dict]]], List[str]]:
+    """Run generate_plan(name, due_date, description) for each assignment across a bounded pool.
+
+    Returns (plans, failed): (assignment_id, assignment_name, milestones) for every plan that came
+    back, and the names of assignments whose generator raised or returned nothing. Rate and
+    concurrency limits live in generate_plan, so the pool size only caps local threads.
+    on_progress(done, total) is called from the calling thread, so it may touch the UI.
+    """
+    if not assignments:
+        return [], []
+
+    plans = []
+    failed = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(assignments))) as executor:
+        futures = {}
+        for assignment in assignments:
+            due_date = assignment.get('due_date') or (datetime.now() + timedelta(days=7)).isoformat()
+            future = executor.submit(generate_plan, assignment['name'], due_date,
+                                     assignment.get('description', ''))
+            futures[future] = assignment
+
+        for future in as_completed(futures):
+            assignment = futures[future]
+            done += 1
+            try:
+                milestones = future.result()
+                if milestones:
+                    plans.append((assignment['assignment_id'], assignment['name'], milestones))
+                else:
+                    failed.append(assignment['name'])
+            except Exception as e:
+                print(f"❌ Study plan failed for {assignment['name']}: {str(e)}")
+                failed.append(assignment['name'])
+
+            if on_progress:
+                on_progress(done, len(assignments))
+
+    return plans, failed
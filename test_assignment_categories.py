@@ -0,0 +1,54 @@
+import itertools
+
+import pytest
+
+from assignment_categories import (ASSESSMENT_TASKS, COURSE_MATERIALS, QUIZZES_AND_TESTS, STAR,
+                                   categorize_assignment)
+
+
+def legacy_categorize(name, assignment_type=''):
+    """The if-chain the compiled rules replaced, kept as the reference behaviour"""
+    name = name.upper()
+    assignment_type = assignment_type.upper()
+    if any(keyword in name for keyword in [
+            'REGISTER OF RECEIPT', 'COURSE DOCUMENTS', 'SYLLABUS', 'SCOPE AND SEQUENCE', 'ASSESSMENT SCHEDULE',
+            'REFLECTION', 'DRAFT', 'SUBMISSION', 'INTERVIEW', 'PROGRESS', 'CHECK', 'SURVEY', 'CHECKPOINT',
+            'CHAPTER ANALYSIS', 'WRITING TASK', 'PRACTICE', 'TUTORIAL']):
+        return COURSE_MATERIALS
+    if (any(keyword in name for keyword in ['QUIZ', 'TEST', 'CQ', 'CHECK IN', 'DISCURSIVE', 'PERSUASIVE'])
+            or assignment_type == 'QUIZ'):
+        return QUIZZES_AND_TESTS
+    if (name.startswith(STAR) or ('ASSESSMENT TASK' in name and '#' in name)
+            or any(keyword in name and STAR in name for keyword in ['INVESTIGATION', 'CAMPAIGN', 'PROJECT'])):
+        return ASSESSMENT_TASKS
+    return COURSE_MATERIALS
+
+
+@pytest.mark.parametrize('name, assignment_type, expected', [
+    ("Topic 3 Quiz", '', QUIZZES_AND_TESTS),
+    ("CQ2.1: Describe the water cycle", '', QUIZZES_AND_TESTS),
+    ("Persuasive speech", '', QUIZZES_AND_TESTS),
+    ("Week 4 homework", 'quiz', QUIZZES_AND_TESTS),
+    ("Assessment Task #2: Essay", '', ASSESSMENT_TASKS),
+    ("Assessment Task 2: Essay", '', COURSE_MATERIALS),
+    (f"{STAR} Science Investigation", '', ASSESSMENT_TASKS),
+    ("Science Investigation", '', COURSE_MATERIALS),
+    (f"Community Campaign {STAR}", '', ASSESSMENT_TASKS),
+    ("Practice Test", '', COURSE_MATERIALS),
+    ("Weekly Check In", '', COURSE_MATERIALS),
+    ("Assessment Task #1 Register of Receipt", '', COURSE_MATERIALS),
+    ("Essay", '', COURSE_MATERIALS),
+    ("", '', COURSE_MATERIALS),
+    (None, None, COURSE_MATERIALS),
+])
+def test_categorize_assignment(name, assignment_type, expected):
+    assert categorize_assignment(name, assignment_type) == expected
+
+
+def test_matches_the_legacy_categorizer():
+    fragments = ['', 'Quiz', 'Test', 'CQ1', 'Check', 'Check In', 'Checkpoint', 'Draft', 'Assessment Task',
+                 '#3', STAR, 'Project', 'Investigation', 'Contest', 'Persuasive', 'Syllabus']
+    for parts in itertools.permutations(fragments, 3):
+        name = ' '.join(parts)
+        for assignment_type in ('', 'QUIZ'):
+            assert categorize_assignment(name, assignment_type) == legacy_categorize(name, assignment_type), name
@@ -0,0 +1,48 @@
+from career_chat import build_career_chat_request
+from check_prompt_cache import check_prompt_cache
+
+STUDENT = {'name': 'Sam', 'year_level': 11, 'interests': ['Biology']}
+HISTORY = [{'user_message': f"question {i}", 'ai_response': f"answer {i}"} for i in range(3)]
+
+
+def breakpoints(blocks):
+    return [i for i, block in enumerate(blocks) if isinstance(block, dict) and 'cache_control' in block]
+
+
+def test_single_breakpoint_closes_the_stable_prefix():
+    request = build_career_chat_request(STUDENT, HISTORY, "What next?", summary="Likes science")
+
+    assert len(request['system']) == 3
+    assert breakpoints(request['system']) == [2]
+    for message in request['messages']:
+        if isinstance(message['content'], list):
+            assert breakpoints(message['content']) == []
+
+
+def test_breakpoint_moves_to_profile_without_a_summary():
+    request = build_career_chat_request(STUDENT, [], "Hi")
+
+    assert breakpoints(request['system']) == [1]
+
+
+class FakeMessages:
+    def __init__(self, usages):
+        self.usages = list(usages)
+
+    def create(self, **kwargs):
+        return type('Message', (), {'usage': self.usages.pop(0)})()
+
+
+def fake_client(*usages):
+    return type('Client', (), {'messages': FakeMessages(usages)})()
+
+
+def usage(uncached, written=0, read=0):
+    return type('Usage', (), {'input_tokens': uncached, 'output_tokens': 10,
+                              'cache_creation_input_tokens': written, 'cache_read_input_tokens': read})()
+
+
+def test_check_prompt_cache_needs_a_read_on_the_second_turn():
+    assert check_prompt_cache(fake_client(usage(20, written=1300), usage(20, read=1300)))
+    assert not check_prompt_cache(fake_client(usage(20, written=1300), usage(1320)))
+    assert not check_prompt_cache(fake_client(usage(900), usage(900)))
@@ -0,0 +1,91 @@
+import database_pool
+from conversation_memory import HISTORY_TOKEN_BUDGET, MAX_RECENT_EXCHANGES, RECENT_EXCHANGES, ConversationMemory
+
+
+class FakeMessages:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        text = f"summary {len(self.requests)}"
+        return type('Message', (), {'content': [type('Block', (), {'text': text})()]})()
+
+
+class FakeClient:
+    """Stands in for the shared client: with_options() and messages.create() only"""
+
+    def __init__(self):
+        self.messages = FakeMessages()
+
+    def with_options(self, **kwargs):
+        return self
+
+
+def add_exchanges(memory, count, student_id='s1', length=10):
+    conn = database_pool.connect(memory.db_path)
+    with conn:
+        conn.executemany('''
+            INSERT INTO conversations (student_id, user_message, agent_response) VALUES (?, ?, ?)
+        ''', [(student_id, f"question {i} " + 'q' * length, f"answer {i} " + 'a' * length) for i in range(count)])
+    conn.close()
+
+
+def test_short_history_is_left_alone(db_path):
+    memory = ConversationMemory(db_path)
+    add_exchanges(memory, MAX_RECENT_EXCHANGES)
+    client = FakeClient()
+
+    assert not memory.compact(client, 's1')
+    assert client.messages.requests == []
+    assert memory.get_context('s1') == ('', memory._get_exchanges('s1', 0))
+
+
+def test_compacts_once_exchanges_outnumber_the_replay_window(db_path):
+    memory = ConversationMemory(db_path)
+    add_exchanges(memory, MAX_RECENT_EXCHANGES + 1)
+    client = FakeClient()
+
+    assert memory.compact(client, 's1')
+
+    summary, recent = memory.get_context('s1')
+    assert summary == 'summary 1'
+    assert [e['user_message'].split()[1] for e in recent] == [str(MAX_RECENT_EXCHANGES - 1), str(MAX_RECENT_EXCHANGES)]
+    assert len(recent) == RECENT_EXCHANGES
+    # Every exchange that left the replay window went into the summary request
+    transcript = client.messages.requests[0]['messages'][0]['content']
+    assert all(f"question {i} " in transcript for i in range(MAX_RECENT_EXCHANGES + 1 - RECENT_EXCHANGES))
+
+
+def test_compacts_long_exchanges_in_budget_sized_batches(db_path):
+    memory = ConversationMemory(db_path)
+    # Each exchange is a little over half the budget, so each summary call folds one
+    add_exchanges(memory, 4, length=HISTORY_TOKEN_BUDGET * 4 // 3)
+    client = FakeClient()
+
+    assert memory.compact(client, 's1')
+
+    assert len(client.messages.requests) == 2
+    summary, recent = memory.get_context('s1')
+    assert summary == 'summary 2'
+    assert len(recent) == 1  # The two kept exchanges are over budget together
+    # The second call builds on the first summary
+    assert 'summary 1' in client.messages.requests[1]['messages'][0]['content']
+
+
+def test_force_folds_all_but_keep_recent(db_path):
+    memory = ConversationMemory(db_path)
+    add_exchanges(memory, 3)
+    add_exchanges(memory, 3, student_id='s2')
+
+    assert memory.compact(FakeClient(), 's1', keep_recent=0, force=True)
+
+    assert memory.get_context('s1') == ('summary 1', [])
+    assert len(memory.get_context('s2')[1]) == 3
+
+
+def test_no_client_means_no_compaction(db_path):
+    memory = ConversationMemory(db_path)
+    add_exchanges(memory, MAX_RECENT_EXCHANGES + 3)
+
+    assert not memory.compact(None, 's1')
@@ -0,0 +1,99 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+
+import database_pool
+from job_outlook_crawler import JobOutlookCrawler
+from job_outlook_fixture_site import FIXTURE_SITE_DIR, JobOutlookFixtureSite
+
+# Linked from the catalogue but has no page - the site answers 404
+RETIRED_SLUG = 'switchboard-operators'
+
+
+@pytest.fixture
+def site(tmp_path):
+    # A copy, so a test can retire pages
+    directory = str(tmp_path / "site")
+    shutil.copytree(FIXTURE_SITE_DIR, directory)
+    site = JobOutlookFixtureSite(directory)
+    site.start()
+    yield site
+    site.stop()
+
+
+def make_crawler(db_path, site):
+    return JobOutlookCrawler(db_path, site.base_url, requests_per_second=1000, batch_size=5)
+
+
+def query(db_path, sql, params=()):
+    conn = database_pool.connect(db_path)
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+def test_interrupted_crawl_resumes_where_it_stopped(db_path, site):
+    first = make_crawler(db_path, site).crawl(max_pages=7)
+    assert first['fetched'] == 7
+
+    rest = make_crawler(db_path, site).crawl()
+
+    frontier_size = query(db_path, 'SELECT COUNT(*) FROM crawl_frontier')[0][0]
+    assert first['fetched'] + rest['fetched'] == frontier_size
+    assert site.requests == frontier_size  # No page was fetched twice
+    assert query(db_path, "SELECT COUNT(*) FROM crawl_frontier WHERE status NOT IN ('done', 'gone')") == [(0,)]
+    assert query(db_path, 'SELECT COUNT(*) FROM occupations')[0][0] > 20
+
+
+def test_immediate_rerun_fetches_nothing(db_path, site):
+    make_crawler(db_path, site).crawl()
+    requests = site.requests
+
+    stats = make_crawler(db_path, site).crawl()
+
+    assert stats['fetched'] == 0
+    assert site.requests == requests
+
+
+def test_rerun_from_another_origin_reuses_the_frontier(db_path, site):
+    make_crawler(db_path, site).crawl()
+    frontier = query(db_path, 'SELECT path FROM crawl_frontier ORDER BY path')
+
+    mirror = JobOutlookFixtureSite(site.directory)
+    mirror.start()
+    try:
+        assert make_crawler(db_path, mirror).crawl()['fetched'] == 0
+    finally:
+        mirror.stop()
+    assert query(db_path, 'SELECT path FROM crawl_frontier ORDER BY path') == frontier
+
+
+def test_missing_page_is_marked_gone(db_path, site):
+    make_crawler(db_path, site).crawl()
+
+    assert query(db_path, 'SELECT status FROM crawl_frontier WHERE path = ?',
+                 (f'/occupations/{RETIRED_SLUG}',)) == [('gone',)]
+    assert query(db_path, 'SELECT COUNT(*) FROM occupations WHERE slug = ?', (RETIRED_SLUG,)) == [(0,)]
+
+
+def test_retired_occupation_is_removed_on_recrawl(db_path, site):
+    make_crawler(db_path, site).crawl()
+    slug = 'chefs'
+    assert query(db_path, 'SELECT COUNT(*) FROM occupations_fts WHERE slug = ?', (slug,)) == [(1,)]
+
+    # The page disappears and comes due for its weekly re-crawl
+    os.remove(os.path.join(site.directory, "occupations", f"{slug}.html"))
+    conn = database_pool.connect(db_path)
+    with conn:
+        conn.execute('UPDATE crawl_frontier SET next_fetch_at = ? WHERE path = ?',
+                     ((datetime.now() - timedelta(minutes=1)).isoformat(), f'/occupations/{slug}'))
+    conn.close()
+
+    stats = make_crawler(db_path, site).crawl()
+
+    assert (stats['fetched'], stats['gone']) == (1, 1)
+    assert query(db_path, 'SELECT status FROM crawl_frontier WHERE path = ?', (f'/occupations/{slug}',)) == [('gone',)]
+    assert query(db_path, 'SELECT COUNT(*) FROM occupations WHERE slug = ?', (slug,)) == [(0,)]
+    assert query(db_path, 'SELECT COUNT(*) FROM occupations_fts WHERE slug = ?', (slug,)) == [(0,)]
@@ -0,0 +1,150 @@
+import threading
+
+import anthropic
+import pytest
+
+import llm_resilience
+from llm_resilience import CircuitBreaker, CircuitOpenError, hedge, resilient_call
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_resilience.time, 'monotonic', fake)
+    return fake
+
+
+class FakeClient:
+    def __init__(self):
+        self.options = []
+
+    def with_options(self, **kwargs):
+        self.options.append(kwargs)
+        return self
+
+
+def connection_error():
+    # The request is only kept for error reporting
+    return anthropic.APIConnectionError(request=None)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after_seconds=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+
+    assert not breaker.is_open()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=5)
+    breaker.record_success(1.0)
+    assert not breaker.is_open()
+
+    breaker.record_success(6.0)
+
+    assert breaker.is_open()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # Only the probe
+
+    breaker.record_success(0.1)
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after_seconds=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.is_open()
+    clock.now += 29
+    assert not breaker.allow_request()
+
+
+def test_resilient_call_applies_the_deadline():
+    client = FakeClient()
+
+    assert resilient_call(client, lambda c: 'reply', 12, max_retries=1, breaker=CircuitBreaker()) == 'reply'
+    assert client.options == [{'timeout': 12, 'max_retries': 1}]
+
+
+def test_resilient_call_trips_only_on_dependency_failures():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    def bad_request(client):
+        raise ValueError("unusable output")
+
+    def unreachable(client):
+        raise connection_error()
+
+    with pytest.raises(ValueError):
+        resilient_call(FakeClient(), bad_request, 5, breaker=breaker)
+    assert not breaker.is_open()
+
+    with pytest.raises(anthropic.APIConnectionError):
+        resilient_call(FakeClient(), unreachable, 5, breaker=breaker)
+    assert breaker.is_open()
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        resilient_call(FakeClient(), lambda client: calls.append(client), 5, breaker=breaker)
+    assert calls == []
+
+
+def test_hedge_returns_the_primary_when_it_is_quick():
+    result, pending = hedge(lambda: 'ai', lambda: 'rules', hedge_after_seconds=5)
+
+    assert (result, pending) == ('ai', None)
+
+
+def test_hedge_serves_the_fallback_and_keeps_the_primary_running():
+    release = threading.Event()
+
+    def slow_primary():
+        release.wait(5)
+        return 'ai'
+
+    result, pending = hedge(slow_primary, lambda: 'rules', hedge_after_seconds=0.05)
+    assert result == 'rules'
+
+    release.set()
+    assert pending.result(timeout=5) == 'ai'
+
+
+def test_hedge_falls_back_when_the_primary_fails():
+    def failing_primary():
+        raise connection_error()
+
+    assert hedge(failing_primary, lambda: 'rules', hedge_after_seconds=5) == ('rules', None)
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from rate_limiter import HostRateLimiter, TokenBucket
+
+
+def test_one_bucket_per_host():
+    limiter = HostRateLimiter(2.0, host_rates={'www.abs.gov.au': 0.5})
+
+    abs_bucket = limiter.bucket_for('https://www.abs.gov.au/statistics/labour')
+
+    assert limiter.bucket_for('https://www.abs.gov.au/other?page=2') is abs_bucket
+    assert abs_bucket.rate == 0.5
+    outlook_bucket = limiter.bucket_for('https://joboutlook.gov.au/occupations')
+    assert outlook_bucket is not abs_bucket
+    assert outlook_bucket.rate == 2.0
+
+
+def test_ports_are_separate_hosts():
+    limiter = HostRateLimiter(1.0)
+
+    assert limiter.bucket_for('http://127.0.0.1:8090/') is not limiter.bucket_for('http://127.0.0.1:8091/')
+
+
+def test_burst_sets_bucket_capacity():
+    limiter = HostRateLimiter(1.0, burst=3)
+    bucket = limiter.bucket_for('https://example.com/')
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_acquire() > 0
+
+
+def test_acquire_async_paces_each_host_independently():
+    limiter = HostRateLimiter(20.0)
+    urls = ['https://a.example/1', 'https://a.example/2', 'https://a.example/3', 'https://b.example/1']
+    finished = {}
+
+    async def fetch(url):
+        await limiter.acquire_async(url)
+        finished[url] = time.monotonic()
+
+    async def crawl():
+        started = time.monotonic()
+        await asyncio.gather(*(fetch(url) for url in urls))
+        return started
+
+    started = asyncio.run(crawl())
+
+    # Three requests to one host at 20/s need ~0.1s; the other host isn't held up by them
+    assert finished['https://b.example/1'] - started < 0.05
+    assert max(finished[url] for url in urls[:3]) - started >= 0.09
+
+
+def test_token_bucket_wait_matches_the_rate():
+    bucket = TokenBucket(rate=10.0, capacity=1)
+    assert bucket.try_acquire() == 0
+
+    wait = bucket.try_acquire()
+
+    assert 0.05 < wait <= 0.1
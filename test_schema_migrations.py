@@ -0,0 +1,67 @@
+import sqlite3
+
+import database_pool
+import schema_migrations
+from schema_migrations import MIGRATIONS, migrate
+
+
+def tables(db_path):
+    conn = sqlite3.connect(db_path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+    conn.close()
+    return names
+
+
+def applied_versions(db_path):
+    conn = sqlite3.connect(db_path)
+    versions = [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+    conn.close()
+    return versions
+
+
+def test_fresh_database_reaches_latest_version(db_path):
+
+    assert migrate(db_path) == MIGRATIONS[-1][0]
+    assert applied_versions(db_path) == [version for version, _, _ in MIGRATIONS]
+    assert {'canvas_assignments', 'canvas_sync_state', 'study_milestones', 'ai_study_plan_cache',
+            'conversation_summaries', 'llm_calls', 'occupations',
+            'idx_canvas_assignments_student_due'} <= tables(db_path)
+
+
+def test_migrate_is_idempotent(db_path):
+    migrate(db_path)
+
+    assert migrate(db_path) == MIGRATIONS[-1][0]
+    assert len(applied_versions(db_path)) == len(MIGRATIONS)
+
+
+def test_upgrades_an_older_database_in_order(db_path):
+    original = list(MIGRATIONS)
+    try:
+        schema_migrations.MIGRATIONS[:] = original[:2]
+        assert migrate(db_path) == 2
+    finally:
+        schema_migrations.MIGRATIONS[:] = original
+
+    # Rows written under the old schema survive and get the new columns
+    conn = database_pool.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO canvas_assignments (student_id, assignment_id, assignment_name) "
+                     "VALUES ('s1', 'a1', 'Quiz 1')")
+    conn.close()
+
+    assert migrate(db_path) == MIGRATIONS[-1][0]
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT category, deleted_at FROM canvas_assignments WHERE assignment_id = 'a1'"
+                        ).fetchone() == ('Quizzes & Tests', None)
+    conn.close()
+
+
+def test_ensure_schema_migrates_once_per_process(db_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(schema_migrations, 'migrate', lambda path: calls.append(path))
+
+    schema_migrations.ensure_schema(db_path)
+    schema_migrations.ensure_schema(db_path)
+
+    assert calls == [db_path]
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from structured_milestones import IncrementalMilestoneParser, MilestoneSpec, parse_milestones
+
+TOOL_INPUT = {
+    "milestones": [
+        {"title": "Research {sources}", "description": "Find 3 \"primary\" sources\\notes [a, b]",
+         "type": "research", "days_before_due": 10, "estimated_hours": 3},
+        {"title": "Draft", "description": "Write the body", "type": "draft", "days_before_due": 5},
+        {"title": "Review", "description": "Proofread", "type": "review", "days_before_due": 1}
+    ]
+}
+
+
+def feed_in_chunks(parser, text, size):
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 10000])
+def test_yields_each_milestone_whatever_the_chunking(chunk_size):
+    parser = IncrementalMilestoneParser()
+
+    completed = feed_in_chunks(parser, json.dumps(TOOL_INPUT), chunk_size)
+
+    assert [m.title for m in completed] == ["Research {sources}", "Draft", "Review"]
+    assert completed[0].description == "Find 3 \"primary\" sources\\notes [a, b]"
+    assert parser.milestones == completed
+    assert parser.invalid == 0
+
+
+def test_milestone_is_returned_as_soon_as_its_object_closes():
+    text = json.dumps(TOOL_INPUT)
+    first_end = text.index('}, {') + 1
+    parser = IncrementalMilestoneParser()
+
+    assert [m.title for m in parser.feed(text[:first_end])] == ["Research {sources}"]
+    assert parser.feed(text[first_end:first_end + 5]) == []
+
+
+def test_truncated_reply_keeps_finished_milestones():
+    text = json.dumps(TOOL_INPUT)
+    parser = IncrementalMilestoneParser()
+
+    parser.feed(text[:text.index('"Review"')])
+
+    assert [m.title for m in parser.milestones] == ["Research {sources}", "Draft"]
+
+
+def test_invalid_milestones_are_counted_not_returned():
+    tool_input = {"milestones": [
+        {"title": "", "description": "No title", "days_before_due": 3},
+        {"title": "Plan", "description": "Outline", "days_before_due": -1},
+        {"title": "Write", "description": "Body"},
+        {"title": "Polish", "description": "Edit", "days_before_due": "2", "type": "unknown"}
+    ]}
+    parser = IncrementalMilestoneParser()
+
+    completed = parser.feed(json.dumps(tool_input))
+
+    assert [(m.title, m.days_before_due, m.type) for m in completed] == [("Polish", 2, "general")]
+    assert parser.invalid == 3
+    assert [m.title for m in parse_milestones(tool_input)] == ["Polish"]
+
+
+def test_estimated_hours_are_clamped():
+    spec = MilestoneSpec.from_dict({"title": "Cram", "days_before_due": 0, "estimated_hours": 40})
+
+    assert spec.estimated_hours == 12.0
+    assert spec.description == "Work on assignment"
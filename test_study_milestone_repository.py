@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+
+from study_milestone_repository import MAX_IDS_PER_QUERY, StudyMilestoneRepository, empty_study_plan_summary
+
+
+def days_from_today(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def test_summaries_report_progress_and_next_milestone(db_path):
+    repository = StudyMilestoneRepository(db_path)
+    repository.save_milestones('s1', 'a1', 'Essay', [
+        {'title': 'Research', 'target_date': days_from_today(1)},
+        {'title': 'Draft', 'target_date': days_from_today(3)},
+        {'title': 'Undated'},
+        {'title': 'Review', 'target_date': days_from_today(5)}
+    ])
+    repository.complete_milestone('s1', 'a1', 'Research')
+
+    summary = repository.get_study_plan_summaries('s1', ['a1'])['a1']
+
+    assert summary['has_plan']
+    assert (summary['total'], summary['completed'], summary['progress_percent']) == (4, 1, 25)
+    assert summary['next_milestone'] == {'title': 'Draft', 'target_date': days_from_today(3), 'days_until_due': 3}
+
+
+def test_summaries_cover_every_requested_assignment(db_path):
+    repository = StudyMilestoneRepository(db_path)
+    repository.save_milestones('s1', 'a1', 'Essay', [{'title': 'Only step', 'target_date': days_from_today(2)}])
+    repository.complete_milestone('s1', 'a1', 'Only step')
+
+    summaries = repository.get_study_plan_summaries('s1', ['a1', 'a2', 'a1'])
+
+    assert list(summaries) == ['a1', 'a2']
+    assert summaries['a1']['progress_percent'] == 100
+    assert summaries['a1']['next_milestone'] is None
+    assert summaries['a2'] == empty_study_plan_summary()
+
+
+def test_summaries_are_per_student(db_path):
+    repository = StudyMilestoneRepository(db_path)
+    repository.save_milestones('s1', 'a1', 'Essay', [{'title': 'Step', 'target_date': days_from_today(2)}])
+
+    assert not repository.get_study_plan_summaries('s2', ['a1'])['a1']['has_plan']
+
+
+def test_summaries_chunk_large_id_lists(db_path):
+    repository = StudyMilestoneRepository(db_path)
+    ids = [f"a{i}" for i in range(MAX_IDS_PER_QUERY + 10)]
+    repository.save_milestones_for_assignments('s1', [
+        (assignment_id, assignment_id, [{'title': 'Step', 'target_date': days_from_today(1)}])
+        for assignment_id in (ids[0], ids[-1])
+    ])
+
+    summaries = repository.get_study_plan_summaries('s1', ids)
+
+    assert len(summaries) == len(ids)
+    assert summaries[ids[0]]['has_plan'] and summaries[ids[-1]]['has_plan']
+    assert not summaries[ids[1]]['has_plan']
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import database_pool
+from study_plan_cache import StudyPlanCache
+
+PROMPT_VERSION = 'v1'
+
+
+def due_in(days):
+    return (datetime.now() + timedelta(days=days)).replace(microsecond=0)
+
+
+def plan(due):
+    return [
+        {'title': 'Research', 'description': 'Read widely',
+         'target_date': (due - timedelta(days=6)).strftime('%Y-%m-%d')},
+        {'title': 'Review', 'description': 'Proofread',
+         'target_date': (due - timedelta(days=1)).strftime('%Y-%m-%d')}
+    ]
+
+
+def test_hit_ignores_case_and_whitespace(db_path):
+    cache = StudyPlanCache(db_path)
+    due = due_in(14)
+    cache.put("Volcano  Report", "Describe an eruption", due, PROMPT_VERSION, plan(due))
+
+    hit = cache.get("volcano report", " describe an   eruption ", due.isoformat(), PROMPT_VERSION)
+
+    assert [m['title'] for m in hit] == ['Research', 'Review']
+    assert hit[0]['target_date'] == (due - timedelta(days=6)).strftime('%Y-%m-%d')
+
+
+def test_miss_on_other_prompt_version_or_due_day(db_path):
+    cache = StudyPlanCache(db_path)
+    due = due_in(14)
+    cache.put("Essay", "", due, PROMPT_VERSION, plan(due))
+
+    assert cache.get("Essay", "", due, 'v2') is None
+    assert cache.get("Essay", "", due + timedelta(days=1), PROMPT_VERSION) is None
+    assert cache.get("Essay", "", None, PROMPT_VERSION) is None
+
+
+def test_redated_milestones_never_fall_in_the_past(db_path):
+    cache = StudyPlanCache(db_path)
+    due = due_in(3)
+    cache.put("Essay", "", due, PROMPT_VERSION, plan(due))
+
+    hit = cache.get("Essay", "", due, PROMPT_VERSION)
+
+    assert hit[0]['target_date'] == datetime.now().strftime('%Y-%m-%d')
+
+
+def test_expired_entries_are_dropped(db_path):
+    cache = StudyPlanCache(db_path, ttl_days=1)
+    due = due_in(14)
+    cache.put("Essay", "", due, PROMPT_VERSION, plan(due))
+
+    conn = database_pool.connect(cache.db_path)
+    with conn:
+        conn.execute('UPDATE ai_study_plan_cache SET created_at = ?',
+                     ((datetime.now() - timedelta(days=2)).isoformat(),))
+    conn.close()
+
+    assert cache.get("Essay", "", due, PROMPT_VERSION) is None
+    conn = database_pool.connect(cache.db_path)
+    assert conn.execute('SELECT COUNT(*) FROM ai_study_plan_cache').fetchone()[0] == 0
+    conn.close()
+
+
+def test_least_recently_used_entry_is_evicted(db_path):
+    cache = StudyPlanCache(db_path, max_entries=2)
+    due = due_in(14)
+    cache.put("First", "", due, PROMPT_VERSION, plan(due))
+    cache.put("Second", "", due, PROMPT_VERSION, plan(due))
+
+    # Make First the most recently used, then push the cache over its limit
+    conn = database_pool.connect(cache.db_path)
+    with conn:
+        conn.execute('UPDATE ai_study_plan_cache SET last_used_at = ?',
+                     ((datetime.now() - timedelta(hours=1)).isoformat(),))
+    conn.close()
+    assert cache.get("First", "", due, PROMPT_VERSION)
+    cache.put("Third", "", due, PROMPT_VERSION, plan(due))
+
+    assert cache.get("First", "", due, PROMPT_VERSION)
+    assert cache.get("Second", "", due, PROMPT_VERSION) is None
+    assert cache.get("Third", "", due, PROMPT_VERSION)
@@ -3,10 +3,11 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import anthropic
-import os
 import json
-from dotenv import load_dotenv
+from anthropic_client import get_client
+from live_data_store import LiveDataStore
+from occupation_repository import OccupationRepository
+from llm_resilience import describe_llm_failure, resilient_call
 
 # Page configuration
 st.set_page_config(
@@ -196,23 +197,32 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# Seconds a counsellor reply may take before we give up (no retries)
+AI_RESPONSE_DEADLINE_SECONDS = 60
+
+# Shown until the live data collector has published a snapshot
+FALLBACK_LIVE_DATA = {
+    'abs_employment': {
+        'unemployment_rate': '3.8%',
+        'participation_rate': '66.8%'
+    },
+    'university_stats': {
+        'overall_employment_rate': '89.1%',
+        'arts_employment_rate': '84.2%'
+    }
+}
+
+
 class WebCareerExplorerAgent:
     def __init__(self):
         # API setup
-        try:
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-        except:
-            load_dotenv()
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-
-        if api_key:
-            self.client = anthropic.Anthropic(api_key=api_key)
-        else:
-            self.client = None
+        self.client = get_client()
 
         # Load education data
         self.load_education_data()
-        self.load_live_data()
+        self.live_data_store = LiveDataStore()
+        self.live_data_store.import_legacy_json()
+        self.occupations = OccupationRepository()
 
         # Student profiles
         self.student_profiles = {
@@ -279,22 +289,14 @@ class WebCareerExplorerAgent:
                 }
             }
 
-    def load_live_data(self):
-        """Load live employment data with fallback"""
+    @property
+    def live_data(self):
+        """Latest live employment snapshot; only re-read from the database when a newer one is published"""
         try:
-            with open('live_employment_data.json', 'r', encoding='utf-8') as f:
-                self.live_data = json.load(f)
-        except:
-            self.live_data = {
-                'abs_employment': {
-                    'unemployment_rate': '3.8%',
-                    'participation_rate': '66.8%'
-                },
-                'university_stats': {
-                    'overall_employment_rate': '89.1%',
-                    'arts_employment_rate': '84.2%'
-                }
-            }
+            return self.live_data_store.get_latest() or FALLBACK_LIVE_DATA
+        except Exception as e:
+            print(f"⚠️ Could not load live employment data: {e}")
+            return FALLBACK_LIVE_DATA
 
     def get_ai_response(self, user_message, student_name):
         """Get AI response with fallback"""
@@ -313,19 +315,25 @@ Student Details:
 
 Provide helpful, specific advice about university courses, career prospects, and next steps."""
 
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1500,
-                messages=[
-                    {"role": "user", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ]
+            response = resilient_call(
+                self.client,
+                lambda client: client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=1500,
+                    messages=[
+                        {"role": "user", "content": system_prompt},
+                        {"role": "user", "content": user_message}
+                    ]
+                ),
+                AI_RESPONSE_DEADLINE_SECONDS,
+                slow_call_seconds=AI_RESPONSE_DEADLINE_SECONDS,
+                feature='web_career_chat'
             )
 
             return response.content[0].text
 
         except Exception as e:
-            return f"I encountered an error: {str(e)}. Please try again or check your internet connection."
+            return describe_llm_failure(e)
 
 
 def create_header():
@@ -452,6 +460,31 @@ def create_metrics_dashboard():
             help="Employment rate for Arts graduates"
         )
 
+    history = agent.live_data_store.get_metric_history('abs_employment', 'unemployment_rate')
+    if len(history) > 1:
+        with st.expander("📈 Unemployment rate over time"):
+            trend = pd.DataFrame(history, columns=['collected_at', 'unemployment_rate'])
+            trend['collected_at'] = pd.to_datetime(trend['collected_at'])
+            trend['unemployment_rate'] = pd.to_numeric(trend['unemployment_rate'].str.rstrip('%'), errors='coerce')
+            fig = px.line(trend.dropna(), x='collected_at', y='unemployment_rate', markers=True,
+                          labels={'collected_at': 'Collected', 'unemployment_rate': 'Unemployment rate (%)'})
+            st.plotly_chart(fig, use_container_width=True)
+
+    occupation_count = agent.occupations.count()
+    if occupation_count:
+        with st.expander(f"🔎 Explore {occupation_count:,} occupations (Job Outlook)"):
+            query = st.text_input("Search occupations", key="occupation_search", placeholder="e.g. teacher, engineer")
+            results = agent.occupations.search(query) if query else agent.occupations.top('earnings')
+            if results:
+                table = pd.DataFrame(results)[['title', 'employment_outlook', 'weekly_earnings',
+                                               'employment_size', 'growth_forecast']]
+                st.dataframe(table.rename(columns={
+                    'title': 'Occupation', 'employment_outlook': 'Outlook', 'weekly_earnings': 'Weekly pay',
+                    'employment_size': 'Workforce', 'growth_forecast': 'Growth'
+                }), hide_index=True, use_container_width=True)
+            else:
+                st.info("No occupations match that search.")
+
 
 def create_chat_interface(student_name):
     """Create chat interface"""